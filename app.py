@@ -3,7 +3,7 @@ Discord Bot Dashboard - Flask Web Application
 Gelişmiş bot yönetim paneli
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for, flash, stream_with_context
 import sqlite3
 import json
 import asyncio
@@ -19,6 +19,13 @@ import discord
 from discord.ext import commands
 import aiohttp
 import threading
+from rollups import install_rollups, daily_counts, totals, top_guilds
+from live_feed import CLOSED, ChangeFeed, format_event
+from pagination import RESOURCES, fetch_page
+from exports import EXPORT_TABLES, EXPORT_FORMATS, stream_export
+from response_cache import DataVersion, ResponseCache
+from db_pool import ReadOnlyPool
+import queue
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', secrets.token_hex(16))
@@ -39,64 +46,114 @@ ADMIN_USERS = [
     # Add Discord IDs of authorized users
 ]
 
-def get_db_connection():
-    """Database connection helper"""
-    db_path = os.path.join('..', 'moderation_bot.db')
-    if not os.path.exists(db_path):
-        # Create a sample database with tables for demo
-        conn = sqlite3.connect(db_path)
-        conn.execute('''CREATE TABLE IF NOT EXISTS guild_settings 
-                        (guild_id INTEGER PRIMARY KEY, language TEXT DEFAULT 'tr', 
-                         log_channel INTEGER, mute_role INTEGER, prefix TEXT DEFAULT '!',
-                         welcome_channel INTEGER, welcome_message TEXT, 
-                         goodbye_channel INTEGER, goodbye_message TEXT,
-                         automod_enabled INTEGER DEFAULT 1, max_warnings INTEGER DEFAULT 3)''')
-        
-        conn.execute('''CREATE TABLE IF NOT EXISTS warnings 
-                        (id INTEGER PRIMARY KEY, user_id INTEGER, guild_id INTEGER, 
-                         reason TEXT, moderator_id INTEGER, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-        
-        conn.execute('''CREATE TABLE IF NOT EXISTS temp_bans 
-                        (id INTEGER PRIMARY KEY, user_id INTEGER, guild_id INTEGER, 
-                         reason TEXT, moderator_id INTEGER, banned_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                         expires_at DATETIME)''')
-        
-        conn.execute('''CREATE TABLE IF NOT EXISTS mutes 
-                        (id INTEGER PRIMARY KEY, user_id INTEGER, guild_id INTEGER, 
-                         reason TEXT, moderator_id INTEGER, muted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                         expires_at DATETIME)''')
-        
-        conn.execute('''CREATE TABLE IF NOT EXISTS mod_logs 
-                        (id INTEGER PRIMARY KEY, guild_id INTEGER, target_id INTEGER,
-                         moderator_id INTEGER, action TEXT, reason TEXT, 
-                         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-        
-        # Insert sample data
-        sample_guilds = [
-            (123456789012345678, 'tr', None, None, '!', None, None, None, None, 1, 3),
-            (987654321098765432, 'en', None, None, '?', None, None, None, None, 1, 5),
-        ]
-        conn.executemany('INSERT INTO guild_settings VALUES (?,?,?,?,?,?,?,?,?,?,?)', sample_guilds)
-        
-        sample_warnings = [
-            (None, 111111111111111111, 123456789012345678, 'Spam', 222222222222222222, None),
-            (None, 333333333333333333, 123456789012345678, 'Küfür', 222222222222222222, None),
-        ]
-        conn.executemany('INSERT INTO warnings VALUES (?,?,?,?,?,?)', sample_warnings)
-        
-        sample_logs = [
-            (None, 123456789012345678, 111111111111111111, 222222222222222222, 'warn', 'Spam', None),
-            (None, 123456789012345678, 333333333333333333, 222222222222222222, 'kick', 'Küfür', None),
-        ]
-        conn.executemany('INSERT INTO mod_logs VALUES (?,?,?,?,?,?,?)', sample_logs)
+DB_PATH = os.path.join('..', 'moderation_bot.db')
+
+_seed_lock = threading.Lock()
+
+def ensure_demo_database():
+    """Create the demo database when the dashboard runs without the bot's.
+    
+    The bot's own database is never written here: its journal mode, counters
+    and indexes come from the bot's migrations. The demo schema, its rollup
+    triggers and the sample rows are created in one transaction.
+    """
+    if os.path.exists(DB_PATH):
+        return
+    
+    with _seed_lock:
+        if os.path.exists(DB_PATH):
+            return
         
-        conn.commit()
+        conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            
+            # Create a sample database with tables for demo
+            conn.execute('''CREATE TABLE IF NOT EXISTS guild_settings 
+                            (guild_id INTEGER PRIMARY KEY, language TEXT DEFAULT 'tr', 
+                             log_channel INTEGER, mute_role INTEGER, prefix TEXT DEFAULT '!',
+                             welcome_channel INTEGER, welcome_message TEXT, 
+                             goodbye_channel INTEGER, goodbye_message TEXT,
+                             automod_enabled INTEGER DEFAULT 1, max_warnings INTEGER DEFAULT 3)''')
+            
+            conn.execute('''CREATE TABLE IF NOT EXISTS warnings 
+                            (id INTEGER PRIMARY KEY, user_id INTEGER, guild_id INTEGER, 
+                             reason TEXT, moderator_id INTEGER, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+            
+            conn.execute('''CREATE TABLE IF NOT EXISTS temp_bans 
+                            (id INTEGER PRIMARY KEY, user_id INTEGER, guild_id INTEGER, 
+                             reason TEXT, moderator_id INTEGER, banned_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                             expires_at DATETIME)''')
+            
+            conn.execute('''CREATE TABLE IF NOT EXISTS mutes 
+                            (id INTEGER PRIMARY KEY, user_id INTEGER, guild_id INTEGER, 
+                             reason TEXT, moderator_id INTEGER, muted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                             expires_at DATETIME)''')
+            
+            conn.execute('''CREATE TABLE IF NOT EXISTS mod_logs 
+                            (id INTEGER PRIMARY KEY, guild_id INTEGER, target_id INTEGER,
+                             moderator_id INTEGER, action TEXT, reason TEXT, 
+                             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+            
+            # Dashboard counters read from the rollups; the triggers count the sample rows
+            install_rollups(conn.cursor())
+            
+            # Insert sample data
+            sample_guilds = [
+                (123456789012345678, 'tr', None, None, '!', None, None, None, None, 1, 3),
+                (987654321098765432, 'en', None, None, '?', None, None, None, None, 1, 5),
+            ]
+            conn.executemany('INSERT INTO guild_settings VALUES (?,?,?,?,?,?,?,?,?,?,?)', sample_guilds)
+            
+            sample_warnings = [
+                (111111111111111111, 123456789012345678, 'Spam', 222222222222222222),
+                (333333333333333333, 123456789012345678, 'Küfür', 222222222222222222),
+            ]
+            conn.executemany('INSERT INTO warnings (user_id, guild_id, reason, moderator_id) VALUES (?,?,?,?)', sample_warnings)
+            
+            sample_logs = [
+                (123456789012345678, 111111111111111111, 222222222222222222, 'warn', 'Spam'),
+                (123456789012345678, 333333333333333333, 222222222222222222, 'kick', 'Küfür'),
+            ]
+            conn.executemany('INSERT INTO mod_logs (guild_id, target_id, moderator_id, action, reason) VALUES (?,?,?,?,?)', sample_logs)
+            
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.close()
+            # Leave no half-built file behind, so the next start tries again;
+            # a failed cleanup must not hide the original error
+            try:
+                os.remove(DB_PATH)
+            except OSError:
+                pass
+            raise
         conn.close()
-    
-    conn = sqlite3.connect(db_path)
+
+# Demo verisi bir kez, uygulama başlarken hazırlanır (WSGI sunucuları da bu modülü içe aktarır)
+ensure_demo_database()
+
+# Salt okunur bağlantılar tüm Flask iş parçacıkları arasında paylaşılır
+db_pool = ReadOnlyPool(DB_PATH)
+
+def get_db_connection():
+    """Read-only pooled connection; close() returns it to the pool"""
+    return db_pool.connection()
+
+def get_write_connection():
+    """Writable connection for the few routes that save settings"""
+    conn = sqlite3.connect(DB_PATH, timeout=30)
     conn.row_factory = sqlite3.Row
     return conn
 
+def get_export_connection():
+    """Dedicated read-only connection, so a long download never holds a pool slot"""
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    return conn
+
+# JSON API yanıtları, veritabanı değişene kadar (en fazla 5 sn) önbellekte
+response_cache = ResponseCache(DataVersion(DB_PATH), ttl=5)
+
 def require_auth(f):
     """Authentication decorator - disabled for demo"""
     @wraps(f)
@@ -121,13 +178,11 @@ def login():
 @require_auth
 def dashboard():
     """Ana yönetim paneli"""
-    conn = get_db_connection()
-    
-    # İstatistikler
-    try:
+    with get_db_connection() as conn:
+        # İstatistikler
         stats = {
             'total_guilds': conn.execute('SELECT COUNT(*) FROM guild_settings').fetchone()[0],
-            'total_warnings': conn.execute('SELECT COUNT(*) FROM warnings').fetchone()[0],
+            'total_warnings': totals(conn).get('warnings', 0),
             'total_bans': 0,
             'total_mutes': 0
         }
@@ -142,35 +197,26 @@ def dashboard():
             stats['total_mutes'] = conn.execute('SELECT COUNT(*) FROM mutes').fetchone()[0]
         except sqlite3.OperationalError:
             pass
-    except Exception:
-        stats = {
-            'total_guilds': 2,
-            'total_warnings': 5,
-            'total_bans': 3,
-            'total_mutes': 1
-        }
-    
-    # Son mod logları
-    try:
-        recent_logs = conn.execute('''
-            SELECT * FROM mod_logs 
-            ORDER BY timestamp DESC 
-            LIMIT 10
-        ''').fetchall()
-    except Exception:
-        recent_logs = []
-    
-    # Aktif sunucular
-    try:
-        active_guilds = conn.execute('''
-            SELECT guild_id, language, prefix 
-            FROM guild_settings 
-            ORDER BY guild_id
-        ''').fetchall()
-    except Exception:
-        active_guilds = []
-    
-    conn.close()
+        
+        # Son mod logları
+        try:
+            recent_logs = conn.execute('''
+                SELECT * FROM mod_logs 
+                ORDER BY timestamp DESC 
+                LIMIT 10
+            ''').fetchall()
+        except Exception:
+            recent_logs = []
+        
+        # Aktif sunucular
+        try:
+            active_guilds = conn.execute('''
+                SELECT guild_id, language, prefix 
+                FROM guild_settings 
+                ORDER BY guild_id
+            ''').fetchall()
+        except Exception:
+            active_guilds = []
     
     return render_template('dashboard.html', 
                          config=DASHBOARD_CONFIG,
@@ -182,32 +228,29 @@ def dashboard():
 @require_auth
 def guilds():
     """Sunucu yönetimi sayfası"""
-    conn = get_db_connection()
-    
-    try:
-        guilds = conn.execute('''
-            SELECT gs.*, 
-                   (SELECT COUNT(*) FROM warnings w WHERE w.guild_id = gs.guild_id) as warning_count,
-                   0 as ban_count,
-                   0 as mute_count
-            FROM guild_settings gs
-            ORDER BY gs.guild_id
-        ''').fetchall()
-    except Exception:
-        # Fallback to basic query if joins fail
+    with get_db_connection() as conn:
         try:
-            guilds_raw = conn.execute('SELECT * FROM guild_settings ORDER BY guild_id').fetchall()
-            guilds = []
-            for guild in guilds_raw:
-                guild_dict = dict(guild)
-                guild_dict['warning_count'] = 0
-                guild_dict['ban_count'] = 0
-                guild_dict['mute_count'] = 0
-                guilds.append(type('Guild', (), guild_dict)())
+            guilds = conn.execute('''
+                SELECT gs.*, 
+                       (SELECT COUNT(*) FROM warnings w WHERE w.guild_id = gs.guild_id) as warning_count,
+                       0 as ban_count,
+                       0 as mute_count
+                FROM guild_settings gs
+                ORDER BY gs.guild_id
+            ''').fetchall()
         except Exception:
-            guilds = []
-    
-    conn.close()
+            # Fallback to basic query if joins fail
+            try:
+                guilds_raw = conn.execute('SELECT * FROM guild_settings ORDER BY guild_id').fetchall()
+                guilds = []
+                for guild in guilds_raw:
+                    guild_dict = dict(guild)
+                    guild_dict['warning_count'] = 0
+                    guild_dict['ban_count'] = 0
+                    guild_dict['mute_count'] = 0
+                    guilds.append(type('Guild', (), guild_dict)())
+            except Exception:
+                guilds = []
     
     return render_template('guilds.html', 
                          config=DASHBOARD_CONFIG,
@@ -217,62 +260,60 @@ def guilds():
 @require_auth
 def guild_detail(guild_id):
     """Sunucu detay sayfası"""
-    conn = get_db_connection()
-    
-    # Sunucu ayarları
-    guild_settings = conn.execute('''
-        SELECT * FROM guild_settings WHERE guild_id = ?
-    ''', (guild_id,)).fetchone()
-    
-    if not guild_settings:
-        flash('Sunucu bulunamadı!', 'error')
-        return redirect(url_for('guilds'))
-    
-    # İstatistikler
-    try:
-        stats = {
-            'warnings': conn.execute('SELECT COUNT(*) FROM warnings WHERE guild_id = ?', (guild_id,)).fetchone()[0],
-            'bans': 0,
-            'mutes': 0,
-            'logs': conn.execute('SELECT COUNT(*) FROM mod_logs WHERE guild_id = ?', (guild_id,)).fetchone()[0]
-        }
+    with get_db_connection() as conn:
+        # Sunucu ayarları
+        guild_settings = conn.execute('''
+            SELECT * FROM guild_settings WHERE guild_id = ?
+        ''', (guild_id,)).fetchone()
         
-        # Try to get bans and mutes if tables exist
+        if not guild_settings:
+            flash('Sunucu bulunamadı!', 'error')
+            return redirect(url_for('guilds'))
+        
+        # İstatistikler
         try:
-            stats['bans'] = conn.execute('SELECT COUNT(*) FROM temp_bans WHERE guild_id = ?', (guild_id,)).fetchone()[0]
-        except sqlite3.OperationalError:
-            pass
+            guild_totals = totals(conn, guild_id)
+            stats = {
+                'warnings': guild_totals.get('warnings', 0),
+                'bans': 0,
+                'mutes': 0,
+                'logs': guild_totals.get('mod_logs', 0)
+            }
             
+            # Try to get bans and mutes if tables exist
+            try:
+                stats['bans'] = conn.execute('SELECT COUNT(*) FROM temp_bans WHERE guild_id = ?', (guild_id,)).fetchone()[0]
+            except sqlite3.OperationalError:
+                pass
+                
+            try:
+                stats['mutes'] = conn.execute('SELECT COUNT(*) FROM mutes WHERE guild_id = ?', (guild_id,)).fetchone()[0]
+            except sqlite3.OperationalError:
+                pass
+        except Exception:
+            stats = {'warnings': 0, 'bans': 0, 'mutes': 0, 'logs': 0}
+        
+        # Son aktiviteler
         try:
-            stats['mutes'] = conn.execute('SELECT COUNT(*) FROM mutes WHERE guild_id = ?', (guild_id,)).fetchone()[0]
-        except sqlite3.OperationalError:
-            pass
-    except Exception:
-        stats = {'warnings': 0, 'bans': 0, 'mutes': 0, 'logs': 0}
-    
-    # Son aktiviteler
-    try:
-        recent_activity = conn.execute('''
-            SELECT * FROM mod_logs 
-            WHERE guild_id = ? 
-            ORDER BY timestamp DESC 
-            LIMIT 20
-        ''', (guild_id,)).fetchall()
-    except Exception:
-        recent_activity = []
-    
-    # Uyarılar
-    try:
-        warnings = conn.execute('''
-            SELECT * FROM warnings 
-            WHERE guild_id = ? 
-            ORDER BY timestamp DESC 
-            LIMIT 50
-        ''', (guild_id,)).fetchall()
-    except Exception:
-        warnings = []
-    
-    conn.close()
+            recent_activity = conn.execute('''
+                SELECT * FROM mod_logs 
+                WHERE guild_id = ? 
+                ORDER BY timestamp DESC 
+                LIMIT 20
+            ''', (guild_id,)).fetchall()
+        except Exception:
+            recent_activity = []
+        
+        # Uyarılar
+        try:
+            warnings = conn.execute('''
+                SELECT * FROM warnings 
+                WHERE guild_id = ? 
+                ORDER BY timestamp DESC 
+                LIMIT 50
+            ''', (guild_id,)).fetchall()
+        except Exception:
+            warnings = []
     
     return render_template('guild_detail.html',
                          config=DASHBOARD_CONFIG,
@@ -285,44 +326,41 @@ def guild_detail(guild_id):
 @require_auth
 def moderation():
     """Moderasyon araçları sayfası"""
-    conn = get_db_connection()
-    
-    # Son 24 saatteki moderasyon aktiviteleri
-    yesterday = datetime.now() - timedelta(days=1)
-    
-    try:
-        recent_moderation = conn.execute('''
-            SELECT * FROM mod_logs
-            WHERE timestamp > ?
-            ORDER BY timestamp DESC
-            LIMIT 100
-        ''', (yesterday,)).fetchall()
-    except Exception:
-        recent_moderation = []
-    
-    # Aktif cezalar - with fallback for missing tables
-    active_bans = []
-    active_mutes = []
-    
-    try:
-        active_bans = conn.execute('''
-            SELECT * FROM temp_bans
-            WHERE expires_at > ?
-            ORDER BY expires_at
-        ''', (datetime.now(),)).fetchall()
-    except sqlite3.OperationalError:
-        pass
-    
-    try:
-        active_mutes = conn.execute('''
-            SELECT * FROM mutes
-            WHERE expires_at > ?
-            ORDER BY expires_at
-        ''', (datetime.now(),)).fetchall()
-    except sqlite3.OperationalError:
-        pass
-    
-    conn.close()
+    with get_db_connection() as conn:
+        # Son 24 saatteki moderasyon aktiviteleri
+        yesterday = datetime.now() - timedelta(days=1)
+        
+        try:
+            recent_moderation = conn.execute('''
+                SELECT * FROM mod_logs
+                WHERE timestamp > ?
+                ORDER BY timestamp DESC
+                LIMIT 100
+            ''', (yesterday,)).fetchall()
+        except Exception:
+            recent_moderation = []
+        
+        # Aktif cezalar - with fallback for missing tables
+        active_bans = []
+        active_mutes = []
+        
+        try:
+            active_bans = conn.execute('''
+                SELECT * FROM temp_bans
+                WHERE expires_at > ?
+                ORDER BY expires_at
+            ''', (datetime.now(),)).fetchall()
+        except sqlite3.OperationalError:
+            pass
+        
+        try:
+            active_mutes = conn.execute('''
+                SELECT * FROM mutes
+                WHERE expires_at > ?
+                ORDER BY expires_at
+            ''', (datetime.now(),)).fetchall()
+        except sqlite3.OperationalError:
+            pass
     
     return render_template('moderation.html',
                          config=DASHBOARD_CONFIG,
@@ -334,88 +372,28 @@ def moderation():
 @require_auth
 def analytics():
     """Analitik ve istatistikler sayfası"""
-    conn = get_db_connection()
-    
-    # Günlük istatistikler (son 30 gün)
-    daily_stats = []
-    try:
-        for i in range(30):
-            date = datetime.now() - timedelta(days=i)
-            date_str = date.strftime('%Y-%m-%d')
-            
-            day_stats = {
-                'date': date,  # datetime object olarak sakla
-                'date_str': date_str,  # string olarak da sakla
-                'warnings': 0,
-                'bans': 0,
-                'mutes': 0
-            }
-            
-            try:
-                day_stats['warnings'] = conn.execute('''
-                    SELECT COUNT(*) FROM warnings 
-                    WHERE DATE(timestamp) = ?
-                ''', (date_str,)).fetchone()[0]
-            except Exception:
-                pass
-                
-            try:
-                day_stats['bans'] = conn.execute('''
-                    SELECT COUNT(*) FROM temp_bans 
-                    WHERE DATE(banned_at) = ?
-                ''', (date_str,)).fetchone()[0]
-            except sqlite3.OperationalError:
-                pass
-                
-            try:
-                day_stats['mutes'] = conn.execute('''
-                    SELECT COUNT(*) FROM mutes 
-                    WHERE DATE(muted_at) = ?
-                ''', (date_str,)).fetchone()[0]
-            except sqlite3.OperationalError:
-                pass
-                
-            daily_stats.append(day_stats)
-    except Exception:
-        # Generate sample data for demo
-        for i in range(30):
-            date = datetime.now() - timedelta(days=i)
-            daily_stats.append({
-                'date': date,  # datetime object
-                'date_str': date.strftime('%Y-%m-%d'),  # string
-                'warnings': max(0, 10 - i + (i % 3)),
-                'bans': max(0, 3 - (i // 5)),
-                'mutes': max(0, 5 - (i // 3))
-            })
-    
-    # En aktif moderatörler
-    try:
-        top_moderators = conn.execute('''
-            SELECT moderator_id, COUNT(*) as action_count
-            FROM mod_logs
-            WHERE timestamp > date('now', '-30 days')
-            GROUP BY moderator_id
-            ORDER BY action_count DESC
-            LIMIT 10
-        ''').fetchall()
-    except Exception:
-        top_moderators = []
-    
-    # Sunucu bazında istatistikler
-    try:
-        guild_stats = conn.execute('''
-            SELECT gs.guild_id,
-                   (SELECT COUNT(*) FROM warnings w WHERE w.guild_id = gs.guild_id) as warnings,
-                   0 as bans,
-                   0 as mutes
-            FROM guild_settings gs
-            ORDER BY warnings DESC
-            LIMIT 10
-        ''').fetchall()
-    except Exception:
-        guild_stats = []
-    
-    conn.close()
+    with get_db_connection() as conn:
+        # Günlük istatistikler (son 30 gün), tek sorguda özet tablodan
+        daily_stats = daily_counts(conn, days=30)
+        
+        # En aktif moderatörler
+        try:
+            top_moderators = conn.execute('''
+                SELECT moderator_id, COUNT(*) as action_count
+                FROM mod_logs
+                WHERE timestamp > date('now', '-30 days')
+                GROUP BY moderator_id
+                ORDER BY action_count DESC
+                LIMIT 10
+            ''').fetchall()
+        except Exception:
+            top_moderators = []
+        
+        # Sunucu bazında istatistikler
+        try:
+            guild_stats = top_guilds(conn, limit=10)
+        except Exception:
+            guild_stats = []
     
     return render_template('analytics.html',
                          config=DASHBOARD_CONFIG,
@@ -530,51 +508,19 @@ def generate_web_ai_response(message):
 @require_auth
 def advanced_dashboard():
     """Ultra gelişmiş dashboard"""
-    conn = get_db_connection()
-    
-    # Gelişmiş istatistikler
-    try:
-        stats = {
-            'total_guilds': conn.execute('SELECT COUNT(*) FROM guild_settings').fetchone()[0],
-            'total_warnings': conn.execute('SELECT COUNT(*) FROM warnings').fetchone()[0],
-            'total_bans': 0,
-            'total_mutes': 0,
-            'active_bans': 0,
-            'active_mutes': 0
-        }
+    with get_db_connection() as conn:
+        # Gelişmiş istatistikler
+        stats = collect_stats(conn)
         
+        # Son mod logları
         try:
-            stats['total_bans'] = conn.execute('SELECT COUNT(*) FROM temp_bans').fetchone()[0]
-            stats['active_bans'] = conn.execute('SELECT COUNT(*) FROM temp_bans WHERE expires_at > ?', (datetime.now(),)).fetchone()[0]
-        except sqlite3.OperationalError:
-            pass
-            
-        try:
-            stats['total_mutes'] = conn.execute('SELECT COUNT(*) FROM mutes').fetchone()[0]
-            stats['active_mutes'] = conn.execute('SELECT COUNT(*) FROM mutes WHERE expires_at > ?', (datetime.now(),)).fetchone()[0]
-        except sqlite3.OperationalError:
-            pass
-    except Exception:
-        stats = {
-            'total_guilds': 2,
-            'total_warnings': 15,
-            'total_bans': 5,
-            'total_mutes': 3,
-            'active_bans': 2,
-            'active_mutes': 1
-        }
-    
-    # Son mod logları
-    try:
-        recent_logs = conn.execute('''
-            SELECT * FROM mod_logs 
-            ORDER BY timestamp DESC 
-            LIMIT 20
-        ''').fetchall()
-    except Exception:
-        recent_logs = []
-    
-    conn.close()
+            recent_logs = conn.execute('''
+                SELECT * FROM mod_logs 
+                ORDER BY timestamp DESC 
+                LIMIT 20
+            ''').fetchall()
+        except Exception:
+            recent_logs = []
     
     return render_template('advanced_dashboard.html', 
                          config=DASHBOARD_CONFIG,
@@ -583,14 +529,14 @@ def advanced_dashboard():
 
 @app.route('/api/guild/<int:guild_id>/settings', methods=['GET', 'POST'])
 @require_auth
+@response_cache.cached
 def api_guild_settings(guild_id):
     """Sunucu ayarları API"""
-    conn = get_db_connection()
-    
     if request.method == 'GET':
-        settings = conn.execute('''
-            SELECT * FROM guild_settings WHERE guild_id = ?
-        ''', (guild_id,)).fetchone()
+        with get_db_connection() as conn:
+            settings = conn.execute('''
+                SELECT * FROM guild_settings WHERE guild_id = ?
+            ''', (guild_id,)).fetchone()
         
         if settings:
             return jsonify(dict(settings))
@@ -601,6 +547,7 @@ def api_guild_settings(guild_id):
         data = request.get_json()
         
         # Ayarları güncelle
+        conn = get_write_connection()
         conn.execute('''
             UPDATE guild_settings 
             SET language = ?, prefix = ?, log_channel = ?, 
@@ -627,119 +574,172 @@ def api_guild_settings(guild_id):
         
         return jsonify({'success': True})
 
+def collect_stats(conn):
+    """Genel istatistikler; /api/stats, /advanced ve canlı akış tarafından kullanılır"""
+    stats = {
+        'total_guilds': conn.execute('SELECT COUNT(*) FROM guild_settings').fetchone()[0],
+        'total_warnings': totals(conn).get('warnings', 0),
+        'total_bans': 0,
+        'total_mutes': 0,
+        'active_bans': 0,
+        'active_mutes': 0
+    }
+    
+    # Check if tables exist before querying
+    try:
+        stats['total_bans'] = conn.execute('SELECT COUNT(*) FROM temp_bans').fetchone()[0]
+        stats['active_bans'] = conn.execute('''
+            SELECT COUNT(*) FROM temp_bans WHERE expires_at > ?
+        ''', (datetime.now(),)).fetchone()[0]
+    except sqlite3.OperationalError:
+        pass
+        
+    try:
+        stats['total_mutes'] = conn.execute('SELECT COUNT(*) FROM mutes').fetchone()[0]
+        stats['active_mutes'] = conn.execute('''
+            SELECT COUNT(*) FROM mutes WHERE expires_at > ?
+        ''', (datetime.now(),)).fetchone()[0]
+    except sqlite3.OperationalError:
+        pass
+    
+    return stats
+
+# Tüm açık sekmeler tek bir veritabanı izleyicisini paylaşır
+change_feed = ChangeFeed(DB_PATH, collect_stats)
+
 @app.route('/api/stats')
 @require_auth
+@response_cache.cached
 def api_stats():
     """Genel istatistikler API"""
-    conn = get_db_connection()
+    with get_db_connection() as conn:
+        stats = collect_stats(conn)
+    return jsonify(stats)
+
+@app.route('/api/db-stats')
+@require_auth
+def api_db_stats():
+    """Bağlantı havuzu, yanıt önbelleği ve canlı akış durumu"""
+    return jsonify({
+        'pool': db_pool.stats(),
+        'cache': response_cache.stats(),
+        'stream_subscribers': change_feed.subscribers
+    })
+
+@app.route('/api/stream')
+@require_auth
+def api_stream():
+    """Yeni mod logları ve istatistik değişiklikleri için Server-Sent Events akışı"""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    subscriber = change_feed.subscribe(last_event_id)
     
-    try:
-        stats = {
-            'total_guilds': conn.execute('SELECT COUNT(*) FROM guild_settings').fetchone()[0],
-            'total_warnings': conn.execute('SELECT COUNT(*) FROM warnings').fetchone()[0],
-            'total_bans': 0,
-            'total_mutes': 0,
-            'active_bans': 0,
-            'active_mutes': 0
-        }
-        
-        # Check if tables exist before querying
-        try:
-            stats['total_bans'] = conn.execute('SELECT COUNT(*) FROM temp_bans').fetchone()[0]
-            stats['active_bans'] = conn.execute('''
-                SELECT COUNT(*) FROM temp_bans WHERE expires_at > ?
-            ''', (datetime.now(),)).fetchone()[0]
-        except sqlite3.OperationalError:
-            pass
-            
+    def generate():
         try:
-            stats['total_mutes'] = conn.execute('SELECT COUNT(*) FROM mutes').fetchone()[0]
-            stats['active_mutes'] = conn.execute('''
-                SELECT COUNT(*) FROM mutes WHERE expires_at > ?
-            ''', (datetime.now(),)).fetchone()[0]
-        except sqlite3.OperationalError:
-            pass
-            
-    except Exception as e:
-        stats = {
-            'total_guilds': 2,
-            'total_warnings': 5,
-            'total_bans': 3,
-            'total_mutes': 1,
-            'active_bans': 1,
-            'active_mutes': 0
-        }
-    
-    conn.close()
-    return jsonify(stats)
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    item = subscriber.get(timeout=15)
+                except queue.Empty:
+                    # Keeps proxies from closing an idle connection
+                    yield ': keep-alive\n\n'
+                    continue
+                if item is CLOSED:
+                    # Fell too far behind and was dropped from the feed
+                    return
+                yield format_event(*item)
+        finally:
+            change_feed.unsubscribe(subscriber)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.route('/api/recent-activity')
 @require_auth
+@response_cache.cached
 def api_recent_activity():
     """Son aktiviteler API"""
-    conn = get_db_connection()
-    
-    limit = request.args.get('limit', 50, type=int)
-    
-    try:
-        activities = conn.execute('''
-            SELECT * FROM mod_logs 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', (limit,)).fetchall()
+    with get_db_connection() as conn:
+        limit = request.args.get('limit', 50, type=int)
         
-        activity_list = []
-        for activity in activities:
-            activity_dict = dict(activity)
+        # First page of the mod log API; limit is capped there
+        activity_list = fetch_page(conn, 'mod_logs', limit=limit)['items']
+        for activity_dict in activity_list:
             # Ensure timestamp is properly formatted
             if activity_dict.get('timestamp'):
                 activity_dict['timestamp'] = str(activity_dict['timestamp'])
-            activity_list.append(activity_dict)
-            
-    except Exception as e:
-        print(f"Database error: {e}")
-        # Return sample data if database is not ready
-        activity_list = [
-            {
-                'id': 1,
-                'guild_id': 123456789012345678,
-                'target_id': 111111111111111111,
-                'moderator_id': 222222222222222222,
-                'action': 'warn',
-                'reason': 'Spam mesaj',
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            },
-            {
-                'id': 2,
-                'guild_id': 123456789012345678,
-                'target_id': 333333333333333333,
-                'moderator_id': 222222222222222222,
-                'action': 'kick',
-                'reason': 'Kural ihlali',
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-        ]
     
-    conn.close()
-    
-    # Always return an array
-    if not isinstance(activity_list, list):
-        activity_list = []
-        
     return jsonify(activity_list)
 
+# URL name -> pagination resource, e.g. /api/mod-logs -> mod_logs
+API_PAGE_RESOURCES = {name.replace('_', '-'): name for name in RESOURCES}
+
+@app.route("/api/<any('mod-logs', warnings, bans):resource>")
+@require_auth
+def api_paginated(resource):
+    """Sayfalı geçmiş API: /api/mod-logs, /api/warnings, /api/bans
+    
+    Filtreler: guild_id, action, moderator_id, target_id, since, until.
+    Sonraki sayfa için yanıttaki next_cursor değeri ?cursor= ile gönderilir.
+    """
+    name = API_PAGE_RESOURCES[resource]
+    filters = {
+        'guild_id': request.args.get('guild_id', type=int),
+        'action': request.args.get('action'),
+        'moderator_id': request.args.get('moderator_id', type=int),
+        'target_id': request.args.get('target_id', type=int)
+    }
+    
+    try:
+        with get_db_connection() as conn:
+            page = fetch_page(
+                conn, name, filters,
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', 50, type=int),
+                since=request.args.get('since'),
+                until=request.args.get('until')
+            )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(page)
+
+@app.route('/api/export/<export_type>')
+@require_auth
+def api_export(export_type):
+    """Tabloyu CSV veya JSONL olarak akış halinde dışa aktar (?format=csv|jsonl&gzip=1)"""
+    table = EXPORT_TABLES.get(export_type)
+    fmt = request.args.get('format', 'csv').lower()
+    if table is None:
+        return jsonify({'error': f'Unknown export type: {export_type}'}), 404
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format: {fmt}'}), 400
+    
+    compress = request.args.get('gzip', '0').lower() in ('1', 'true', 'yes')
+    filename = f"{table}_export_{datetime.now().strftime('%Y-%m-%d')}.{fmt}"
+    mimetype = EXPORT_FORMATS[fmt]
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    
+    # The generator borrows a connection once streaming starts and returns it when the download ends
+    response = Response(stream_export(get_export_connection, table, fmt, compress), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/settings/general', methods=['GET', 'POST'])
 @require_auth
 def api_save_general_settings():
     """Genel ayarları kaydet ve getir"""
-    conn = get_db_connection()
-    
     if request.method == 'GET':
         try:
             # Get current settings from database
-            settings = conn.execute('''
-                SELECT * FROM dashboard_settings WHERE user_id = ? LIMIT 1
-            ''', ('admin',)).fetchone()
+            with get_db_connection() as conn:
+                settings = conn.execute('''
+                    SELECT * FROM dashboard_settings WHERE user_id = ? LIMIT 1
+                ''', ('admin',)).fetchone()
             
             if settings:
                 return jsonify(dict(settings))
@@ -770,6 +770,7 @@ def api_save_general_settings():
             })
     
     elif request.method == 'POST':
+        conn = get_write_connection()
         try:
             data = request.get_json()
             
@@ -0,0 +1,150 @@
+import asyncio
+import tempfile
+from contextlib import asynccontextmanager
+
+import aiohttp
+import discord
+
+
+class ByteBudget:
+    """Async counter of bytes in flight that makes callers wait for room."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_use = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, amount, timeout=None):
+        """Reserve ``amount`` bytes (at most the whole budget); False on timeout."""
+        amount = min(amount, self.limit)
+        async with self._condition:
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self.in_use + amount <= self.limit),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                return False
+            self.in_use += amount
+            return True
+
+    async def release(self, amount):
+        async with self._condition:
+            self.in_use -= amount
+            self._condition.notify_all()
+
+
+class AttachmentRelay:
+    """Re-uploads DM attachments without holding whole files in memory.
+
+    Each file is streamed into a ``SpooledTemporaryFile`` that moves to disk
+    past ``spool_size`` bytes. A message's bytes are reserved against a
+    global ``budget`` in one piece, so relays never hold part of the budget
+    while waiting for the rest, and each user gets at most ``per_user``
+    relays at once. Files over the upload limit, or messages that can't get
+    budget within ``budget_timeout`` seconds, are passed on as links instead.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    MAX_FILES = 10
+
+    def __init__(self, budget=64 * 1024 * 1024, per_user=2, spool_size=1024 * 1024, budget_timeout=30):
+        self.budget = ByteBudget(budget)
+        self.per_user = per_user
+        self.spool_size = spool_size
+        self.budget_timeout = budget_timeout
+
+        self._user_slots = {}
+        self._session = None
+
+    def _slot(self, user_id):
+        slot = self._user_slots.get(user_id)
+        if slot is None:
+            slot = self._user_slots[user_id] = [asyncio.Semaphore(self.per_user), 0]
+        return slot
+
+    async def _download(self, attachment):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        try:
+            received = 0
+            async with self._session.get(attachment.url) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                    received += len(chunk)
+                    if received > attachment.size:
+                        raise ValueError(f"{attachment.filename} is larger than announced")
+                    spool.write(chunk)
+            spool.seek(0)
+            return spool
+        except BaseException:
+            spool.close()
+            raise
+
+    @asynccontextmanager
+    async def relay(self, user_id, attachments, size_limit):
+        """Yield ``(files, links)`` for one message's attachments.
+
+        ``files`` are ready-to-send ``discord.File`` objects whose total stays
+        under ``size_limit``; ``links`` are the attachments to pass on by URL.
+        Spooled files and budget are released when the block exits.
+        """
+        slot = self._slot(user_id)
+        slot[1] += 1
+        files, links, spools = [], [], []
+        reserved = 0
+
+        try:
+            async with slot[0]:
+                # Choose what fits in one upload, then reserve it all at once
+                limit = min(size_limit, self.budget.limit)
+                chosen, total = [], 0
+                for attachment in attachments:
+                    if len(chosen) >= self.MAX_FILES or total + attachment.size > limit:
+                        links.append(attachment)
+                    else:
+                        chosen.append(attachment)
+                        total += attachment.size
+
+                if chosen and not await self.budget.acquire(total, self.budget_timeout):
+                    links.extend(chosen)
+                    chosen = []
+                else:
+                    reserved = total
+
+                for attachment in chosen:
+                    try:
+                        spool = await self._download(attachment)
+                    except (aiohttp.ClientError, ValueError) as e:
+                        print(f"❌ Ek aktarılamadı ({attachment.filename}): {e}")
+                        links.append(attachment)
+                        # Hand its share back now rather than when the message is sent
+                        await self.budget.release(attachment.size)
+                        reserved -= attachment.size
+                        continue
+
+                    spools.append(spool)
+                    files.append(discord.File(spool, attachment.filename, spoiler=attachment.is_spoiler()))
+
+                yield files, links
+        finally:
+            for spool in spools:
+                spool.close()
+            if reserved:
+                await self.budget.release(reserved)
+            slot[1] -= 1
+            if not slot[1]:
+                del self._user_slots[user_id]
+
+    def stats(self):
+        return {
+            'bytes_in_flight': self.budget.in_use,
+            'byte_budget': self.budget.limit,
+            'active_users': len(self._user_slots)
+        }
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
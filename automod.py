@@ -1,67 +1,124 @@
 import discord
 from discord.ext import commands, tasks
-import re
+import asyncio
 from utils.helpers import get_text
 from utils.embeds import create_embed
-from datetime import datetime
+from utils.spam_tracker import SpamTracker
+from utils.punishment_scheduler import ExpiryScheduler
+from utils.automod_rules import (
+    Rule, RuleEngine, check_links, check_invites, check_caps,
+    check_emoji_spam, check_mention_spam, check_blacklisted_words
+)
 
 class AutoMod(commands.Cog):
+    # Retry an expiry this many times, 5 minutes apart, while its guild is unavailable
+    EXPIRY_GUILD_RETRIES = 12
+    
     def __init__(self, bot):
         self.bot = bot
-        self.spam_tracker = {}
-        self.check_expired_punishments.start()
+        self.spam_tracker = SpamTracker()
+        
+        # Cheap stateful checks first; evaluation stops at the first deleting rule
+        self.rules = RuleEngine([
+            Rule('anti_spam', 'automod.spam_detected', self.check_spam),
+            Rule('anti_flood', 'automod.flood_detected', self.check_flood),
+            Rule('mention_filter', 'automod.mention_spam_detected', check_mention_spam),
+            Rule('anti_invite', 'automod.invite_detected', check_invites),
+            Rule('anti_link', 'automod.link_detected', check_links),
+            Rule('caps_filter', 'automod.caps_detected', check_caps),
+            Rule('emoji_filter', 'automod.emoji_spam_detected', check_emoji_spam),
+            Rule('word_filter', 'automod.blacklisted_word_detected', check_blacklisted_words)
+        ])
+        
+        # Timed mutes and bans fire at their due time, a few API calls at a time
+        self.expiry = ExpiryScheduler(self.expire_punishment, concurrency=5)
+        self.expiry_attempts = {}
+        self.expiry_task = None
+        self.sweep_spam_tracker.start()
+    
+    async def cog_load(self):
+        self.bot.db.expiry_schedulers.append(self.expiry)
+        self.expiry_task = asyncio.create_task(self.run_expiry_scheduler())
     
     async def cog_unload(self):
-        self.check_expired_punishments.cancel()
+        if self.expiry in self.bot.db.expiry_schedulers:
+            self.bot.db.expiry_schedulers.remove(self.expiry)
+        if self.expiry_task:
+            self.expiry_task.cancel()
+        self.sweep_spam_tracker.cancel()
     
     @tasks.loop(minutes=1)
-    async def check_expired_punishments(self):
-        """Check for expired mutes and bans."""
-        # Check expired mutes
-        expired_mutes = await self.bot.db.get_expired_mutes()
-        for guild_id, user_id in expired_mutes:
-            guild = self.bot.get_guild(guild_id)
-            if not guild:
-                continue
+    async def sweep_spam_tracker(self):
+        """Forget members who have been quiet longer than the spam windows."""
+        self.spam_tracker.sweep()
+    
+    async def run_expiry_scheduler(self):
+        """Load timed punishments and fire each one when it expires."""
+        await self.bot.wait_until_ready()
+        
+        for kind, guild_id, user_id, expires_at in await self.bot.db.get_pending_punishments():
+            try:
+                self.expiry.schedule(kind, guild_id, user_id, expires_at)
+            except (TypeError, ValueError):
+                print(f"❌ Geçersiz bitiş zamanı: {kind} {guild_id}/{user_id} -> {expires_at!r}")
+        
+        await self.expiry.run()
+    
+    async def expire_punishment(self, kind, guild_id, user_id):
+        """Lift an expired mute or ban. Returns seconds to retry after, if any."""
+        key = (kind, guild_id, user_id)
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            attempts = self.expiry_attempts.get(key, 0) + 1
+            if attempts < self.EXPIRY_GUILD_RETRIES:
+                # Guild may be temporarily unavailable
+                self.expiry_attempts[key] = attempts
+                return 300
             
+            # Still gone after an hour; the bot has most likely left the guild
+            self.expiry_attempts.pop(key, None)
+            print(f"⚠️ Sunucu bulunamadı, süresi dolan {kind} kaydı siliniyor: {guild_id}/{user_id}")
+            await self.clear_punishment(kind, guild_id, user_id)
+            return
+        self.expiry_attempts.pop(key, None)
+        
+        if kind == 'mute':
             member = guild.get_member(user_id)
             if not member:
                 await self.bot.db.remove_mute(guild_id, user_id)
-                continue
+                return
             
             settings = await self.bot.db.get_guild_settings(guild_id)
-            if settings and settings['mute_role']:
-                mute_role = guild.get_role(settings['mute_role'])
-                if mute_role and mute_role in member.roles:
-                    try:
-                        await member.remove_roles(mute_role, reason="Mute expired")
-                        await self.bot.db.remove_mute(guild_id, user_id)
-                        await self.bot.db.add_mod_log(
-                            guild_id, self.bot.user.id, user_id, "AUTO_UNMUTE", "Mute expired"
-                        )
-                    except discord.Forbidden:
-                        pass
+            mute_role = guild.get_role(settings['mute_role']) if settings and settings['mute_role'] else None
+            if mute_role and mute_role in member.roles:
+                try:
+                    await member.remove_roles(mute_role, reason="Mute expired")
+                except discord.Forbidden:
+                    # Retrying won't help until someone fixes the role order
+                    print(f"❌ Susturma kaldırılamadı (yetki yok), kayıt siliniyor: {guild_id}/{user_id}")
+                    await self.bot.db.remove_mute(guild_id, user_id)
+                    return
+                await self.bot.db.add_mod_log(
+                    guild_id, self.bot.user.id, user_id, "AUTO_UNMUTE", "Mute expired"
+                )
+            await self.bot.db.remove_mute(guild_id, user_id)
         
-        # Check expired bans
-        expired_bans = await self.bot.db.get_expired_bans()
-        for guild_id, user_id in expired_bans:
-            guild = self.bot.get_guild(guild_id)
-            if not guild:
-                continue
-            
+        elif kind == 'ban':
             try:
-                user = await self.bot.fetch_user(user_id)
-                await guild.unban(user, reason="Temporary ban expired")
-                await self.bot.db.remove_temp_ban(guild_id, user_id)
+                # No fetch_user round trip; unban only needs the ID
+                await guild.unban(discord.Object(id=user_id), reason="Temporary ban expired")
                 await self.bot.db.add_mod_log(
                     guild_id, self.bot.user.id, user_id, "AUTO_UNBAN", "Temporary ban expired"
                 )
             except (discord.NotFound, discord.Forbidden):
-                await self.bot.db.remove_temp_ban(guild_id, user_id)
+                pass
+            await self.bot.db.remove_temp_ban(guild_id, user_id)
     
-    @check_expired_punishments.before_loop
-    async def before_check_expired_punishments(self):
-        await self.bot.wait_until_ready()
+    async def clear_punishment(self, kind, guild_id, user_id):
+        if kind == 'mute':
+            await self.bot.db.remove_mute(guild_id, user_id)
+        else:
+            await self.bot.db.remove_temp_ban(guild_id, user_id)
     
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -77,137 +134,34 @@ class AutoMod(commands.Cog):
         if not settings:
             return
         
-        lang = await self.bot.db.get_language(message.guild.id)
-        violations = []
-        
-        # Anti-spam check
-        if settings['anti_spam']:
-            if await self.check_spam(message):
-                violations.append(get_text(self.bot.languages, lang, 'automod.spam_detected'))
-        
-        # Anti-flood check  
-        if settings['anti_flood']:
-            if await self.check_flood(message):
-                violations.append(get_text(self.bot.languages, lang, 'automod.flood_detected'))
-        
-        # Anti-link check
-        if settings['anti_link']:
-            if await self.check_links(message):
-                violations.append(get_text(self.bot.languages, lang, 'automod.link_detected'))
+        # Record once so anti-spam and anti-flood share the same history
+        if settings['anti_spam'] or settings['anti_flood']:
+            self.spam_tracker.record(message.guild.id, message.author.id, message.content)
         
-        # Anti-invite check
-        if settings['anti_invite']:
-            if await self.check_invites(message):
-                violations.append(get_text(self.bot.languages, lang, 'automod.invite_detected'))
-        
-        # Caps filter
-        if settings['caps_filter']:
-            if await self.check_caps(message):
-                violations.append(get_text(self.bot.languages, lang, 'automod.caps_detected'))
-        
-        # Emoji filter
-        if settings['emoji_filter']:
-            if await self.check_emoji_spam(message):
-                violations.append(get_text(self.bot.languages, lang, 'automod.emoji_spam_detected'))
-        
-        # Mention filter
-        if settings['mention_filter']:
-            if await self.check_mention_spam(message):
-                violations.append(get_text(self.bot.languages, lang, 'automod.mention_spam_detected'))
-        
-        # Word filter
+        matcher = None
         if settings['word_filter']:
-            if await self.check_blacklisted_words(message):
-                violations.append(get_text(self.bot.languages, lang, 'automod.blacklisted_word_detected'))
-        
-        # Take action if violations found
-        if violations:
-            await self.handle_violations(message, violations)
-    
-    async def check_spam(self, message):
-        """Check for spam (repeated messages)."""
-        user_id = message.author.id
-        content = message.content.lower()
-        
-        if user_id not in self.spam_tracker:
-            self.spam_tracker[user_id] = []
-        
-        self.spam_tracker[user_id].append((content, datetime.now()))
-        
-        # Keep only last 10 messages from last 30 seconds
-        cutoff = datetime.now().timestamp() - 30
-        self.spam_tracker[user_id] = [
-            (msg, time) for msg, time in self.spam_tracker[user_id][-10:]
-            if time.timestamp() > cutoff
-        ]
+            matcher = await self.bot.db.get_blacklist_matcher(message.guild.id)
         
-        # Check for repeated messages
-        if len(self.spam_tracker[user_id]) >= 5:
-            recent_messages = [msg for msg, time in self.spam_tracker[user_id][-5:]]
-            if len(set(recent_messages)) <= 2:  # Same or very similar messages
-                return True
-        
-        return False
-    
-    async def check_flood(self, message):
-        """Check for message flooding."""
-        user_id = message.author.id
-        
-        if user_id not in self.spam_tracker:
-            self.spam_tracker[user_id] = []
-        
-        now = datetime.now()
-        self.spam_tracker[user_id].append((message.content, now))
-        
-        # Check if user sent more than 10 messages in last 10 seconds
-        cutoff = now.timestamp() - 10
-        recent_count = sum(1 for msg, time in self.spam_tracker[user_id] if time.timestamp() > cutoff)
-        
-        return recent_count > 10
-    
-    async def check_links(self, message):
-        """Check for links."""
-        link_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-        return bool(re.search(link_pattern, message.content))
-    
-    async def check_invites(self, message):
-        """Check for Discord invite links."""
-        invite_pattern = r'discord(?:\.gg|app\.com\/invite)\/[a-zA-Z0-9]+'
-        return bool(re.search(invite_pattern, message.content))
-    
-    async def check_caps(self, message):
-        """Check for excessive caps."""
-        if len(message.content) < 10:
-            return False
-        
-        caps_count = sum(1 for char in message.content if char.isupper())
-        caps_ratio = caps_count / len(message.content)
+        hits = self.rules.evaluate(message, settings, matcher)
+        if not hits:
+            return
         
-        return caps_ratio > 0.7
-    
-    async def check_emoji_spam(self, message):
-        """Check for emoji spam."""
-        emoji_pattern = r'<:[^:]+:[0-9]+>|[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]'
-        emojis = re.findall(emoji_pattern, message.content)
+        lang = await self.bot.db.get_language(message.guild.id)
+        violations = [get_text(self.bot.languages, lang, rule.text_key) for rule, _ in hits]
+        details = [f"{rule.setting}: {result}" for rule, result in hits if isinstance(result, str)]
         
-        return len(emojis) > 10
+        if any(rule.deletes for rule, _ in hits):
+            await self.handle_violations(message, violations, details)
     
-    async def check_mention_spam(self, message):
-        """Check for mention spam."""
-        return len(message.mentions) > 5
+    def check_spam(self, message, features):
+        """Check for spam (repeated messages)."""
+        return self.spam_tracker.is_repeating(message.guild.id, message.author.id)
     
-    async def check_blacklisted_words(self, message):
-        """Check for blacklisted words."""
-        blacklisted = await self.bot.db.get_blacklisted_words(message.guild.id)
-        content_lower = message.content.lower()
-        
-        for word in blacklisted:
-            if word in content_lower:
-                return True
-        
-        return False
+    def check_flood(self, message, features):
+        """Check for message flooding (more than 10 messages in 10 seconds)."""
+        return self.spam_tracker.count_within(message.guild.id, message.author.id, 10) > 10
     
-    async def handle_violations(self, message, violations):
+    async def handle_violations(self, message, violations, details=None):
         """Handle auto-moderation violations."""
         try:
             # Delete the message
@@ -226,10 +180,13 @@ class AutoMod(commands.Cog):
             # Delete warning after 10 seconds
             await warning_msg.delete(delay=10)
             
-            # Log the action
+            # Log the action (matched terms go to the log, not the channel)
+            reason = f"Message deleted: {', '.join(violations)}"
+            if details:
+                reason += f" ({'; '.join(details)})"
             await self.bot.db.add_mod_log(
                 message.guild.id, self.bot.user.id, message.author.id, 
-                "AUTOMOD", f"Message deleted: {', '.join(violations)}"
+                "AUTOMOD", reason
             )
             
         except discord.Forbidden:
@@ -361,6 +318,33 @@ class AutoMod(commands.Cog):
         )
         await ctx.send(embed=embed)
     
+    @blacklist.command(name='normalize')
+    @commands.has_permissions(administrator=True)
+    async def blacklist_normalize(self, ctx, toggle: str):
+        """Toggle leetspeak/diacritic folding for blacklist matching."""
+        if toggle.lower() in ['aç', 'on', 'enable', 'açık']:
+            await self.bot.db.update_automod_setting(ctx.guild.id, 'word_filter_normalize', True)
+            status = "açık"
+            color = discord.Color.green()
+        elif toggle.lower() in ['kapat', 'off', 'disable', 'kapalı']:
+            await self.bot.db.update_automod_setting(ctx.guild.id, 'word_filter_normalize', False)
+            status = "kapalı"
+            color = discord.Color.red()
+        else:
+            embed = create_embed(
+                title="❌ Geçersiz seçenek!",
+                description="Kullanım: `blacklist normalize [aç/kapat]`",
+                color=discord.Color.red()
+            )
+            return await ctx.send(embed=embed)
+        
+        embed = create_embed(
+            title=f"✅ Kelime normalizasyonu {status}!",
+            description="Açıkken `k3lime` ve `kélime` gibi yazımlar da `kelime` ile eşleşir.",
+            color=color
+        )
+        await ctx.send(embed=embed)
+    
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def automod(self, ctx):
@@ -381,10 +365,32 @@ class AutoMod(commands.Cog):
             embed.add_field(name="😀 Emoji Filter", value="✅ Açık" if settings['emoji_filter'] else "❌ Kapalı", inline=True)
             embed.add_field(name="👤 Mention Filter", value="✅ Açık" if settings['mention_filter'] else "❌ Kapalı", inline=True)
             embed.add_field(name="📝 Word Filter", value="✅ Açık" if settings['word_filter'] else "❌ Kapalı", inline=True)
+            embed.add_field(name="🔤 Kelime Normalizasyonu", value="✅ Açık" if settings['word_filter_normalize'] else "❌ Kapalı", inline=True)
         else:
             embed.description = "Otomatik moderasyon ayarları yapılmamış."
         
         await ctx.send(embed=embed)
+    
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def automodstats(self, ctx):
+        """Show per-rule automod timing."""
+        embed = create_embed(
+            title="⏱️ Otomatik Moderasyon Performansı",
+            color=discord.Color.purple()
+        )
+        
+        for setting, timing in self.rules.timing_report().items():
+            embed.add_field(
+                name=setting,
+                value=f"**Çağrı:** {timing['calls']}\n**İhlal:** {timing['hits']}\n**Ort.:** {timing['avg_us']:.1f} µs",
+                inline=True
+            )
+        
+        embed.set_footer(
+            text=f"Spam takibi: {len(self.spam_tracker)} üye, ~{self.spam_tracker.memory_usage() // 1024} KB"
+        )
+        await ctx.send(embed=embed)
 
 async def setup(bot):
     await bot.add_cog(AutoMod(bot))
@@ -0,0 +1,171 @@
+import re
+import time
+
+LINK_PATTERN = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+INVITE_PATTERN = re.compile(r'discord(?:\.gg|app\.com\/invite)\/[a-zA-Z0-9]+')
+
+# One scanner for every token the rules care about, so the content is only
+# walked once by the regex engine.
+TOKEN_PATTERN = re.compile(
+    r'(?P<link>' + LINK_PATTERN.pattern + r')'
+    r'|(?P<invite>' + INVITE_PATTERN.pattern + r')'
+    r'|(?P<emoji><:[^:]+:[0-9]+>)'
+)
+
+EMOJI_RANGES = (
+    (0x1F600, 0x1F64F),
+    (0x1F300, 0x1F5FF),
+    (0x1F680, 0x1F6FF),
+    (0x1F1E0, 0x1F1FF)
+)
+
+
+class MessageFeatures:
+    """Counts every rule needs, gathered in a single pass over the message."""
+
+    __slots__ = ('content', 'length', 'caps', 'emojis', 'links', 'invites', 'mentions', 'matcher')
+
+    def __init__(self, message, matcher=None):
+        content = message.content
+        self.content = content
+        self.length = len(content)
+        self.mentions = len(message.mentions)
+        self.matcher = matcher
+
+        caps = 0
+        emojis = 0
+        for char in content:
+            if char.isupper():
+                caps += 1
+            elif ord(char) >= 0x1F1E0:
+                code = ord(char)
+                if any(low <= code <= high for low, high in EMOJI_RANGES):
+                    emojis += 1
+        self.caps = caps
+
+        links = 0
+        invites = 0
+        for match in TOKEN_PATTERN.finditer(content):
+            kind = match.lastgroup
+            if kind == 'link':
+                links += 1
+                # An invite written as a full URL is consumed by the link token
+                if INVITE_PATTERN.search(match.group()):
+                    invites += 1
+            elif kind == 'invite':
+                invites += 1
+            else:
+                emojis += 1
+
+        self.emojis = emojis
+        self.links = links
+        self.invites = invites
+
+
+def check_links(message, features):
+    """Check for links."""
+    return features.links > 0
+
+
+def check_invites(message, features):
+    """Check for Discord invite links."""
+    return features.invites > 0
+
+
+def check_caps(message, features):
+    """Check for excessive caps."""
+    if features.length < 10:
+        return False
+    return features.caps / features.length > 0.7
+
+
+def check_emoji_spam(message, features):
+    """Check for emoji spam."""
+    return features.emojis > 10
+
+
+def check_mention_spam(message, features):
+    """Check for mention spam."""
+    return features.mentions > 5
+
+
+def check_blacklisted_words(message, features):
+    """Return the first blacklisted term in the message, if any."""
+    if features.matcher is None:
+        return None
+    return features.matcher.find(features.content)
+
+
+class Rule:
+    """A single automod rule.
+
+    ``setting`` is the automod_settings column that enables it and ``text_key``
+    the language key shown to the user. ``check(message, features)`` returns
+    a falsy value, True, or a string describing what matched.
+    """
+
+    __slots__ = ('setting', 'text_key', 'check', 'deletes')
+
+    def __init__(self, setting, text_key, check, deletes=True):
+        self.setting = setting
+        self.text_key = text_key
+        self.check = check
+        self.deletes = deletes
+
+
+class RuleEngine:
+    """Evaluates a guild's enabled rules against one feature pass.
+
+    Plans (the ordered tuple of enabled rules) are compiled once per distinct
+    combination of settings and shared between guilds. Evaluation stops at
+    the first rule that deletes the message.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.timings = {rule.setting: {'calls': 0, 'hits': 0, 'total_ns': 0} for rule in self.rules}
+        self._plans = {}
+
+    def plan(self, settings):
+        """Return the enabled rules for a settings dict, in evaluation order."""
+        key = tuple(bool(settings.get(rule.setting)) for rule in self.rules)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = tuple(rule for rule, enabled in zip(self.rules, key) if enabled)
+            self._plans[key] = plan
+        return plan
+
+    def evaluate(self, message, settings, matcher=None):
+        """Run the plan and return a list of ``(rule, result)`` hits."""
+        plan = self.plan(settings)
+        if not plan:
+            return []
+
+        features = MessageFeatures(message, matcher)
+        hits = []
+        for rule in plan:
+            started = time.perf_counter_ns()
+            result = rule.check(message, features)
+            timing = self.timings[rule.setting]
+            timing['calls'] += 1
+            timing['total_ns'] += time.perf_counter_ns() - started
+
+            if result:
+                timing['hits'] += 1
+                hits.append((rule, result))
+                if rule.deletes:
+                    break
+
+        return hits
+
+    def timing_report(self):
+        """Return per-rule call counts, hit counts and mean latency in µs."""
+        report = {}
+        for setting, timing in self.timings.items():
+            calls = timing['calls']
+            report[setting] = {
+                'calls': calls,
+                'hits': timing['hits'],
+                'avg_us': timing['total_ns'] / calls / 1000 if calls else 0.0
+            }
+        return report
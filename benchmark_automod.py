@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+AutoMod benchmark harness.
+Sahte Message/Member/Guild nesneleriyle AutoMod.on_message'a trafik oynatır;
+Discord bağlantısı gerekmez.
+
+Kullanım:
+    python benchmark_automod.py --mix mixed --messages 20000 --guilds 50
+    python benchmark_automod.py --mix all --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from database import Database
+from cogs.automod import AutoMod
+
+
+# Fake Discord objects
+class FakePermissions:
+    def __init__(self, manage_messages=False):
+        self.manage_messages = manage_messages
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.name = f"guild-{guild_id}"
+
+    def get_member(self, user_id):
+        return None
+
+    def get_role(self, role_id):
+        return None
+
+
+class FakeMember:
+    def __init__(self, user_id, guild=None, bot=False):
+        self.id = user_id
+        self.guild = guild
+        self.bot = bot
+        self.name = f"user-{user_id}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.guild_permissions = FakePermissions()
+
+
+class FakeChannel:
+    def __init__(self, channel_id, guild):
+        self.id = channel_id
+        self.guild = guild
+        self.sent = 0
+
+    async def send(self, content=None, embed=None, **kwargs):
+        self.sent += 1
+        return FakeMessage("", None, self.guild, self)
+
+
+class FakeMessage:
+    def __init__(self, content, author, guild, channel, mentions=()):
+        self.content = content
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+        self.mentions = list(mentions)
+        self.deleted = False
+
+    async def delete(self, delay=None):
+        self.deleted = True
+
+
+class FakeBot:
+    def __init__(self, db):
+        self.db = db
+        self.user = FakeMember(1)
+        self.languages = {}
+
+        for lang in ('tr', 'en'):
+            path = Path('languages') / f'{lang}.json'
+            if path.exists():
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.languages[lang] = json.load(f)
+
+
+class QueryCounter:
+    """Counts statements that actually reach SQLite (cache hits are free)."""
+
+    def __init__(self, db):
+        self.reads = 0
+        self.writes = 0
+
+        read, write, write_many = db._read, db._write, db._write_many
+
+        def counted_read(query, params):
+            self.reads += 1
+            return read(query, params)
+
+        def counted_write(query, params):
+            self.writes += 1
+            return write(query, params)
+
+        def counted_write_many(statements):
+            self.writes += sum(len(rows) for _, rows in statements)
+            return write_many(statements)
+
+        db._read, db._write, db._write_many = counted_read, counted_write, counted_write_many
+
+    def reset(self):
+        self.reads = 0
+        self.writes = 0
+
+
+# Traffic mixes
+WORDS = ["merhaba", "selam", "nasılsın", "bugün", "oyun", "maç", "hello", "yes", "discord", "sunucu"]
+
+
+def random_word(rng, length=7):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def chat_line(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 14)))
+
+
+class Traffic:
+    def __init__(self, rng, guild_count, members_per_guild):
+        self.rng = rng
+        self.guilds = [FakeGuild(1000 + i) for i in range(guild_count)]
+        self.channels = {guild.id: FakeChannel(guild.id * 10, guild) for guild in self.guilds}
+        self.members = {
+            guild.id: [FakeMember(guild.id * 100000 + j, guild) for j in range(members_per_guild)]
+            for guild in self.guilds
+        }
+
+    def message(self, content, guild=None, author=None, mentions=()):
+        guild = guild or self.rng.choice(self.guilds)
+        author = author or self.rng.choice(self.members[guild.id])
+        return FakeMessage(content, author, guild, self.channels[guild.id], mentions)
+
+
+def mix_clean(traffic, count, blacklist):
+    rng = traffic.rng
+    return [traffic.message(chat_line(rng)) for _ in range(count)]
+
+
+def mix_spam_burst(traffic, count, blacklist):
+    """A few members repeating the same line in tight bursts over normal chat."""
+    rng = traffic.rng
+    messages = []
+    while len(messages) < count:
+        if rng.random() < 0.3:
+            guild = rng.choice(traffic.guilds)
+            author = rng.choice(traffic.members[guild.id])
+            line = chat_line(rng)
+            messages.extend(traffic.message(line, guild, author) for _ in range(rng.randint(6, 15)))
+        else:
+            messages.append(traffic.message(chat_line(rng)))
+    return messages[:count]
+
+
+def mix_link_flood(traffic, count, blacklist):
+    rng = traffic.rng
+    messages = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.4:
+            content = f"{chat_line(rng)} https://{random_word(rng)}.com/{random_word(rng)}"
+        elif roll < 0.6:
+            content = f"gel katıl discord.gg/{random_word(rng, 8)}"
+        else:
+            content = chat_line(rng)
+        messages.append(traffic.message(content))
+    return messages
+
+
+def mix_large_blacklist(traffic, count, blacklist):
+    rng = traffic.rng
+    messages = []
+    for _ in range(count):
+        content = chat_line(rng)
+        if blacklist and rng.random() < 0.1:
+            content += " " + rng.choice(blacklist)
+        messages.append(traffic.message(content))
+    return messages
+
+
+def mix_mixed(traffic, count, blacklist):
+    rng = traffic.rng
+    generators = (mix_clean, mix_spam_burst, mix_link_flood, mix_large_blacklist)
+    messages = []
+    chunk = max(1, count // 20)
+    while len(messages) < count:
+        messages.extend(rng.choice(generators)(traffic, chunk, blacklist))
+    messages = messages[:count]
+    # Caps and emoji/mention spam sprinkled in
+    for message in rng.sample(messages, len(messages) // 20):
+        if rng.random() < 0.5:
+            message.content = message.content.upper() + " BU NE YA"
+        else:
+            message.content += " 😀" * 12
+            message.mentions = [traffic.rng.choice(traffic.members[message.guild.id]) for _ in range(6)]
+    return messages
+
+
+MIXES = {
+    'clean': mix_clean,
+    'spam_burst': mix_spam_burst,
+    'link_flood': mix_link_flood,
+    'large_blacklist': mix_large_blacklist,
+    'mixed': mix_mixed,
+    'many_guilds': mix_mixed,
+}
+
+# Mixes that override the command-line shape; many_guilds spreads traffic
+# thinly so the config cache and per-guild matchers are mostly cold
+MIX_OVERRIDES = {
+    'many_guilds': {'guilds': 2000, 'members': 20, 'blacklist_size': 100},
+}
+
+
+# Measurement
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def instrument_rules(cog):
+    """Wrap every rule check to collect per-call latency samples in µs."""
+    samples = {rule.setting: [] for rule in cog.rules.rules}
+
+    for rule in cog.rules.rules:
+        check = rule.check
+        bucket = samples[rule.setting]
+
+        def timed(message, features, check=check, bucket=bucket):
+            started = time.perf_counter_ns()
+            try:
+                return check(message, features)
+            finally:
+                bucket.append((time.perf_counter_ns() - started) / 1000)
+
+        rule.check = timed
+
+    return samples
+
+
+async def seed_database(db, traffic, blacklist):
+    guild_ids = [(guild.id,) for guild in traffic.guilds]
+    await db.execute_many([
+        ("INSERT OR IGNORE INTO guild_settings (guild_id) VALUES (?)", guild_ids),
+        (
+            "INSERT OR REPLACE INTO automod_settings (guild_id, anti_spam, anti_flood, anti_link, "
+            "anti_invite, caps_filter, emoji_filter, mention_filter, word_filter) "
+            "VALUES (?, 1, 1, 1, 1, 1, 1, 1, 1)",
+            guild_ids
+        ),
+        (
+            "INSERT OR IGNORE INTO blacklisted_words (guild_id, word) VALUES (?, ?)",
+            [(guild.id, word) for guild in traffic.guilds for word in blacklist]
+        ),
+    ])
+
+
+async def run_mix(name, args):
+    args = argparse.Namespace(**{**vars(args), **MIX_OVERRIDES.get(name, {})})
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="automod-bench-")
+    db = Database(os.path.join(workdir, "bench.db"))
+    await db.init_db()
+
+    traffic = Traffic(rng, args.guilds, args.members)
+    blacklist = [random_word(rng, rng.randint(4, 10)) for _ in range(args.blacklist_size)]
+    await seed_database(db, traffic, blacklist)
+
+    counter = QueryCounter(db)
+    bot = FakeBot(db)
+    cog = AutoMod(bot)
+    samples = instrument_rules(cog)
+
+    # One continuous stream; the warmup prefix is never replayed in the timed run,
+    # so its spam, flood and duplicate history can't skew the measured mix
+    stream = MIXES[name](traffic, args.warmup + args.messages, blacklist)
+    warmup, messages = stream[:args.warmup], stream[args.warmup:]
+
+    # Warm caches so the run measures the steady state
+    for message in warmup:
+        await cog.on_message(message)
+    counter.reset()
+    for bucket in samples.values():
+        bucket.clear()
+
+    latencies = []
+    started = time.perf_counter()
+    for message in messages:
+        begin = time.perf_counter_ns()
+        await cog.on_message(message)
+        latencies.append((time.perf_counter_ns() - begin) / 1000)
+    elapsed = time.perf_counter() - started
+
+    cog.sweep_spam_tracker.cancel()
+    await db.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    deleted = sum(1 for message in messages if message.deleted)
+    return {
+        'mix': name,
+        'messages': len(messages),
+        'guilds': args.guilds,
+        'blacklist_size': args.blacklist_size,
+        'msgs_per_sec': len(messages) / elapsed if elapsed else 0.0,
+        'p50_us': percentile(latencies, 50),
+        'p99_us': percentile(latencies, 99),
+        'deleted': deleted,
+        'db_reads_per_msg': counter.reads / len(messages),
+        'db_writes_per_msg': counter.writes / len(messages),
+        'checks': {
+            setting: {
+                'calls': len(bucket),
+                'p50_us': percentile(bucket, 50),
+                'p99_us': percentile(bucket, 99),
+            }
+            for setting, bucket in samples.items()
+        },
+    }
+
+
+def print_report(result):
+    print(f"\n📊 {result['mix']} — {result['messages']} mesaj, {result['guilds']} sunucu, "
+          f"{result['blacklist_size']} yasaklı kelime")
+    print(f"   {result['msgs_per_sec']:.0f} mesaj/sn | p50 {result['p50_us']:.1f} µs | "
+          f"p99 {result['p99_us']:.1f} µs | silinen {result['deleted']}")
+    print(f"   DB sorgusu/mesaj: {result['db_reads_per_msg']:.3f} okuma, "
+          f"{result['db_writes_per_msg']:.3f} yazma")
+    print(f"   {'kontrol':<16}{'çağrı':>10}{'p50 µs':>10}{'p99 µs':>10}")
+    for setting, check in result['checks'].items():
+        print(f"   {setting:<16}{check['calls']:>10}{check['p50_us']:>10.1f}{check['p99_us']:>10.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="AutoMod on_message benchmark")
+    parser.add_argument('--mix', default='mixed', choices=sorted(MIXES) + ['all'])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--guilds', type=int, default=50)
+    parser.add_argument('--members', type=int, default=200, help="members per guild")
+    parser.add_argument('--blacklist-size', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    names = sorted(MIXES) if args.mix == 'all' else [args.mix]
+
+    results = [await run_mix(name, args) for name in names]
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        for result in results:
+            print_report(result)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,9 +3,11 @@ from discord.ext import commands
 import asyncio
 import json
 import logging
+import os
 from database import Database
 from utils.helpers import get_text
 from utils.embeds import create_embed
+from utils.metrics import registry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,6 +33,12 @@ class IronWardBot(commands.Bot):
         self.db = Database()
         self.languages = {}
 
+        # Served at /metrics on METRICS_PORT by this process (0 disables)
+        self.metrics = registry
+        self.db.metrics = registry
+        self.loop_lag_task = None
+        self.metrics_runner = None
+
     async def setup_hook(self):
         """Called when the bot is starting up."""
         # Load language files
@@ -42,8 +50,36 @@ class IronWardBot(commands.Bot):
         # Initialize database
         await self.db.init_db()
 
+        self.loop_lag_task = asyncio.create_task(self.metrics.monitor_loop_lag())
+        await self.start_metrics_server()
+
         print("✅ Bot kurulumu tamamlandı!")
 
+    async def start_metrics_server(self):
+        """Expose the metrics registry over HTTP for Prometheus to scrape."""
+        port = int(os.getenv('METRICS_PORT', 9100))
+        if not port:
+            return
+
+        host = os.getenv('METRICS_HOST', '0.0.0.0')
+        try:
+            self.metrics_runner = await self.metrics.serve(host, port)
+            print(f"✅ Metrikler http://{host}:{port}/metrics adresinde")
+        except OSError as e:
+            print(f"❌ Metrik sunucusu başlatılamadı: {e}")
+
+    async def close(self):
+        """Shut down the bot and release database resources."""
+        if self.loop_lag_task:
+            self.loop_lag_task.cancel()
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
+
+        await super().close()
+
+        # Flushes buffered mod logs and warnings before closing connections
+        await self.db.close()
+
     async def load_languages(self):
         """Load language files."""
         try:
@@ -84,6 +120,19 @@ class IronWardBot(commands.Bot):
             except Exception as e:
                 print(f"❌ {cog} yüklenirken hata: {e}")
 
+    async def add_cog(self, cog, **kwargs):
+        """Add a cog with its listeners wrapped for latency metrics."""
+        self.metrics.instrument_cog(cog)
+        await super().add_cog(cog, **kwargs)
+
+    async def invoke(self, ctx):
+        """Invoke a command and record how long it took."""
+        if ctx.command is None:
+            return await super().invoke(ctx)
+
+        with self.metrics.timer('ironward_command_duration_seconds', command=ctx.command.qualified_name):
+            await super().invoke(ctx)
+
     async def get_prefix(self, message):
         """Get command prefix for guild."""
         if not message.guild:
@@ -141,6 +190,12 @@ class IronWardBot(commands.Bot):
 
     async def on_command_error(self, ctx, error):
         """Global error handler."""
+        if ctx.command is not None:
+            self.metrics.inc(
+                'ironward_command_errors_total',
+                command=ctx.command.qualified_name, error=type(error).__name__
+            )
+
         lang = await self.db.get_language(ctx.guild.id) if ctx.guild else 'tr'
 
         if isinstance(error, commands.CommandNotFound):
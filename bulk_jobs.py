@@ -0,0 +1,82 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import discord
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit for API calls that follows the rate limit budget.
+
+    discord.py sleeps inside a request when its rate limit bucket is empty,
+    so a call taking several times longer than usual means the budget is
+    spent. The limit grows by one for every ``limit`` fast calls and halves
+    (at most once per ``cooldown`` seconds) on a slow one.
+    """
+
+    def __init__(self, minimum=1, maximum=10, slow_factor=3.0, cooldown=1.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.slow_factor = slow_factor
+        self.cooldown = cooldown
+
+        self.limit = minimum
+        self.baseline = None
+        self._active = 0
+        self._fast_calls = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    def _record(self, duration):
+        now = time.monotonic()
+        if self.baseline is not None and duration > self.baseline * self.slow_factor:
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(self.minimum, self.limit // 2)
+                self._last_decrease = now
+            self._fast_calls = 0
+            return
+
+        # Moving average of unthrottled latency
+        self.baseline = duration if self.baseline is None else self.baseline * 0.9 + duration * 0.1
+        self._fast_calls += 1
+        if self._fast_calls >= self.limit:
+            self.limit = min(self.maximum, self.limit + 1)
+            self._fast_calls = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait for a free slot and time the call made inside the block."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._record(time.monotonic() - started)
+            async with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+
+class ThrottledProgress:
+    """Edits a progress message at most once every ``interval`` seconds."""
+
+    def __init__(self, message, interval=5.0):
+        self.message = message
+        self.interval = interval
+        self._last_edit = 0.0
+
+    async def update(self, embed, force=False):
+        if self.message is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_edit < self.interval:
+            return
+
+        self._last_edit = now
+        try:
+            await self.message.edit(embed=embed)
+        except discord.HTTPException:
+            pass
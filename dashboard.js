@@ -6,6 +6,7 @@
 // Global variables
 let refreshInterval = null;
 let notificationPermission = false;
+let dashboardStream = null;
 
 // Initialize dashboard when DOM is loaded
 $(document).ready(function() {
@@ -74,7 +75,8 @@ function initializeTooltips() {
 function initializeAutoRefresh() {
     const refreshRate = localStorage.getItem('autoRefreshRate') || 30000; // 30 seconds default
     
-    if (refreshRate > 0) {
+    // The live stream pushes the same data; only poll without it
+    if (refreshRate > 0 && !window.EventSource) {
         refreshInterval = setInterval(() => {
             refreshDashboardData();
         }, refreshRate);
@@ -165,13 +167,30 @@ function initializeKeyboardShortcuts() {
  * Initialize real-time updates
  */
 function initializeRealTimeUpdates() {
-    // Simulated WebSocket connection for real-time updates
-    // In a real implementation, this would connect to a WebSocket server
+    const stream = getDashboardStream();
+    if (!stream) return;
     
-    setInterval(() => {
-        // Simulate receiving real-time data
-        updateRealTimeStats();
-    }, 5000);
+    stream.addEventListener('stats', event => {
+        updateStatsDisplay(JSON.parse(event.data));
+    });
+    
+    stream.addEventListener('activity', event => {
+        prependRecentActivity(JSON.parse(event.data));
+    });
+}
+
+/**
+ * Shared Server-Sent Events connection; one per tab
+ */
+function getDashboardStream() {
+    if (!window.EventSource) return null;
+    
+    if (!dashboardStream) {
+        // EventSource reconnects by itself and resends Last-Event-ID
+        dashboardStream = new EventSource('/api/stream');
+        window.addEventListener('beforeunload', () => dashboardStream.close());
+    }
+    return dashboardStream;
 }
 
 /**
@@ -287,32 +306,60 @@ function updateRecentActivityDisplay(data) {
         return;
     }
     
-    let html = '';
-    
     if (data.length === 0) {
-        html = '<div class="text-center text-muted py-4">Henüz aktivite bulunmuyor.</div>';
-    } else {
-        data.forEach(activity => {
-            const date = new Date(activity.timestamp).toLocaleString('tr-TR');
-            const badgeClass = getBadgeClassForAction(activity.action);
-            
-            html += `
-                <div class="border-bottom border-dark pb-2 mb-2 fade-in">
-                    <div class="d-flex justify-content-between align-items-start">
-                        <div>
-                            <span class="badge ${badgeClass}">${activity.action}</span>
-                            <small class="text-muted d-block">
-                                User: ${activity.target_id} | Moderator: ${activity.moderator_id}
-                            </small>
-                        </div>
-                        <small class="text-muted">${date}</small>
-                    </div>
-                </div>
-            `;
-        });
+        container.innerHTML = '<div class="text-center text-muted py-4">Henüz aktivite bulunmuyor.</div>';
+        return;
     }
     
-    container.innerHTML = html;
+    container.replaceChildren(...data.map(createActivityItem));
+}
+
+/**
+ * Build one recent activity row; database fields only ever go in as text
+ */
+function createActivityItem(activity) {
+    const item = document.createElement('div');
+    item.className = 'border-bottom border-dark pb-2 mb-2 fade-in';
+    
+    const row = document.createElement('div');
+    row.className = 'd-flex justify-content-between align-items-start';
+    
+    const details = document.createElement('div');
+    const badge = document.createElement('span');
+    badge.className = `badge ${getBadgeClassForAction(activity.action)}`;
+    badge.textContent = activity.action;
+    const people = document.createElement('small');
+    people.className = 'text-muted d-block';
+    people.textContent = `User: ${activity.target_id} | Moderator: ${activity.moderator_id}`;
+    details.append(badge, people);
+    
+    const date = document.createElement('small');
+    date.className = 'text-muted';
+    date.textContent = new Date(activity.timestamp).toLocaleString('tr-TR');
+    
+    row.append(details, date);
+    item.appendChild(row);
+    return item;
+}
+
+/**
+ * Add streamed activity to the top of the recent activity list
+ */
+function prependRecentActivity(activities) {
+    const container = document.getElementById('recent-activity-list');
+    if (!container || !Array.isArray(activities)) return;
+    
+    const placeholder = container.querySelector('.text-center');
+    if (placeholder) placeholder.remove();
+    
+    activities.forEach(activity => {
+        container.prepend(createActivityItem(activity));
+    });
+    
+    // Keep the list as long as the initial load
+    while (container.children.length > 10) {
+        container.lastElementChild.remove();
+    }
 }
 
 /**
@@ -485,36 +532,6 @@ function searchUsers(query) {
     console.log('Searching users for:', query);
 }
 
-/**
- * Update real-time stats
- */
-function updateRealTimeStats() {
-    // Simulate real-time stat updates
-    const stats = ['total-warnings', 'active-bans', 'active-mutes'];
-    
-    stats.forEach(statId => {
-        const element = document.getElementById(statId);
-        if (element && Math.random() > 0.7) { // 30% chance to update
-            const currentValue = parseInt(element.textContent) || 0;
-            const change = Math.floor(Math.random() * 3) - 1; // -1, 0, or 1
-            const newValue = Math.max(0, currentValue + change);
-            
-            if (newValue !== currentValue) {
-                animateNumber(element, currentValue, newValue);
-                
-                // Add visual indicator for changes
-                const indicator = document.createElement('span');
-                indicator.className = change > 0 ? 'text-success' : 'text-danger';
-                indicator.textContent = change > 0 ? '+' + change : change;
-                indicator.style.fontSize = '0.75rem';
-                element.parentNode.appendChild(indicator);
-                
-                setTimeout(() => indicator.remove(), 2000);
-            }
-        }
-    });
-}
-
 /**
  * Refresh analytics charts
  */
@@ -548,7 +565,10 @@ function exportData(type, format = 'csv') {
     showLoadingIndicator();
     
     fetch(`/api/export/${type}?format=${format}`)
-        .then(response => response.blob())
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.blob();
+        })
         .then(blob => {
             const url = window.URL.createObjectURL(blob);
             const a = document.createElement('a');
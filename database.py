@@ -1,250 +1,561 @@
 import sqlite3
 import asyncio
 import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from guild_cache import GuildConfigCache, MISSING
+from write_buffer import WriteBehindBuffer
+from rollups import install_rollups
+from pagination import install_pagination_indexes
+from word_filter import BlacklistMatcher
 
 class Database:
-    def __init__(self, db_path="moderation_bot.db"):
+    def __init__(self, db_path="moderation_bot.db", pool_size=4, cache_ttl=300, cache_size=10000):
         self.db_path = db_path
+        self.pool_size = pool_size
+
+        # Writes are serialized on one connection; reads use a small pool.
         self.lock = asyncio.Lock()
+        # One permit per reader connection, taken before work reaches the executor
+        self._reader_slots = asyncio.Semaphore(pool_size)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size + 1, thread_name_prefix="ironward-db")
+        self._writer = None
+        self._readers = queue.Queue()
+        self._reader_count = 0
+        self._pool_lock = threading.Lock()
+        self._closed = False
+        self.schema_version = None
+        # Optional MetricsRegistry; set by the bot
+        self.metrics = None
+
+        # Log-style inserts are group-committed in the background.
+        self.writes = WriteBehindBuffer(self)
+
+        # Per-guild config cache. The TTL bounds staleness for edits made by
+        # the dashboard, which writes the same tables from another process.
+        self.cache = GuildConfigCache(max_guilds=cache_size, ttl=cache_ttl)
+
+        # Schedulers notified when timed bans and mutes are added or lifted
+        self.expiry_schedulers = []
 
     async def init_db(self):
-        """Initialize database tables."""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Guild settings table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS guild_settings (
-                    guild_id INTEGER PRIMARY KEY,
-                    language TEXT DEFAULT 'tr',
-                    prefix TEXT DEFAULT '!',
-                    welcome_channel INTEGER,
-                    goodbye_channel INTEGER,
-                    log_channel INTEGER,
-                    auto_role INTEGER,
-                    mute_role INTEGER,
-                    ticket_category INTEGER
-                )
-            ''')
-
-            # Warnings table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS warnings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    moderator_id INTEGER,
-                    reason TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # Temporary bans table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS temp_bans (
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    expires_at DATETIME,
-                    reason TEXT,
-                    PRIMARY KEY (guild_id, user_id)
-                )
-            ''')
-
-            # Muted users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS muted_users (
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    expires_at DATETIME,
-                    reason TEXT,
-                    PRIMARY KEY (guild_id, user_id)
-                )
-            ''')
-
-            # Auto-moderation settings
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS automod_settings (
-                    guild_id INTEGER PRIMARY KEY,
-                    anti_spam BOOLEAN DEFAULT 0,
-                    anti_flood BOOLEAN DEFAULT 0,
-                    anti_link BOOLEAN DEFAULT 0,
-                    anti_invite BOOLEAN DEFAULT 0,
-                    caps_filter BOOLEAN DEFAULT 0,
-                    emoji_filter BOOLEAN DEFAULT 0,
-                    mention_filter BOOLEAN DEFAULT 0,
-                    word_filter BOOLEAN DEFAULT 0
-                )
-            ''')
-
-            # Blacklisted words
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS blacklisted_words (
-                    guild_id INTEGER,
-                    user_id INTEGER,
-                    moderator_id INTEGER,
-                    reason TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # Moderation logs
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS mod_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER,
-                    moderator_id INTEGER,
-                    target_id INTEGER,
-                    action TEXT,
-                    reason TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-
-            # Additional tables for new features
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ticket_messages (
-                    guild_id INTEGER,
-                    message_id INTEGER,  
-                    channel_id INTEGER,
-                    PRIMARY KEY (guild_id, message_id)
-                )
-            ''')
-
-            # Reaction roles table
-            await self.execute_query("""
-                CREATE TABLE IF NOT EXISTS reaction_roles (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER NOT NULL,
-                    message_id INTEGER NOT NULL,
-                    emoji TEXT NOT NULL,
-                    role_id INTEGER NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Blacklisted words table
-            await self.execute_query("""
-                CREATE TABLE IF NOT EXISTS blacklisted_words (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER NOT NULL,
-                    word TEXT NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(guild_id, word)
+        """Initialize database tables and apply pending migrations."""
+        self.schema_version = await self._run_guarded(self.lock, self._migrate)
+
+        self.writes.start()
+
+    # Schema Migrations
+    def _migration_initial_schema(self, cursor):
+        # Guild settings table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS guild_settings (
+                guild_id INTEGER PRIMARY KEY,
+                language TEXT DEFAULT 'tr',
+                prefix TEXT DEFAULT '!',
+                welcome_channel INTEGER,
+                goodbye_channel INTEGER,
+                log_channel INTEGER,
+                auto_role INTEGER,
+                mute_role INTEGER,
+                ticket_category INTEGER
+            )
+        ''')
+
+        # Warnings table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS warnings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER,
+                user_id INTEGER,
+                moderator_id INTEGER,
+                reason TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Temporary bans table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS temp_bans (
+                guild_id INTEGER,
+                user_id INTEGER,
+                expires_at DATETIME,
+                reason TEXT,
+                PRIMARY KEY (guild_id, user_id)
+            )
+        ''')
+
+        # Muted users table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS muted_users (
+                guild_id INTEGER,
+                user_id INTEGER,
+                expires_at DATETIME,
+                reason TEXT,
+                PRIMARY KEY (guild_id, user_id)
+            )
+        ''')
+
+        # Auto-moderation settings
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS automod_settings (
+                guild_id INTEGER PRIMARY KEY,
+                anti_spam BOOLEAN DEFAULT 0,
+                anti_flood BOOLEAN DEFAULT 0,
+                anti_link BOOLEAN DEFAULT 0,
+                anti_invite BOOLEAN DEFAULT 0,
+                caps_filter BOOLEAN DEFAULT 0,
+                emoji_filter BOOLEAN DEFAULT 0,
+                mention_filter BOOLEAN DEFAULT 0,
+                word_filter BOOLEAN DEFAULT 0
+            )
+        ''')
+
+        # Moderation logs
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mod_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER,
+                moderator_id INTEGER,
+                target_id INTEGER,
+                action TEXT,
+                reason TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Additional tables for new features
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_messages (
+                guild_id INTEGER,
+                message_id INTEGER,
+                channel_id INTEGER,
+                PRIMARY KEY (guild_id, message_id)
+            )
+        ''')
+
+        # Reaction roles table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS reaction_roles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                emoji TEXT NOT NULL,
+                role_id INTEGER NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    def _migration_blacklisted_words(self, cursor):
+        # Older databases got a copy of the warnings schema here, which has no
+        # word column; nothing in it is usable, so it is replaced outright.
+        if self._table_exists(cursor, 'blacklisted_words') and \
+                'word' not in self._table_columns(cursor, 'blacklisted_words'):
+            cursor.execute("DROP TABLE blacklisted_words")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS blacklisted_words (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER NOT NULL,
+                word TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(guild_id, word)
+            )
+        """)
+
+    def _migration_modmail_columns(self, cursor):
+        columns = self._table_columns(cursor, 'guild_settings')
+        if 'modmail_enabled' not in columns:
+            cursor.execute("ALTER TABLE guild_settings ADD COLUMN modmail_enabled INTEGER DEFAULT 0")
+        if 'modmail_channel' not in columns:
+            cursor.execute("ALTER TABLE guild_settings ADD COLUMN modmail_channel INTEGER")
+
+    def _migration_hot_path_indexes(self, cursor):
+        # get_warnings / clear_warnings
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_warnings_guild_user ON warnings (guild_id, user_id, timestamp)")
+        # get_mod_logs, get_mod_logs_for_user, get_reports
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_mod_logs_guild_time ON mod_logs (guild_id, timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_mod_logs_guild_target ON mod_logs (guild_id, target_id, timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_mod_logs_guild_action ON mod_logs (guild_id, action, timestamp)")
+        # Expiry lookups; covering so they never touch the table
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_temp_bans_expires ON temp_bans (expires_at, guild_id, user_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_muted_users_expires ON muted_users (expires_at, guild_id, user_id)")
+
+    def _migration_daily_rollups(self, cursor):
+        # Counters for the dashboard, kept current by triggers
+        install_rollups(cursor)
+
+    def _migration_pagination_indexes(self, cursor):
+        # Keyset pagination in the dashboard API
+        install_pagination_indexes(cursor)
+
+    def _migration_reaction_role_index(self, cursor):
+        # The cog has always written a channel_id the initial schema lacked
+        if 'channel_id' not in self._table_columns(cursor, 'reaction_roles'):
+            cursor.execute("ALTER TABLE reaction_roles ADD COLUMN channel_id INTEGER")
+        # One role per emoji on a message, so INSERT OR REPLACE replaces it
+        cursor.execute("""
+            DELETE FROM reaction_roles WHERE id NOT IN (
+                SELECT MAX(id) FROM reaction_roles GROUP BY message_id, emoji
+            )
+        """)
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_reaction_roles_message_emoji ON reaction_roles (message_id, emoji)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_reaction_roles_guild ON reaction_roles (guild_id)")
+
+    def _migration_open_tickets(self, cursor):
+        # Open ticket per member, so the ticket cog needs no channel name scans
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS open_tickets (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL UNIQUE,
+                ticket_type TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (guild_id, user_id)
+            )
+        """)
+
+    def _migration_ticket_transcripts(self, cursor):
+        # Archived transcript files, one per closed ticket channel
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ticket_transcripts (
+                channel_id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER,
+                closed_by INTEGER,
+                format TEXT NOT NULL,
+                path TEXT NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                size INTEGER NOT NULL DEFAULT 0,
+                closed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ticket_transcripts_guild_user ON ticket_transcripts (guild_id, user_id, closed_at)")
+
+    def _migration_mod_jobs(self, cursor):
+        # Checkpointed bulk moderation jobs (massban, massrole) that survive restarts
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS mod_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                guild_id INTEGER NOT NULL,
+                channel_id INTEGER,
+                message_id INTEGER,
+                moderator_id INTEGER NOT NULL,
+                targets TEXT NOT NULL,
+                options TEXT,
+                position INTEGER NOT NULL DEFAULT 0,
+                succeeded INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'running',
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_mod_jobs_status ON mod_jobs (status, kind)")
+
+    def _migration_raid_settings(self, cursor):
+        # Anti-raid configuration, previously held in memory and lost on restart
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS raid_settings (
+                guild_id INTEGER PRIMARY KEY,
+                enabled INTEGER NOT NULL DEFAULT 0,
+                action TEXT NOT NULL DEFAULT 'kick',
+                join_threshold INTEGER NOT NULL DEFAULT 10,
+                join_window INTEGER NOT NULL DEFAULT 10,
+                cluster_size INTEGER NOT NULL DEFAULT 4,
+                min_account_age INTEGER NOT NULL DEFAULT 7
+            )
+        """)
+
+    def _migration_word_filter_normalize(self, cursor):
+        # Leet/diacritic folding for the blacklist is opt-in per guild
+        if 'word_filter_normalize' not in self._table_columns(cursor, 'automod_settings'):
+            cursor.execute("ALTER TABLE automod_settings ADD COLUMN word_filter_normalize BOOLEAN DEFAULT 0")
+
+    MIGRATIONS = (
+        (1, "initial schema", _migration_initial_schema),
+        (2, "rebuild blacklisted_words with a word column", _migration_blacklisted_words),
+        (3, "modmail columns on guild_settings", _migration_modmail_columns),
+        (4, "indexes for hot query paths", _migration_hot_path_indexes),
+        (5, "daily and lifetime moderation rollups", _migration_daily_rollups),
+        (6, "indexes for paginated history", _migration_pagination_indexes),
+        (7, "reaction role channel column and lookup index", _migration_reaction_role_index),
+        (8, "open ticket index", _migration_open_tickets),
+        (9, "ticket transcript archive", _migration_ticket_transcripts),
+        (10, "checkpointed bulk moderation jobs", _migration_mod_jobs),
+        (11, "persisted anti-raid settings", _migration_raid_settings),
+        (12, "per-guild blacklist normalization setting", _migration_word_filter_normalize),
+    )
+
+    @staticmethod
+    def _table_exists(cursor, table):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        return cursor.fetchone() is not None
+
+    @staticmethod
+    def _table_columns(cursor, table):
+        return {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+
+    def _migrate(self):
+        """Apply pending migrations in order, one transaction each."""
+        conn = self._get_writer()
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.commit()
+
+        current = cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchone()[0]
+        for version, description, migration in self.MIGRATIONS:
+            if version <= current:
+                continue
+
+            cursor.execute("BEGIN")
+            try:
+                migration(self, cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                    (version, description)
                 )
-            """)
+                cursor.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            print(f"✅ Veritabanı şeması v{version}: {description}")
+            current = version
+
+        return current
+
+    # Connection Pool
+    def _connect(self, readonly=False):
+        """Open a connection tuned for concurrent access."""
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA busy_timeout = 30000")
+        if readonly:
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _get_writer(self):
+        """Return the single long-lived writer connection."""
+        if self._writer is None:
+            self._writer = self._connect()
+        return self._writer
+
+    def _acquire_reader(self):
+        """Take an idle reader connection, opening a new one while under pool_size."""
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._pool_lock:
+            if self._reader_count < self.pool_size:
+                conn = self._connect(readonly=True)
+                self._reader_count += 1
+                return conn
+
+        # _reader_slots keeps at most pool_size reads in flight, so one is on its way back
+        return self._readers.get()
+
+    def _read(self, query, params):
+        conn = self._acquire_reader()
+        try:
+            return conn.execute(query, params or ()).fetchall()
+        finally:
+            self._readers.put(conn)
+
+    def _write(self, query, params):
+        conn = self._get_writer()
+        try:
+            cursor = conn.execute(query, params or ())
+            conn.commit()
+            return cursor.rowcount
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _insert(self, query, params):
+        conn = self._get_writer()
+        try:
+            cursor = conn.execute(query, params)
+            conn.commit()
+            return cursor.lastrowid
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _write_many(self, statements):
+        conn = self._get_writer()
+        with conn:
+            for query, rows in statements:
+                conn.executemany(query, rows)
+
+    async def _run(self, func, *args):
+        """Run blocking database work on the dedicated executor."""
+        loop = asyncio.get_running_loop()
+        if self.metrics is None:
+            return await loop.run_in_executor(self.executor, func, *args)
+
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.metrics.observe(
+                'ironward_db_query_duration_seconds', time.perf_counter() - started,
+                operation=func.__name__.lstrip('_')
+            )
+
+    async def _run_guarded(self, guard, func, *args):
+        """Run ``func`` on the executor while holding ``guard`` (a lock or semaphore).
+
+        The guard is released when the executor finishes, not when the caller
+        stops waiting, so a cancelled caller never lets the next one onto a
+        connection that is still in use.
+        """
+        await guard.acquire()
+        try:
+            task = asyncio.ensure_future(self._run(func, *args))
+        except BaseException:
+            guard.release()
+            raise
+
+        def release(task):
+            guard.release()
+            if not task.cancelled():
+                # Retrieved here so an abandoned failure isn't reported as unhandled
+                task.exception()
+
+        task.add_done_callback(release)
+        return await asyncio.shield(task)
 
-            # Add new columns to guild_settings if they don't exist
-            try:
-                await self.execute_query("ALTER TABLE guild_settings ADD COLUMN modmail_enabled INTEGER DEFAULT 0")
-            except:
-                pass
+    async def execute_query(self, query, params=None, fetch=False):
+        """Execute a database query safely.
 
-            try:
-                await self.execute_query("ALTER TABLE guild_settings ADD COLUMN modmail_channel INTEGER")
-            except:
-                pass
+        Reads go through the reader pool and never wait on the write lock;
+        writes are serialized on the writer connection.
+        """
+        if fetch:
+            return await self._run_guarded(self._reader_slots, self._read, query, params)
 
-            conn.commit()
-            conn.close()
+        return await self._run_guarded(self.lock, self._write, query, params)
 
-    async def execute_query(self, query, params=None, fetch=False):
-        """Execute a database query safely."""
-        async with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+    async def execute_many(self, statements):
+        """Run several (query, rows) pairs with executemany in one transaction."""
+        return await self._run_guarded(self.lock, self._write_many, statements)
 
+    def _close_connections(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+        while True:
             try:
-                if params:
-                    cursor.execute(query, params)
-                else:
-                    cursor.execute(query)
-
-                if fetch:
-                    result = cursor.fetchall()
-                    conn.close()
-                    return result
-                else:
-                    conn.commit()
-                    conn.close()
-                    return cursor.rowcount
-            except Exception as e:
-                conn.close()
-                raise e
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        self._reader_count = 0
+
+    async def close(self):
+        """Flush buffered writes, close pooled connections and stop the executor."""
+        if self._closed:
+            return
+        self._closed = True
+
+        await self.writes.close()
+
+        await self._run_guarded(self.lock, self._close_connections)
+        self.executor.shutdown(wait=True)
 
     # Guild Settings Methods
+    GUILD_SETTING_COLUMNS = (
+        'language', 'prefix', 'welcome_channel', 'goodbye_channel', 'log_channel',
+        'auto_role', 'mute_role', 'ticket_category', 'modmail_enabled', 'modmail_channel'
+    )
+
     async def get_language(self, guild_id):
         """Get guild language."""
-        result = await self.execute_query(
-            "SELECT language FROM guild_settings WHERE guild_id = ?",
-            (guild_id,), fetch=True
-        )
-        return result[0][0] if result and len(result) > 0 else 'tr'
+        settings = await self.get_guild_settings(guild_id)
+        return settings['language'] if settings and settings['language'] else 'tr'
 
     async def set_language(self, guild_id, language):
         """Set guild language."""
-        await self.execute_query(
-            "INSERT OR REPLACE INTO guild_settings (guild_id, language) VALUES (?, ?)",
-            (guild_id, language)
-        )
+        await self.update_guild_setting(guild_id, 'language', language)
 
     async def get_prefix(self, guild_id):
         """Get guild prefix."""
-        result = await self.execute_query(
-            "SELECT prefix FROM guild_settings WHERE guild_id = ?",
-            (guild_id,), fetch=True
-        )
-        return result[0][0] if result and len(result) > 0 else '!'
+        settings = await self.get_guild_settings(guild_id)
+        return settings['prefix'] if settings and settings['prefix'] else '!'
 
     async def set_prefix(self, guild_id, prefix):
         """Set guild prefix."""
-        await self.execute_query(
-            "INSERT OR REPLACE INTO guild_settings (guild_id, prefix) VALUES (?, ?)",
-            (guild_id, prefix)
-        )
+        await self.update_guild_setting(guild_id, 'prefix', prefix)
 
     async def get_guild_settings(self, guild_id):
         """Get all guild settings."""
+        cached = self.cache.get(guild_id, 'settings')
+        if cached is not MISSING:
+            return cached
+
+        generation = self.cache.generation
         result = await self.execute_query(
-            "SELECT * FROM guild_settings WHERE guild_id = ?",
+            f"SELECT {', '.join(self.GUILD_SETTING_COLUMNS)} FROM guild_settings WHERE guild_id = ?",
             (guild_id,), fetch=True
         )
+        settings = None
         if result and len(result) > 0:
-            row = result[0]
-            return {
-                'language': row[1] if len(row) > 1 else 'tr',
-                'prefix': row[2] if len(row) > 2 else '!',
-                'welcome_channel': row[3] if len(row) > 3 else None,
-                'goodbye_channel': row[4] if len(row) > 4 else None,
-                'log_channel': row[5] if len(row) > 5 else None,
-                'auto_role': row[6] if len(row) > 6 else None,
-                'mute_role': row[7] if len(row) > 7 else None,
-                'modmail_enabled': row[8] if len(row) > 8 else 0,
-                'modmail_channel': row[9] if len(row) > 9 else None
-            }
-        return None
+            settings = dict(zip(self.GUILD_SETTING_COLUMNS, result[0]))
+            settings['language'] = settings['language'] or 'tr'
+            settings['prefix'] = settings['prefix'] or '!'
+            settings['modmail_enabled'] = settings['modmail_enabled'] or 0
+
+        self.cache.set(guild_id, 'settings', settings, generation)
+        return settings
 
     async def update_guild_setting(self, guild_id, setting, value):
         """Update a specific guild setting."""
         await self.execute_query(
-            f"INSERT OR REPLACE INTO guild_settings (guild_id, {setting}) VALUES (?, ?)",
+            f"INSERT INTO guild_settings (guild_id, {setting}) VALUES (?, ?) "
+            f"ON CONFLICT(guild_id) DO UPDATE SET {setting} = excluded.{setting}",
             (guild_id, value)
         )
+        self.cache.invalidate(guild_id, 'settings')
+
+    async def get_modmail_guilds(self):
+        """Get (guild_id, modmail_channel) for every guild with modmail enabled."""
+        return await self.execute_query(
+            "SELECT guild_id, modmail_channel FROM guild_settings "
+            "WHERE modmail_enabled AND modmail_channel IS NOT NULL",
+            fetch=True
+        )
 
     # Warning Methods
-    async def add_warning(self, guild_id, user_id, moderator_id, reason):
-        """Add a warning to user."""
-        await self.execute_query(
+    async def add_warning(self, guild_id, user_id, moderator_id, reason, wait=False):
+        """Add a warning to user.
+
+        The row is group-committed in the background; pass ``wait=True``
+        to return only once it is on disk.
+        """
+        await self.writes.submit(
             "INSERT INTO warnings (guild_id, user_id, moderator_id, reason) VALUES (?, ?, ?, ?)",
-            (guild_id, user_id, moderator_id, reason)
+            (guild_id, user_id, moderator_id, reason), wait=wait
         )
 
     async def get_warnings(self, guild_id, user_id):
         """Get all warnings for a user."""
         result = await self.execute_query(
-            "SELECT * FROM warnings WHERE guild_id = ? AND user_id = ? ORDER BY timestamp DESC",
-            (guild_id, user_id), fetch=True
+            self.HOT_QUERIES['get_warnings'][0], (guild_id, user_id), fetch=True
         )
         return result
 
@@ -262,6 +573,8 @@ class Database:
             "INSERT OR REPLACE INTO temp_bans VALUES (?, ?, ?, ?)",
             (guild_id, user_id, expires_at, reason)
         )
+        for scheduler in self.expiry_schedulers:
+            scheduler.schedule('ban', guild_id, user_id, expires_at)
 
     async def remove_temp_ban(self, guild_id, user_id):
         """Remove a temporary ban."""
@@ -269,13 +582,14 @@ class Database:
             "DELETE FROM temp_bans WHERE guild_id = ? AND user_id = ?",
             (guild_id, user_id)
         )
+        for scheduler in self.expiry_schedulers:
+            scheduler.cancel('ban', guild_id, user_id)
 
     async def get_expired_bans(self):
         """Get all expired bans."""
         now = datetime.now()
         result = await self.execute_query(
-            "SELECT guild_id, user_id FROM temp_bans WHERE expires_at <= ?",
-            (now,), fetch=True
+            self.HOT_QUERIES['get_expired_bans'][0], (now,), fetch=True
         )
         return result
 
@@ -286,6 +600,8 @@ class Database:
             "INSERT OR REPLACE INTO muted_users VALUES (?, ?, ?, ?)",
             (guild_id, user_id, expires_at, reason)
         )
+        for scheduler in self.expiry_schedulers:
+            scheduler.schedule('mute', guild_id, user_id, expires_at)
 
     async def remove_mute(self, guild_id, user_id):
         """Remove a mute."""
@@ -293,43 +609,216 @@ class Database:
             "DELETE FROM muted_users WHERE guild_id = ? AND user_id = ?",
             (guild_id, user_id)
         )
+        for scheduler in self.expiry_schedulers:
+            scheduler.cancel('mute', guild_id, user_id)
 
     async def get_expired_mutes(self):
         """Get all expired mutes."""
         now = datetime.now()
         result = await self.execute_query(
-            "SELECT guild_id, user_id FROM muted_users WHERE expires_at <= ?",
-            (now,), fetch=True
+            self.HOT_QUERIES['get_expired_mutes'][0], (now,), fetch=True
         )
         return result
 
+    async def get_pending_punishments(self):
+        """Get every timed ban and mute as (kind, guild_id, user_id, expires_at)."""
+        bans = await self.execute_query(
+            "SELECT guild_id, user_id, expires_at FROM temp_bans WHERE expires_at IS NOT NULL",
+            fetch=True
+        )
+        mutes = await self.execute_query(
+            "SELECT guild_id, user_id, expires_at FROM muted_users WHERE expires_at IS NOT NULL",
+            fetch=True
+        )
+        return (
+            [('ban', guild_id, user_id, expires_at) for guild_id, user_id, expires_at in bans]
+            + [('mute', guild_id, user_id, expires_at) for guild_id, user_id, expires_at in mutes]
+        )
+
+    # Ticket Methods
+    async def get_ticket_panels(self):
+        """Get every ticket panel as (guild_id, message_id, channel_id)."""
+        return await self.execute_query(
+            "SELECT guild_id, message_id, channel_id FROM ticket_messages", fetch=True
+        )
+
+    async def add_ticket_panel(self, guild_id, message_id, channel_id):
+        """Register a ticket panel message."""
+        await self.execute_query(
+            "INSERT OR REPLACE INTO ticket_messages (guild_id, message_id, channel_id) VALUES (?, ?, ?)",
+            (guild_id, message_id, channel_id)
+        )
+
+    async def remove_ticket_panel(self, message_id):
+        """Forget a deleted ticket panel message."""
+        await self.execute_query(
+            "DELETE FROM ticket_messages WHERE message_id = ?", (message_id,)
+        )
+
+    async def get_open_tickets(self):
+        """Get every open ticket as (guild_id, user_id, channel_id, ticket_type, created_at)."""
+        return await self.execute_query(
+            "SELECT guild_id, user_id, channel_id, ticket_type, created_at FROM open_tickets", fetch=True
+        )
+
+    async def add_open_ticket(self, guild_id, user_id, channel_id, ticket_type, created_at):
+        """Record a member's open ticket channel."""
+        await self.execute_query(
+            "INSERT OR REPLACE INTO open_tickets (guild_id, user_id, channel_id, ticket_type, created_at) VALUES (?, ?, ?, ?, ?)",
+            (guild_id, user_id, channel_id, ticket_type, created_at)
+        )
+
+    async def remove_open_ticket(self, channel_id):
+        """Forget a closed or deleted ticket channel."""
+        await self.execute_query(
+            "DELETE FROM open_tickets WHERE channel_id = ?", (channel_id,)
+        )
+
+    async def add_ticket_transcript(self, guild_id, channel_id, user_id, closed_by, fmt, path, message_count, size):
+        """Record an archived ticket transcript."""
+        await self.execute_query(
+            "INSERT OR REPLACE INTO ticket_transcripts (channel_id, guild_id, user_id, closed_by, format, path, message_count, size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (channel_id, guild_id, user_id, closed_by, fmt, path, message_count, size)
+        )
+
+    async def get_ticket_transcripts(self, guild_id, user_id=None, limit=10):
+        """Get archived transcripts as (channel_id, user_id, closed_by, format, path, message_count, size, closed_at), newest first."""
+        query = "SELECT channel_id, user_id, closed_by, format, path, message_count, size, closed_at FROM ticket_transcripts WHERE guild_id = ?"
+        params = [guild_id]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        query += " ORDER BY closed_at DESC LIMIT ?"
+        params.append(limit)
+        return await self.execute_query(query, tuple(params), fetch=True)
+
+    async def get_ticket_transcript(self, guild_id, channel_id):
+        """Get one archived transcript as (format, path, message_count, size), or None."""
+        result = await self.execute_query(
+            "SELECT format, path, message_count, size FROM ticket_transcripts WHERE channel_id = ? AND guild_id = ?",
+            (channel_id, guild_id), fetch=True
+        )
+        return result[0] if result else None
+
+    # Bulk Moderation Job Methods
+    MOD_JOB_FIELDS = (
+        'id', 'kind', 'guild_id', 'channel_id', 'message_id', 'moderator_id',
+        'targets', 'options', 'position', 'succeeded', 'failed', 'status'
+    )
+
+    async def create_mod_job(self, kind, guild_id, channel_id, moderator_id, targets, options=None):
+        """Store a new bulk job and return its ID."""
+        return await self._run_guarded(
+            self.lock, self._insert,
+            "INSERT INTO mod_jobs (kind, guild_id, channel_id, moderator_id, targets, options) VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, guild_id, channel_id, moderator_id, json.dumps(targets), json.dumps(options or {}))
+        )
+
+    async def set_mod_job_message(self, job_id, message_id):
+        """Remember the message a job reports its progress on."""
+        await self.execute_query(
+            "UPDATE mod_jobs SET message_id = ? WHERE id = ?", (message_id, job_id)
+        )
+
+    async def get_mod_jobs(self, kind, status='running', guild_id=None):
+        """Get jobs of one kind as dicts, oldest first, with targets and options decoded."""
+        query = f"SELECT {', '.join(self.MOD_JOB_FIELDS)} FROM mod_jobs WHERE status = ? AND kind = ?"
+        params = [status, kind]
+        if guild_id is not None:
+            query += " AND guild_id = ?"
+            params.append(guild_id)
+        rows = await self.execute_query(query + " ORDER BY id", tuple(params), fetch=True)
+        return [self._decode_mod_job(row) for row in rows]
+
+    async def get_mod_job(self, job_id):
+        """Get one job as a dict, or None."""
+        rows = await self.execute_query(
+            f"SELECT {', '.join(self.MOD_JOB_FIELDS)} FROM mod_jobs WHERE id = ?", (job_id,), fetch=True
+        )
+        return self._decode_mod_job(rows[0]) if rows else None
+
+    def _decode_mod_job(self, row):
+        job = dict(zip(self.MOD_JOB_FIELDS, row))
+        job['targets'] = json.loads(job['targets'])
+        job['options'] = json.loads(job['options'] or '{}')
+        return job
+
+    async def checkpoint_mod_job(self, job_id, position, succeeded, failed, status='running', logs=()):
+        """Save a job's progress together with the mod logs for that step, atomically."""
+        statements = []
+        if logs:
+            statements.append((
+                "INSERT INTO mod_logs (guild_id, moderator_id, target_id, action, reason) VALUES (?, ?, ?, ?, ?)",
+                logs
+            ))
+        statements.append((
+            "UPDATE mod_jobs SET position = ?, succeeded = ?, failed = ?, status = ?, "
+            "updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            [(position, succeeded, failed, status, job_id)]
+        ))
+        await self.execute_many(statements)
+
+    # Anti-raid Methods
+    RAID_SETTING_DEFAULTS = {
+        'enabled': 0,
+        'action': 'kick',
+        'join_threshold': 10,
+        'join_window': 10,
+        'cluster_size': 4,
+        'min_account_age': 7
+    }
+
+    async def get_raid_settings(self):
+        """Get anti-raid settings for every configured guild, keyed by guild ID."""
+        columns = list(self.RAID_SETTING_DEFAULTS)
+        result = await self.execute_query(
+            f"SELECT guild_id, {', '.join(columns)} FROM raid_settings", fetch=True
+        )
+        return {row[0]: dict(zip(columns, row[1:])) for row in result} if result else {}
+
+    async def update_raid_setting(self, guild_id, setting, value):
+        """Update one anti-raid setting."""
+        await self.execute_query(
+            f"INSERT INTO raid_settings (guild_id, {setting}) VALUES (?, ?) "
+            f"ON CONFLICT(guild_id) DO UPDATE SET {setting} = excluded.{setting}",
+            (guild_id, value)
+        )
+
     # Auto-moderation Methods
+    AUTOMOD_COLUMNS = (
+        'anti_spam', 'anti_flood', 'anti_link', 'anti_invite',
+        'caps_filter', 'emoji_filter', 'mention_filter', 'word_filter',
+        'word_filter_normalize'
+    )
+
     async def get_automod_settings(self, guild_id):
         """Get auto-moderation settings."""
+        cached = self.cache.get(guild_id, 'automod')
+        if cached is not MISSING:
+            return cached
+
+        generation = self.cache.generation
         result = await self.execute_query(
-            "SELECT * FROM automod_settings WHERE guild_id = ?",
+            f"SELECT {', '.join(self.AUTOMOD_COLUMNS)} FROM automod_settings WHERE guild_id = ?",
             (guild_id,), fetch=True
         )
+        settings = None
         if result and len(result) > 0:
-            row = result[0]
-            return {
-                'anti_spam': bool(row[1]) if len(row) > 1 else False,
-                'anti_flood': bool(row[2]) if len(row) > 2 else False,
-                'anti_link': bool(row[3]) if len(row) > 3 else False,
-                'anti_invite': bool(row[4]) if len(row) > 4 else False,
-                'caps_filter': bool(row[5]) if len(row) > 5 else False,
-                'emoji_filter': bool(row[6]) if len(row) > 6 else False,
-                'mention_filter': bool(row[7]) if len(row) > 7 else False,
-                'word_filter': bool(row[8]) if len(row) > 8 else False
-            }
-        return None
+            settings = {column: bool(value) for column, value in zip(self.AUTOMOD_COLUMNS, result[0])}
+
+        self.cache.set(guild_id, 'automod', settings, generation)
+        return settings
 
     async def update_automod_setting(self, guild_id, setting, value):
         """Update auto-moderation setting."""
         await self.execute_query(
-            f"INSERT OR REPLACE INTO automod_settings (guild_id, {setting}) VALUES (?, ?)",
+            f"INSERT INTO automod_settings (guild_id, {setting}) VALUES (?, ?) "
+            f"ON CONFLICT(guild_id) DO UPDATE SET {setting} = excluded.{setting}",
             (guild_id, int(value))
         )
+        self.cache.invalidate(guild_id, 'automod')
+        if setting == 'word_filter_normalize':
+            self.cache.invalidate(guild_id, 'blacklist')
 
     # Blacklisted Words Methods
     async def add_blacklisted_word(self, guild_id, word):
@@ -338,6 +827,7 @@ class Database:
             "INSERT OR IGNORE INTO blacklisted_words (guild_id, word) VALUES (?, ?)",
             (guild_id, word.lower())
         )
+        self.cache.invalidate(guild_id, 'blacklist')
 
     async def remove_blacklisted_word(self, guild_id, word):
         """Remove a blacklisted word."""
@@ -345,49 +835,114 @@ class Database:
             "DELETE FROM blacklisted_words WHERE guild_id = ? AND word = ?",
             (guild_id, word.lower())
         )
+        self.cache.invalidate(guild_id, 'blacklist')
 
     async def get_blacklisted_words(self, guild_id):
         """Get all blacklisted words."""
         result = await self.execute_query(
-            "SELECT word FROM blacklisted_words WHERE guild_id = ?",
-            (guild_id,), fetch=True
+            self.HOT_QUERIES['get_blacklisted_words'][0], (guild_id,), fetch=True
         )
         return [row[0] for row in result] if result else []
 
+    async def get_blacklist_matcher(self, guild_id):
+        """Get the compiled blacklist matcher for a guild.
+
+        The matcher is only rebuilt after the guild's word list or its
+        ``word_filter_normalize`` setting changes.
+        """
+        matcher = self.cache.get(guild_id, 'blacklist')
+        if matcher is not MISSING:
+            return matcher
+
+        generation = self.cache.generation
+        words = await self.get_blacklisted_words(guild_id)
+        settings = await self.get_automod_settings(guild_id)
+        normalize = bool(settings and settings['word_filter_normalize'])
+        matcher = BlacklistMatcher(words, normalize=normalize)
+        self.cache.set(guild_id, 'blacklist', matcher, generation, expires=False)
+        return matcher
+
     # Moderation Log Methods
-    async def add_mod_log(self, guild_id, moderator_id, user_id, action, reason):
-        """Add a moderation log entry."""
-        await self.execute_query(
-            "INSERT INTO mod_logs (guild_id, moderator_id, user_id, action, reason) VALUES (?, ?, ?, ?, ?)",
-            (guild_id, moderator_id, user_id, action, reason)
+    async def add_mod_log(self, guild_id, moderator_id, user_id, action, reason, wait=False):
+        """Add a moderation log entry.
+
+        The row is group-committed in the background; pass ``wait=True``
+        to return only once it is on disk.
+        """
+        await self.writes.submit(
+            "INSERT INTO mod_logs (guild_id, moderator_id, target_id, action, reason) VALUES (?, ?, ?, ?, ?)",
+            (guild_id, moderator_id, user_id, action, reason), wait=wait
         )
 
+    MOD_LOG_FIELDS = ['guild_id', 'moderator_id', 'user_id', 'action', 'reason', 'timestamp']
+
     async def get_mod_logs(self, guild_id, limit=50):
         """Get moderation logs for a guild."""
         result = await self.execute_query(
-            "SELECT * FROM mod_logs WHERE guild_id = ? ORDER BY timestamp DESC LIMIT ?",
-            (guild_id, limit), fetch=True
+            self.HOT_QUERIES['get_mod_logs'][0], (guild_id, limit), fetch=True
         )
         if result:
-            return [dict(zip(['guild_id', 'moderator_id', 'user_id', 'action', 'reason', 'timestamp'], row)) for row in result]
+            return [dict(zip(self.MOD_LOG_FIELDS, row)) for row in result]
         return []
 
     async def get_mod_logs_for_user(self, guild_id, user_id, limit=10):
         """Get moderation logs for a specific user."""
         result = await self.execute_query(
-            "SELECT * FROM mod_logs WHERE guild_id = ? AND user_id = ? ORDER BY timestamp DESC LIMIT ?",
-            (guild_id, user_id, limit), fetch=True
+            self.HOT_QUERIES['get_mod_logs_for_user'][0], (guild_id, user_id, limit), fetch=True
         )
         if result:
-            return [dict(zip(['guild_id', 'moderator_id', 'user_id', 'action', 'reason', 'timestamp'], row)) for row in result]
+            return [dict(zip(self.MOD_LOG_FIELDS, row)) for row in result]
         return []
 
     async def get_reports(self, guild_id, limit=10):
         """Get reports from moderation logs."""
         result = await self.execute_query(
-            "SELECT * FROM mod_logs WHERE guild_id = ? AND action = 'REPORT' ORDER BY timestamp DESC LIMIT ?",
-            (guild_id, limit), fetch=True
+            self.HOT_QUERIES['get_reports'][0], (guild_id, limit), fetch=True
         )
         if result:
-            return [dict(zip(['guild_id', 'moderator_id', 'user_id', 'action', 'reason', 'timestamp'], row)) for row in result]
-        return []
\ No newline at end of file
+            return [dict(zip(self.MOD_LOG_FIELDS, row)) for row in result]
+        return []
+
+    # Diagnostics
+    # Hot queries with representative parameters, used by explain_hot_queries.
+    HOT_QUERIES = {
+        'get_warnings': (
+            "SELECT * FROM warnings WHERE guild_id = ? AND user_id = ? ORDER BY timestamp DESC",
+            (0, 0)
+        ),
+        'get_mod_logs': (
+            "SELECT guild_id, moderator_id, target_id, action, reason, timestamp FROM mod_logs "
+            "WHERE guild_id = ? ORDER BY timestamp DESC LIMIT ?",
+            (0, 50)
+        ),
+        'get_mod_logs_for_user': (
+            "SELECT guild_id, moderator_id, target_id, action, reason, timestamp FROM mod_logs "
+            "WHERE guild_id = ? AND target_id = ? ORDER BY timestamp DESC LIMIT ?",
+            (0, 0, 10)
+        ),
+        'get_reports': (
+            "SELECT guild_id, moderator_id, target_id, action, reason, timestamp FROM mod_logs "
+            "WHERE guild_id = ? AND action = 'REPORT' ORDER BY timestamp DESC LIMIT ?",
+            (0, 10)
+        ),
+        'get_expired_bans': (
+            "SELECT guild_id, user_id FROM temp_bans WHERE expires_at <= ?",
+            ('1970-01-01 00:00:00',)
+        ),
+        'get_expired_mutes': (
+            "SELECT guild_id, user_id FROM muted_users WHERE expires_at <= ?",
+            ('1970-01-01 00:00:00',)
+        ),
+        'get_blacklisted_words': (
+            "SELECT word FROM blacklisted_words WHERE guild_id = ?",
+            (0,)
+        ),
+    }
+
+    async def explain_hot_queries(self):
+        """Return the EXPLAIN QUERY PLAN lines for every hot query."""
+        plans = {}
+        for name, (query, params) in self.HOT_QUERIES.items():
+            rows = await self.execute_query(f"EXPLAIN QUERY PLAN {query}", params, fetch=True)
+            plans[name] = [row[-1] for row in rows]
+        return plans
\ No newline at end of file
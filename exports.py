@@ -0,0 +1,102 @@
+"""
+Streaming CSV/JSONL export of moderation tables for the dashboard.
+
+Rows are read in rowid-ordered chunks, each with its own short statement,
+so an export never holds a read snapshot open for its whole length and
+memory stays bounded by the chunk size however large the table is.
+"""
+
+import csv
+import io
+import json
+import zlib
+
+EXPORT_TABLES = {
+    'mod_logs': 'mod_logs',
+    'mod-logs': 'mod_logs',
+    'warnings': 'warnings',
+    'temp_bans': 'temp_bans',
+    'bans': 'temp_bans',
+    'guild_settings': 'guild_settings',
+    'settings': 'guild_settings',
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+CHUNK_SIZE = 1000
+
+
+def iter_chunks(conn, table, chunk_size=CHUNK_SIZE):
+    """Yield (columns, rows) chunks in rowid order; at least one, even if empty."""
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    select = ', '.join(columns)
+    last_rowid = None
+
+    while True:
+        if last_rowid is None:
+            rows = conn.execute(
+                f"SELECT rowid, {select} FROM {table} ORDER BY rowid LIMIT ?", (chunk_size,)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                f"SELECT rowid, {select} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, chunk_size)
+            ).fetchall()
+        if not rows:
+            if last_rowid is None:
+                yield columns, []
+            return
+
+        last_rowid = rows[-1][0]
+        yield columns, [tuple(row)[1:] for row in rows]
+
+
+def _encode_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+
+    for columns, rows in chunks:
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _encode_jsonl(chunks):
+    for columns, rows in chunks:
+        yield ''.join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + '\n'
+            for row in rows
+        )
+
+
+def stream_export(connect, table, fmt='csv', compress=False, chunk_size=CHUNK_SIZE):
+    """Yield the encoded export as bytes, gzipped on the fly if ``compress``.
+
+    ``connect()`` is only called once the body starts streaming, so a
+    response that is never sent never holds a connection; it is closed
+    when the generator finishes or is closed.
+    """
+    encode = _encode_csv if fmt == 'csv' else _encode_jsonl
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    conn = connect()
+    try:
+        for text in encode(iter_chunks(conn, table, chunk_size)):
+            data = text.encode('utf-8')
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+
+        if compressor:
+            yield compressor.flush()
+    finally:
+        conn.close()
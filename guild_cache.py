@@ -0,0 +1,83 @@
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class GuildConfigCache:
+    """In-memory cache of per-guild configuration rows.
+
+    Each guild holds one entry per kind (``'settings'``, ``'automod'``, ...).
+    Entries are evicted least-recently-used once more than ``max_guilds``
+    guilds are cached, and optionally expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, max_guilds=10000, ttl=None):
+        self.max_guilds = max_guilds
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._generation = 0
+
+    @property
+    def generation(self):
+        """Counter bumped on every invalidation, used to drop racing fills."""
+        return self._generation
+
+    def get(self, guild_id, kind):
+        """Return the cached value or ``MISSING``."""
+        entry = self._entries.get(guild_id)
+        if entry is not None and kind in entry:
+            value, stored_at = entry[kind]
+            if stored_at is None or self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                self._entries.move_to_end(guild_id)
+                self.hits += 1
+                return value
+            del entry[kind]
+
+        self.misses += 1
+        return MISSING
+
+    def set(self, guild_id, kind, value, generation=None, expires=True):
+        """Store a value unless an invalidation happened since ``generation``.
+
+        Values stored with ``expires=False`` ignore the TTL and live until
+        they are invalidated or evicted.
+        """
+        if generation is not None and generation != self._generation:
+            return
+
+        entry = self._entries.setdefault(guild_id, {})
+        entry[kind] = (value, time.monotonic() if expires else None)
+        self._entries.move_to_end(guild_id)
+
+        while len(self._entries) > self.max_guilds:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, guild_id, kind=None):
+        """Drop one kind, or every kind, cached for a guild."""
+        self._generation += 1
+        entry = self._entries.get(guild_id)
+        if entry is None:
+            return
+
+        if kind is None:
+            del self._entries[guild_id]
+        else:
+            entry.pop(kind, None)
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the current size."""
+        total = self.hits + self.misses
+        return {
+            'guilds': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
@@ -0,0 +1,171 @@
+"""
+Change feed for the dashboard's Server-Sent Events stream.
+
+One background thread watches the database and fans new mod log rows and
+stat changes out to every connected browser, so database load does not
+grow with the number of open tabs.
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+from collections import deque
+
+BATCH_SIZE = 200
+# Longest wait between retries while the database keeps failing
+MAX_BACKOFF = 30.0
+
+# Last item on a dropped subscriber's queue; the stream ends so the browser reconnects
+CLOSED = object()
+
+ACTIVITY_QUERY = f'''
+    SELECT id, guild_id, target_id, moderator_id, action, reason, timestamp
+    FROM mod_logs WHERE id > ? ORDER BY id LIMIT {BATCH_SIZE}
+'''
+
+
+class ChangeFeed:
+    """Shared poller that pushes events to subscriber queues.
+
+    ``PRAGMA data_version`` only changes when another connection commits,
+    so an idle database costs one pragma per ``interval``. ``stats_func``
+    is called with the poller's connection and must return a JSON-safe
+    dict; it is only re-sent when it changes.
+    """
+
+    def __init__(self, db_path, stats_func, interval=1.0, history=200, max_queue=100):
+        self.db_path = db_path
+        self.stats_func = stats_func
+        self.interval = interval
+        self.max_queue = max_queue
+
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._recent = deque(maxlen=history)
+        self._stats = None
+        self._last_id = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def subscribe(self, last_event_id=None):
+        """Register a browser; returns its queue, pre-filled with catch-up events."""
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            if last_event_id is not None:
+                missed = [row for row in self._recent if row['id'] > last_event_id]
+                if missed:
+                    q.put_nowait(('activity', missed))
+            if self._stats is not None:
+                q.put_nowait(('stats', self._stats))
+            self._subscribers.add(q)
+
+            if self._thread is None or not self._thread.is_alive():
+                # _last_id is kept, so rows committed while idle are still published
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='dashboard-change-feed', daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    def stop(self):
+        self._stop.set()
+
+    def _publish(self, event, data):
+        with self._lock:
+            for q in list(self._subscribers):
+                try:
+                    q.put_nowait((event, data))
+                except queue.Full:
+                    # Browser is not reading; drop it and end its stream so
+                    # EventSource reconnects and catches up with Last-Event-ID
+                    self._subscribers.discard(q)
+                    self._close(q)
+
+    @staticmethod
+    def _close(q):
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                break
+        q.put_nowait(CLOSED)
+
+    def _connect(self):
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _run(self):
+        conn = None
+        version = None
+        delay = self.interval
+        try:
+            while not self._stop.is_set():
+                with self._lock:
+                    if not self._subscribers:
+                        self._thread = None
+                        return
+
+                try:
+                    if conn is None:
+                        conn = self._connect()
+                    current = conn.execute('PRAGMA data_version').fetchone()[0]
+                    if current != version:
+                        version = current
+                        if self._poll(conn):
+                            # More rows than one batch; read again next tick
+                            version = None
+                    delay = self.interval
+                except Exception as e:
+                    # Keep the thread alive; reconnect and poll again after backing off
+                    print(f"Change feed error: {e}")
+                    if conn is not None:
+                        conn.close()
+                        conn = None
+                    version = None
+                    delay = min(delay * 2, MAX_BACKOFF)
+
+                self._stop.wait(delay)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _poll(self, conn):
+        """Publish new rows and changed stats; True if rows remain unread."""
+        rows = []
+        if self._last_id is None:
+            self._last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM mod_logs').fetchone()[0]
+        else:
+            rows = [dict(row) for row in conn.execute(ACTIVITY_QUERY, (self._last_id,))]
+            if rows:
+                for row in rows:
+                    row['timestamp'] = str(row['timestamp'])
+                self._last_id = rows[-1]['id']
+                with self._lock:
+                    self._recent.extend(rows)
+                self._publish('activity', rows)
+
+        stats = self.stats_func(conn)
+        if stats != self._stats:
+            self._stats = stats
+            self._publish('stats', stats)
+
+        return len(rows) == BATCH_SIZE
+
+
+def format_event(event, data):
+    """Encode one SSE message; activity events carry the newest row ID."""
+    lines = []
+    if event == 'activity':
+        lines.append(f"id: {data[-1]['id']}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return '\n'.join(lines) + '\n\n'
@@ -0,0 +1,194 @@
+import asyncio
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from aiohttp import web
+
+# Seconds; fine enough at the low end for cached DB reads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels)
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+class MetricsRegistry:
+    """Process-wide counters, gauges and histograms.
+
+    Recording happens on the bot's event loop, and the Database records from
+    its executor threads, so every access goes through one lock.
+    Label sets are passed as keyword arguments.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def describe(self, name, kind, help_text):
+        """Declare a metric so it is rendered with HELP/TYPE lines."""
+        with self._lock:
+            self._metrics.setdefault(name, {'kind': kind, 'help': help_text, 'series': {}})
+
+    def _series(self, name, kind):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = {'kind': kind, 'help': '', 'series': {}}
+        return metric['series']
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series(name, 'counter')
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series(name, 'gauge')[key] = value
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series(name, 'histogram')
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of the ``with`` block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def wrap_listener(self, listener, event, cog_name):
+        """Return ``listener`` wrapped with latency and error metrics."""
+        @functools.wraps(listener)
+        async def instrumented(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await listener(*args, **kwargs)
+            except Exception:
+                self.inc('ironward_listener_errors_total', event=event, cog=cog_name)
+                raise
+            finally:
+                self.observe(
+                    'ironward_listener_duration_seconds', time.perf_counter() - started,
+                    event=event, cog=cog_name
+                )
+
+        instrumented.__metrics_wrapped__ = True
+        return instrumented
+
+    def instrument_cog(self, cog):
+        """Wrap every listener of a cog before it is added to the bot.
+
+        The wrapper is stored on the instance, so adding and removing the cog
+        both see the same callable.
+        """
+        for event, method_name in cog.__cog_listeners__:
+            listener = getattr(cog, method_name)
+            if getattr(listener, '__metrics_wrapped__', False):
+                continue
+            setattr(cog, method_name, self.wrap_listener(listener, event, cog.qualified_name))
+
+    async def monitor_loop_lag(self, interval=0.5):
+        """Measure how late the event loop wakes up from a fixed sleep."""
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.perf_counter() - started - interval)
+            self.observe('ironward_event_loop_lag_seconds', lag)
+            self.set('ironward_event_loop_lag_last_seconds', lag)
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, metric in sorted(self._metrics.items()):
+                kind = metric['kind']
+                if metric['help']:
+                    lines.append(f"# HELP {name} {metric['help']}")
+                lines.append(f"# TYPE {name} {kind}")
+
+                for labels, value in sorted(metric['series'].items()):
+                    if kind != 'histogram':
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+                        continue
+
+                    for bound, count in value.cumulative():
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', bound))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {value.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {value.sum}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {value.count}")
+
+        return '\n'.join(lines) + '\n'
+
+    async def serve(self, host='0.0.0.0', port=9100):
+        """Serve ``/metrics`` from the running event loop; returns the runner to clean up."""
+        async def handle(request):
+            return web.Response(
+                body=self.render().encode(),
+                headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+            )
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+registry = MetricsRegistry()
+
+registry.describe('ironward_command_duration_seconds', 'histogram', 'Command invocation latency.')
+registry.describe('ironward_command_errors_total', 'counter', 'Commands that ended in an error.')
+registry.describe('ironward_listener_duration_seconds', 'histogram', 'Cog listener latency.')
+registry.describe('ironward_listener_errors_total', 'counter', 'Cog listeners that raised.')
+registry.describe('ironward_db_query_duration_seconds', 'histogram', 'Database work latency, including executor queueing.')
+registry.describe('ironward_event_loop_lag_seconds', 'histogram', 'Event loop wake-up delay.')
+registry.describe('ironward_event_loop_lag_last_seconds', 'gauge', 'Most recent event loop wake-up delay.')
+registry.describe('ironward_dm_queue_depth', 'gauge', 'Members with a role change DM waiting to be sent.')
+registry.describe('ironward_dm_notifications_total', 'counter', 'Role change DMs by outcome.')
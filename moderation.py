@@ -253,7 +253,7 @@ class Moderation(commands.Cog):
         lang = await self.bot.db.get_language(ctx.guild.id)
         
         # Add warning to database
-        await self.bot.db.add_warning(ctx.guild.id, member.id, ctx.author.id, reason)
+        await self.bot.db.add_warning(ctx.guild.id, member.id, ctx.author.id, reason, wait=True)
         
         # Send DM to user
         try:
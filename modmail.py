@@ -2,12 +2,63 @@
 import discord
 from discord.ext import commands
 import asyncio
+import time
 from utils.embeds import create_embed
+from utils.attachment_relay import AttachmentRelay
+
+NUMBER_EMOJIS = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
 
 class ModMail(commands.Cog):
+    # How long a member's DMs keep going to the guild they picked
+    ROUTE_TTL = 1800
+    
     def __init__(self, bot):
         self.bot = bot
         self.active_tickets = {}
+        # guild_id -> modmail channel ID, only for guilds with modmail enabled
+        self.modmail_guilds = {}
+        self.index_ready = asyncio.Event()
+        # user_id -> (guild_id, chosen at); set after an explicit choice
+        self.routes = {}
+        # user_id -> DMs that arrived while a guild choice is pending
+        self.selecting = {}
+        self.load_task = None
+        # Streams attachments through spooled temp files under a shared byte budget
+        self.attachments = AttachmentRelay(budget=64 * 1024 * 1024, per_user=2)
+    
+    async def cog_load(self):
+        self.load_task = asyncio.create_task(self.load_modmail_guilds())
+    
+    async def cog_unload(self):
+        if self.load_task:
+            self.load_task.cancel()
+        await self.attachments.close()
+    
+    async def load_modmail_guilds(self):
+        """Build the modmail guild index once; commands keep it current."""
+        await self.bot.wait_until_ready()
+        
+        try:
+            result = await self.bot.db.get_modmail_guilds()
+        except Exception as e:
+            print(f"❌ ModMail sunucuları yüklenirken hata: {e}")
+        else:
+            self.modmail_guilds = {guild_id: channel_id for guild_id, channel_id in result}
+            print(f"✅ {len(self.modmail_guilds)} sunucuda ModMail aktif!")
+        finally:
+            self.index_ready.set()
+    
+    async def refresh_modmail_guild(self, guild_id):
+        """Re-read one guild's modmail settings into the index."""
+        settings = await self.bot.db.get_guild_settings(guild_id)
+        if settings and settings.get('modmail_enabled') and settings.get('modmail_channel'):
+            self.modmail_guilds[guild_id] = settings['modmail_channel']
+        else:
+            self.modmail_guilds.pop(guild_id, None)
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.modmail_guilds.pop(guild.id, None)
     
     @commands.command()
     @commands.has_permissions(administrator=True)
@@ -26,6 +77,7 @@ class ModMail(commands.Cog):
         
         if toggle.lower() in ['aç', 'on', 'enable', 'açık']:
             await self.bot.db.update_guild_setting(ctx.guild.id, 'modmail_enabled', True)
+            await self.refresh_modmail_guild(ctx.guild.id)
             embed = create_embed(
                 title="📬 ModMail açıldı!",
                 description="Kullanıcılar artık bota DM göndererek destek talebinde bulunabilir.",
@@ -33,6 +85,7 @@ class ModMail(commands.Cog):
             )
         elif toggle.lower() in ['kapat', 'off', 'disable', 'kapalı']:
             await self.bot.db.update_guild_setting(ctx.guild.id, 'modmail_enabled', False)
+            await self.refresh_modmail_guild(ctx.guild.id)
             embed = create_embed(
                 title="📬 ModMail kapatıldı!",
                 color=discord.Color.red()
@@ -52,6 +105,7 @@ class ModMail(commands.Cog):
     async def setmodmail(self, ctx, channel: discord.TextChannel):
         """ModMail kanalını ayarla."""
         await self.bot.db.update_guild_setting(ctx.guild.id, 'modmail_channel', channel.id)
+        await self.refresh_modmail_guild(ctx.guild.id)
         
         embed = create_embed(
             title="📬 ModMail kanalı ayarlandı!",
@@ -60,55 +114,128 @@ class ModMail(commands.Cog):
         )
         await ctx.send(embed=embed)
     
+    def eligible_guilds(self, user_id):
+        """Modmail-enabled guilds the user is in, with their modmail channels."""
+        eligible = []
+        for guild_id, channel_id in self.modmail_guilds.items():
+            guild = self.bot.get_guild(guild_id)
+            if not guild or not guild.get_member(user_id):
+                continue
+            channel = guild.get_channel(channel_id)
+            if channel:
+                eligible.append((guild, channel))
+        return sorted(eligible, key=lambda pair: pair[0].name.lower())
+    
     @commands.Cog.listener()
     async def on_message(self, message):
         """ModMail DM handler."""
         if message.author.bot or message.guild:
             return
         
-        # Kullanıcının ortak sunucularını bul
-        common_guilds = [guild for guild in self.bot.guilds if guild.get_member(message.author.id)]
+        user = message.author
+        if user.id in self.selecting:
+            # Forwarded together once the user picks a guild
+            self.selecting[user.id].append(message)
+            return
         
-        for guild in common_guilds:
-            settings = await self.bot.db.get_guild_settings(guild.id)
-            if not settings or not settings.get('modmail_enabled') or not settings.get('modmail_channel'):
-                continue
-            
-            modmail_channel = guild.get_channel(settings['modmail_channel'])
-            if not modmail_channel:
-                continue
-            
-            # ModMail embed oluştur
+        await self.index_ready.wait()
+        eligible = self.eligible_guilds(user.id)
+        if not eligible:
+            return
+        
+        # Keep a conversation in the guild the user already picked
+        route = self.routes.get(user.id)
+        if route and time.monotonic() - route[1] < self.ROUTE_TTL:
+            for guild, channel in eligible:
+                if guild.id == route[0]:
+                    self.routes[user.id] = (guild.id, time.monotonic())
+                    return await self.forward(message, guild, channel)
+        
+        if len(eligible) == 1:
+            guild, channel = eligible[0]
+            return await self.forward(message, guild, channel)
+        
+        self.selecting[user.id] = [message]
+        try:
+            choice = await self.choose_guild(user, eligible)
+        finally:
+            messages = self.selecting.pop(user.id)
+        
+        if choice is None:
+            return
+        
+        guild, channel = choice
+        self.routes[user.id] = (guild.id, time.monotonic())
+        for pending in messages:
+            await self.forward(pending, guild, channel)
+    
+    async def choose_guild(self, user, eligible):
+        """Ask a user in several modmail guilds where their message should go."""
+        eligible = eligible[:len(NUMBER_EMOJIS)]
+        options = NUMBER_EMOJIS[:len(eligible)]
+        
+        embed = create_embed(
+            title="📬 Sunucu Seçimi",
+            description="Mesajınızı hangi sunucunun moderatörlerine iletmek istiyorsunuz?\n\n" + "\n".join(
+                f"{emoji} **{guild.name}**" for emoji, (guild, _) in zip(options, eligible)
+            ),
+            color=discord.Color.blue()
+        )
+        prompt = await user.send(embed=embed)
+        for emoji in options:
+            await prompt.add_reaction(emoji)
+        
+        def check(reaction, reaction_user):
+            return (reaction_user.id == user.id and
+                   reaction.message.id == prompt.id and
+                   str(reaction.emoji) in options)
+        
+        try:
+            reaction, _ = await self.bot.wait_for('reaction_add', timeout=60.0, check=check)
+        except asyncio.TimeoutError:
             embed = create_embed(
-                title="📬 Yeni ModMail Mesajı",
-                description=message.content,
-                color=discord.Color.blue()
-            )
-            embed.set_author(
-                name=f"{message.author} ({message.author.id})",
-                icon_url=message.author.display_avatar.url
+                title="⏰ Sunucu seçilmedi!",
+                description="Mesajınız iletilmedi. Tekrar yazarak yeniden deneyebilirsiniz.",
+                color=discord.Color.red()
             )
-            embed.set_footer(text=f"Sunucu: {guild.name}")
-            
-            # Dosya varsa ekle
-            files = []
-            if message.attachments:
-                for attachment in message.attachments:
-                    if attachment.size <= 8000000:  # 8MB limit
-                        file_data = await attachment.read()
-                        files.append(discord.File(file_data, attachment.filename))
+            await user.send(embed=embed)
+            return None
+        
+        return eligible[options.index(str(reaction.emoji))]
+    
+    async def forward(self, message, guild, modmail_channel):
+        """Relay a DM to a guild's modmail channel and confirm to the user."""
+        # ModMail embed oluştur
+        embed = create_embed(
+            title="📬 Yeni ModMail Mesajı",
+            description=message.content,
+            color=discord.Color.blue()
+        )
+        embed.set_author(
+            name=f"{message.author} ({message.author.id})",
+            icon_url=message.author.display_avatar.url
+        )
+        embed.set_footer(text=f"Sunucu: {guild.name}")
+        
+        # Dosyaları akış halinde aktar; sığmayanları bağlantı olarak ekle
+        async with self.attachments.relay(message.author.id, message.attachments, guild.filesize_limit) as (files, links):
+            if links:
+                embed.add_field(
+                    name="📎 Ekler",
+                    value="\n".join(f"[{attachment.filename}]({attachment.url})" for attachment in links)[:1024],
+                    inline=False
+                )
             
             # Mesajı gönder
             await modmail_channel.send(embed=embed, files=files)
-            
-            # Kullanıcıya onay gönder
-            embed = create_embed(
-                title="✅ Mesajınız gönderildi!",
-                description=f"**{guild.name}** sunucusunun moderatörlerine mesajınız iletildi.",
-                color=discord.Color.green()
-            )
-            await message.author.send(embed=embed)
-            break
+        
+        # Kullanıcıya onay gönder
+        embed = create_embed(
+            title="✅ Mesajınız gönderildi!",
+            description=f"**{guild.name}** sunucusunun moderatörlerine mesajınız iletildi.",
+            color=discord.Color.green()
+        )
+        await message.author.send(embed=embed)
     
     @commands.command()
     @commands.has_permissions(manage_messages=True)
@@ -0,0 +1,127 @@
+"""
+Keyset (cursor) pagination over moderation history for the dashboard API.
+
+Pages are ordered newest first by a time column with the rowid as a tie
+breaker, and the cursor holds the last row's (time, rowid). Each page is an
+index range scan, so deep pages cost the same as the first one.
+"""
+
+import base64
+import json
+
+MAX_PAGE_SIZE = 200
+
+# resource -> table, ordering column and {filter name: column}
+RESOURCES = {
+    'mod_logs': {
+        'table': 'mod_logs',
+        'order': 'timestamp',
+        'filters': {'guild_id': 'guild_id', 'action': 'action',
+                    'moderator_id': 'moderator_id', 'target_id': 'target_id'},
+    },
+    'warnings': {
+        'table': 'warnings',
+        'order': 'timestamp',
+        'filters': {'guild_id': 'guild_id', 'moderator_id': 'moderator_id', 'target_id': 'user_id'},
+    },
+    'bans': {
+        'table': 'temp_bans',
+        'order': 'expires_at',
+        'filters': {'guild_id': 'guild_id', 'moderator_id': 'moderator_id', 'target_id': 'user_id'},
+    },
+}
+
+# Composite indexes for the filter combinations above that the bot's hot path
+# indexes (migration 4: mod_logs guild/time, guild/target, guild/action and
+# warnings guild/user) don't already cover. The rowid is implicitly the last
+# index column, which keeps the tie breaker ordered too.
+PAGINATION_INDEXES = (
+    ('idx_mod_logs_time', 'mod_logs', 'timestamp'),
+    ('idx_mod_logs_guild_moderator', 'mod_logs', 'guild_id, moderator_id, timestamp'),
+    ('idx_warnings_time', 'warnings', 'timestamp'),
+    ('idx_warnings_guild_time', 'warnings', 'guild_id, timestamp'),
+    ('idx_warnings_guild_moderator', 'warnings', 'guild_id, moderator_id, timestamp'),
+    ('idx_temp_bans_guild_expires', 'temp_bans', 'guild_id, expires_at'),
+)
+
+
+def install_pagination_indexes(cursor):
+    """Create the indexes the paginated API relies on, where the columns exist."""
+    for name, table, columns in PAGINATION_INDEXES:
+        existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        if all(column.strip() in existing for column in columns.split(',')):
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def encode_cursor(order_value, rowid):
+    raw = json.dumps([order_value, rowid]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (order value, rowid); raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        order_value, rowid = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+    if not isinstance(rowid, int):
+        raise ValueError(f"invalid cursor: {cursor!r}")
+    return order_value, rowid
+
+
+def fetch_page(conn, resource, filters=None, cursor=None, limit=50, since=None, until=None):
+    """Return ``{'items': [...], 'next_cursor': str or None}`` for one page.
+
+    ``filters`` maps filter names from ``RESOURCES`` to values; ``None``
+    values are ignored. A filter the resource doesn't support, or whose
+    column this schema lacks, raises ``ValueError`` rather than widening the
+    query. ``since``/``until`` bound the ordering column.
+    """
+    spec = RESOURCES[resource]
+    table, order = spec['table'], spec['order']
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    where = [f"{order} IS NOT NULL"]
+    params = []
+    for name, value in (filters or {}).items():
+        if value is None:
+            continue
+        column = spec['filters'].get(name)
+        if column is None or column not in columns:
+            raise ValueError(f"unsupported filter for {resource}: {name}")
+        where.append(f"{column} = ?")
+        params.append(value)
+
+    if since is not None:
+        where.append(f"{order} >= ?")
+        params.append(since)
+    if until is not None:
+        where.append(f"{order} < ?")
+        params.append(until)
+
+    if cursor:
+        order_value, rowid = decode_cursor(cursor)
+        where.append(f"({order}, rowid) < (?, ?)")
+        params.extend([order_value, rowid])
+
+    query = (
+        f"SELECT rowid AS _rowid, {', '.join(columns)} FROM {table} "
+        f"WHERE {' AND '.join(where)} "
+        f"ORDER BY {order} DESC, rowid DESC LIMIT ?"
+    )
+    rows = conn.execute(query, params + [limit + 1]).fetchall()
+
+    items = []
+    for row in rows[:limit]:
+        item = dict(zip(columns, row[1:]))
+        item.setdefault('id', row[0])
+        items.append(item)
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last[columns.index(order) + 1], last[0])
+
+    return {'items': items, 'next_cursor': next_cursor}
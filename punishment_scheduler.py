@@ -0,0 +1,94 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime
+
+
+def to_timestamp(expires_at):
+    """Convert a stored expiry (datetime or sqlite text) to a POSIX timestamp."""
+    if isinstance(expires_at, str):
+        expires_at = datetime.fromisoformat(expires_at)
+    return expires_at.timestamp()
+
+
+class ExpiryScheduler:
+    """Min-heap of punishment expiries that fires each one at its due time.
+
+    Entries are keyed by ``(kind, guild_id, user_id)``. Rescheduling or
+    cancelling a key leaves the old heap entry in place; it is skipped
+    lazily when it reaches the top. ``handler(kind, guild_id, user_id)`` is
+    awaited for each expiry with at most ``concurrency`` running at once, and
+    may return a number of seconds to retry later.
+    """
+
+    def __init__(self, handler, concurrency=5):
+        self.handler = handler
+        self._heap = []
+        self._due = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._running = set()
+
+    def __len__(self):
+        return len(self._due)
+
+    def schedule(self, kind, guild_id, user_id, expires_at):
+        """Add or move an expiry; ``expires_at`` may be a datetime or timestamp."""
+        if expires_at is None:
+            return
+        if not isinstance(expires_at, (int, float)):
+            expires_at = to_timestamp(expires_at)
+
+        key = (kind, guild_id, user_id)
+        self._due[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, next(self._counter), key))
+        self._wakeup.set()
+
+    def cancel(self, kind, guild_id, user_id):
+        self._due.pop((kind, guild_id, user_id), None)
+
+    def next_due(self):
+        """Timestamp of the next live entry, or None."""
+        while self._heap:
+            due, _, key = self._heap[0]
+            if self._due.get(key) == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    async def run(self):
+        """Fire expiries forever; run this as a background task."""
+        while True:
+            self._wakeup.clear()
+            due = self.next_due()
+
+            if due is None:
+                await self._wakeup.wait()
+                continue
+
+            delay = due - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, key = heapq.heappop(self._heap)
+            del self._due[key]
+            task = asyncio.create_task(self._fire(key))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _fire(self, key):
+        async with self._semaphore:
+            try:
+                retry_after = await self.handler(*key)
+            except Exception as e:
+                print(f"❌ Ceza süresi işlenirken hata ({key}): {e}")
+                retry_after = 60
+
+        if retry_after and key not in self._due:
+            self.schedule(*key, time.time() + retry_after)
@@ -0,0 +1,138 @@
+"""
+Join-velocity raid detection.
+
+Each guild keeps the joins of the last ``window`` seconds in a deque, along
+with how many of them share each cluster feature: the hour the account was
+created, the letters of its name, and its avatar. Joins expire from the
+front as new ones arrive, so the work per join stays constant no matter
+how fast members pour in.
+"""
+
+import re
+import time
+from collections import Counter, deque
+
+import discord
+
+# Accounts created within the same hour fall into the same cluster
+CREATED_BUCKET = 3600
+# Names reduce to their letters, so raider_01 and Raider77 collide
+NAME_NOISE = re.compile(r'[\W\d_]+')
+
+
+def join_features(member):
+    """Cluster keys for a joining member."""
+    features = [('created', int(member.created_at.timestamp() // CREATED_BUCKET))]
+    skeleton = NAME_NOISE.sub('', member.name.lower())
+    if len(skeleton) >= 3:
+        features.append(('name', skeleton))
+    if member.avatar is not None:
+        features.append(('avatar', member.avatar.key))
+    return features
+
+
+def describe_feature(feature):
+    kind, value = feature
+    if kind == 'created':
+        created = time.strftime('%Y-%m-%d %H:00', time.gmtime(value * CREATED_BUCKET))
+        return f"Raid cluster: accounts created {created} UTC"
+    if kind == 'name':
+        return f"Raid cluster: name '{value}'"
+    return "Raid cluster: same avatar"
+
+
+class RaidDetector:
+    """Sliding-window join counter and cluster detector for one guild.
+
+    Reaching ``threshold`` joins within ``window`` seconds starts raid mode,
+    which lasts until no such burst has been seen for ``cooldown`` seconds.
+    Accounts younger than ``min_account_age`` days are always flagged; in
+    raid mode, so is every member of a cluster of ``cluster_size`` or more
+    recent joins, including the ones that joined before it got that big.
+    """
+
+    def __init__(self, window=10, threshold=10, cluster_size=4, min_account_age=7, cooldown=60):
+        self.configure(window, threshold, cluster_size, min_account_age)
+        self.cooldown = cooldown
+        self.raid_until = 0.0
+
+        # (time, member, features) per join in the window
+        self._joins = deque()
+        self._counts = Counter()
+        # feature -> deque of (time, member) not yet flagged
+        self._pending = {}
+        self._flagged = set()
+
+    def configure(self, window, threshold, cluster_size, min_account_age):
+        self.window = window
+        self.threshold = threshold
+        self.cluster_size = cluster_size
+        self.min_account_age = min_account_age
+
+    def in_raid(self, now=None):
+        return (time.monotonic() if now is None else now) < self.raid_until
+
+    def __len__(self):
+        return len(self._joins)
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        while self._joins and self._joins[0][0] < cutoff:
+            _, member, features = self._joins.popleft()
+            self._flagged.discard(member.id)
+            for feature in features:
+                remaining = self._counts[feature] - 1
+                if remaining:
+                    self._counts[feature] = remaining
+                else:
+                    del self._counts[feature]
+
+                pending = self._pending.get(feature)
+                if pending is not None:
+                    while pending and pending[0][0] < cutoff:
+                        pending.popleft()
+                    if not pending:
+                        del self._pending[feature]
+
+    def _flag(self, member, reason, targets):
+        if member.id not in self._flagged:
+            self._flagged.add(member.id)
+            targets.append((member, reason))
+
+    def observe(self, member, now=None):
+        """Record a join.
+
+        Returns ``(raid_started, targets)``, where ``targets`` is a list of
+        ``(member, reason)`` pairs to act on.
+        """
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+
+        features = join_features(member)
+        self._joins.append((now, member, features))
+        for feature in features:
+            self._counts[feature] += 1
+            self._pending.setdefault(feature, deque()).append((now, member))
+
+        started = False
+        if len(self._joins) >= self.threshold:
+            started = not self.in_raid(now)
+            # At least a full window, so a raid's own joins can't start the next one
+            self.raid_until = now + max(self.cooldown, self.window)
+
+        targets = []
+        age = (discord.utils.utcnow() - member.created_at).days
+        if age < self.min_account_age:
+            self._flag(member, f"Account age: {age} days", targets)
+
+        if self.in_raid(now):
+            # Entering raid mode sweeps clusters that formed before the threshold tripped
+            for feature in (list(self._counts) if started else features):
+                if self._counts[feature] < self.cluster_size:
+                    continue
+                pending = self._pending.pop(feature, ())
+                reason = describe_feature(feature)
+                for _, clustered in pending:
+                    self._flag(clustered, reason, targets)
+
+        return started, targets
@@ -1,11 +1,103 @@
+import asyncio
+from collections import Counter
+
 import discord
 from discord.ext import commands
 from utils.embeds import create_embed
+from utils.role_notifications import RoleNotificationQueue
+
+
+def emoji_key(emoji):
+    """Normalize an emoji string or PartialEmoji for index lookups.
+
+    Custom emojis are keyed by ID, so renames and the animated prefix don't
+    matter; unicode emojis drop the variation selector clients add or omit.
+    """
+    if isinstance(emoji, str):
+        emoji = discord.PartialEmoji.from_str(emoji)
+    if emoji.id:
+        return str(emoji.id)
+    return (emoji.name or '').replace('\ufe0f', '')
+
 
 class ReactionRoles(commands.Cog):
+    # Role change DMs: at most this many per second, sent once a member has
+    # stopped toggling for DM_DELAY seconds, and dropped after DM_MAX_AGE;
+    # role edits pause them for at most DM_MAX_HOLD seconds per DM
+    DM_RATE = 1.0
+    DM_DELAY = 5.0
+    DM_MAX_AGE = 300.0
+    DM_MAX_HOLD = 10.0
+    
     def __init__(self, bot):
         self.bot = bot
+        # (message_id, emoji_key) -> {'guild_id', 'role_id', 'channel_id', 'emoji'}
         self.reaction_roles = {}
+        # Reaction role count per message; lets unrelated reactions return early
+        self.role_messages = Counter()
+        self.load_task = None
+        
+        self.notifications = RoleNotificationQueue(
+            self.send_role_notification,
+            rate=self.DM_RATE, delay=self.DM_DELAY, max_age=self.DM_MAX_AGE,
+            max_hold=self.DM_MAX_HOLD,
+            metrics=getattr(bot, 'metrics', None)
+        )
+        self.notification_task = None
+    
+    async def cog_load(self):
+        self.load_task = asyncio.create_task(self.load_reaction_roles())
+        self.notification_task = asyncio.create_task(self.notifications.run())
+    
+    async def cog_unload(self):
+        if self.load_task:
+            self.load_task.cancel()
+        if self.notification_task:
+            self.notification_task.cancel()
+    
+    async def load_reaction_roles(self):
+        """Build the index once; commands keep it current afterwards."""
+        await self.bot.wait_until_ready()
+        
+        try:
+            result = await self.bot.db.execute_query(
+                "SELECT guild_id, message_id, emoji, role_id, channel_id FROM reaction_roles", fetch=True
+            )
+        except Exception as e:
+            print(f"❌ Reaction roles yüklenirken hata: {e}")
+            return
+        
+        for guild_id, message_id, emoji, role_id, channel_id in result:
+            self._index(guild_id, message_id, emoji, role_id, channel_id)
+        
+        print(f"✅ {len(result)} reaction role yüklendi!")
+    
+    def _index(self, guild_id, message_id, emoji, role_id, channel_id):
+        key = (message_id, emoji_key(emoji))
+        if key not in self.reaction_roles:
+            self.role_messages[message_id] += 1
+        self.reaction_roles[key] = {
+            'guild_id': guild_id,
+            'role_id': role_id,
+            'channel_id': channel_id,
+            'emoji': emoji
+        }
+    
+    def _unindex(self, message_id, emoji):
+        entry = self.reaction_roles.pop((message_id, emoji_key(emoji)), None)
+        if entry is not None:
+            self.role_messages[message_id] -= 1
+            if not self.role_messages[message_id]:
+                del self.role_messages[message_id]
+        return entry
+    
+    def _lookup(self, payload):
+        """Return the index entry for a raw reaction event, if any."""
+        if payload.message_id not in self.role_messages:
+            return None
+        if payload.user_id == self.bot.user.id:
+            return None
+        return self.reaction_roles.get((payload.message_id, emoji_key(payload.emoji)))
     
     @commands.command()
     @commands.has_permissions(manage_roles=True)
@@ -33,19 +125,22 @@ class ReactionRoles(commands.Cog):
         # Add reaction to message
         await message.add_reaction(emoji)
         
+        # The same emoji may have been stored in another spelling
+        previous = self._unindex(message.id, emoji)
+        if previous and previous['emoji'] != emoji:
+            await self.bot.db.execute_query(
+                "DELETE FROM reaction_roles WHERE message_id = ? AND emoji = ?",
+                (message.id, previous['emoji'])
+            )
+        
         # Store in database
         await self.bot.db.execute_query(
-            "INSERT OR REPLACE INTO reaction_roles VALUES (?, ?, ?, ?, ?)",
+            "INSERT OR REPLACE INTO reaction_roles (guild_id, message_id, emoji, role_id, channel_id) VALUES (?, ?, ?, ?, ?)",
             (ctx.guild.id, message.id, emoji, role.id, ctx.channel.id)
         )
         
         # Store in memory
-        key = f"{message.id}_{emoji}"
-        self.reaction_roles[key] = {
-            'guild_id': ctx.guild.id,
-            'role_id': role.id,
-            'channel_id': ctx.channel.id
-        }
+        self._index(ctx.guild.id, message.id, emoji, role.id, ctx.channel.id)
         
         embed = create_embed(
             title="✅ Reaction role eklendi!",
@@ -64,17 +159,14 @@ class ReactionRoles(commands.Cog):
         except:
             pass
         
-        # Remove from database
+        # Remove from memory, then the stored spelling from the database
+        entry = self._unindex(message_id, emoji)
+        stored_emoji = entry['emoji'] if entry else emoji
         await self.bot.db.execute_query(
             "DELETE FROM reaction_roles WHERE guild_id = ? AND message_id = ? AND emoji = ?",
-            (ctx.guild.id, message_id, emoji)
+            (ctx.guild.id, message_id, stored_emoji)
         )
         
-        # Remove from memory
-        key = f"{message_id}_{emoji}"
-        if key in self.reaction_roles:
-            del self.reaction_roles[key]
-        
         embed = create_embed(
             title="✅ Reaction role kaldırıldı!",
             description=f"**Mesaj ID:** {message_id}\n**Emoji:** {emoji}",
@@ -112,7 +204,7 @@ class ReactionRoles(commands.Cog):
         """List all reaction roles in the server."""
         # Get reaction roles from database
         result = await self.bot.db.execute_query(
-            "SELECT * FROM reaction_roles WHERE guild_id = ?",
+            "SELECT guild_id, message_id, emoji, role_id, channel_id FROM reaction_roles WHERE guild_id = ?",
             (ctx.guild.id,), fetch=True
         )
         
@@ -145,35 +237,50 @@ class ReactionRoles(commands.Cog):
         
         await ctx.send(embed=embed)
     
-    @commands.Cog.listener()
-    async def on_ready(self):
-        """Load reaction roles from database on bot start."""
+    async def send_role_notification(self, member, guild, added, removed):
+        """DM a member the net result of their recent reaction role changes."""
+        if guild.get_member(member.id) is None:
+            return
+        
+        lines = [f"**{guild.name}** sunucusunda:"]
+        lines += [f"✅ **{role.name}** rolü aldınız." for role in added]
+        lines += [f"❌ **{role.name}** rolünüz alındı." for role in removed]
+        
+        embed = create_embed(
+            title="🎭 Rolleriniz güncellendi!",
+            description="\n".join(lines),
+            color=discord.Color.green() if added else discord.Color.red()
+        )
         try:
-            result = await self.bot.db.execute_query(
-                "SELECT * FROM reaction_roles", fetch=True
-            )
-            
-            for guild_id, message_id, emoji, role_id, channel_id in result:
-                key = f"{message_id}_{emoji}"
-                self.reaction_roles[key] = {
-                    'guild_id': guild_id,
-                    'role_id': role_id,
-                    'channel_id': channel_id
-                }
-            
-            print(f"✅ {len(result)} reaction role yüklendi!")
-            
-        except Exception as e:
-            print(f"❌ Reaction roles yüklenirken hata: {e}")
+            await member.send(embed=embed)
+        except discord.HTTPException:
+            # DMs closed
+            pass
+    
+    @commands.command()
+    @commands.has_permissions(manage_roles=True)
+    async def reactionrolequeue(self, ctx):
+        """Show the reaction role DM queue."""
+        stats = self.notifications.stats()
+        embed = create_embed(
+            title="📬 Rol Bildirim Kuyruğu",
+            description=(
+                f"**Bekleyen:** {stats['depth']}\n"
+                f"**Gönderilen:** {stats['sent']}\n"
+                f"**Birleştirilen:** {stats['coalesced']}\n"
+                f"**Süresi geçen:** {stats['dropped']}\n"
+                f"**Başarısız:** {stats['failed']}"
+            ),
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text=f"Hız: saniyede {self.DM_RATE:g} DM • {'Duraklatıldı' if stats['held'] else 'Çalışıyor'}")
+        await ctx.send(embed=embed)
     
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
         """Handle reaction role assignment."""
-        if payload.user_id == self.bot.user.id:
-            return
-        
-        key = f"{payload.message_id}_{payload.emoji}"
-        if key not in self.reaction_roles:
+        entry = self._lookup(payload)
+        if entry is None:
             return
         
         guild = self.bot.get_guild(payload.guild_id)
@@ -184,38 +291,26 @@ class ReactionRoles(commands.Cog):
         if not member:
             return
         
-        role_id = self.reaction_roles[key]['role_id']
-        role = guild.get_role(role_id)
+        role = guild.get_role(entry['role_id'])
         
         if not role:
             return
         
         if role not in member.roles:
             try:
-                await member.add_roles(role, reason="Reaction role")
-                
-                # Send DM notification
-                try:
-                    embed = create_embed(
-                        title="✅ Rol verildi!",
-                        description=f"**{guild.name}** sunucusunda **{role.name}** rolü aldınız.",
-                        color=discord.Color.green()
-                    )
-                    await member.send(embed=embed)
-                except:
-                    pass
-                    
+                with self.notifications.hold():
+                    await member.add_roles(role, reason="Reaction role")
             except discord.HTTPException:
-                pass
+                return
+            
+            # DM notification, coalesced and sent in the background
+            self.notifications.push(member, role, added=True)
     
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload):
         """Handle reaction role removal."""
-        if payload.user_id == self.bot.user.id:
-            return
-        
-        key = f"{payload.message_id}_{payload.emoji}"
-        if key not in self.reaction_roles:
+        entry = self._lookup(payload)
+        if entry is None:
             return
         
         guild = self.bot.get_guild(payload.guild_id)
@@ -226,29 +321,20 @@ class ReactionRoles(commands.Cog):
         if not member:
             return
         
-        role_id = self.reaction_roles[key]['role_id']
-        role = guild.get_role(role_id)
+        role = guild.get_role(entry['role_id'])
         
         if not role:
             return
         
         if role in member.roles:
             try:
-                await member.remove_roles(role, reason="Reaction role removed")
-                
-                # Send DM notification
-                try:
-                    embed = create_embed(
-                        title="❌ Rol alındı!",
-                        description=f"**{guild.name}** sunucusunda **{role.name}** rolünüz alındı.",
-                        color=discord.Color.red()
-                    )
-                    await member.send(embed=embed)
-                except:
-                    pass
-                    
+                with self.notifications.hold():
+                    await member.remove_roles(role, reason="Reaction role removed")
             except discord.HTTPException:
-                pass
+                return
+            
+            # DM notification, coalesced and sent in the background
+            self.notifications.push(member, role, added=False)
 
 async def setup(bot):
     await bot.add_cog(ReactionRoles(bot))
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+Conditional-GET response cache for the dashboard's JSON APIs.
+
+Cached bodies are keyed by path and query string and dropped as soon as
+the database changes, detected through ``PRAGMA data_version`` on one
+long-lived read-only connection. A short TTL covers values that depend on
+the clock (active bans and mutes). Responses carry ETag and Last-Modified
+so refreshing browsers get 304s while the bot is idle.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+
+
+class DataVersion:
+    """Counts database changes made by any other connection."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._last = None
+        self.generation = 0
+
+    def current(self):
+        """Return the change generation, or None if the database is not there yet."""
+        with self._lock:
+            try:
+                if self._conn is None:
+                    self._conn = sqlite3.connect(
+                        f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False
+                    )
+                version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            except sqlite3.Error:
+                return None
+
+            if version != self._last:
+                self._last = version
+                self.generation += 1
+            return self.generation
+
+
+class ResponseCache:
+    def __init__(self, version, ttl=5, max_entries=256):
+        self.version = version
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def cached(self, view):
+        """Cache GET responses of ``view`` and answer conditional requests."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+
+            generation = self.version.current()
+            if generation is None:
+                return view(*args, **kwargs)
+
+            key = (request.path, request.query_string)
+            entry = self._lookup(key)
+            fresh = (
+                entry is not None
+                and entry['generation'] == generation
+                and time.monotonic() - entry['stored_at'] < self.ttl
+            )
+
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+                body = response.get_data()
+                etag = hashlib.sha1(body).hexdigest()
+                if entry is not None and entry['etag'] == etag:
+                    # Rebuilt but unchanged; keep the old validators so clients still get 304
+                    last_modified = entry['last_modified']
+                else:
+                    last_modified = time.time()
+
+                entry = {
+                    'generation': generation,
+                    'stored_at': time.monotonic(),
+                    'body': body,
+                    'mimetype': response.mimetype,
+                    'etag': etag,
+                    'last_modified': last_modified,
+                }
+                self._store(key, entry)
+
+            response = current_app.response_class(entry['body'], mimetype=entry['mimetype'])
+            response.set_etag(entry['etag'])
+            response.last_modified = entry['last_modified']
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+
+        return wrapper
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'data_generation': self.version.generation
+        }
@@ -3,10 +3,41 @@ import asyncio
 from discord.ext import commands
 from utils.embeds import create_embed
 from utils.helpers import get_text
+from utils.bulk_jobs import AdaptiveConcurrency, ThrottledProgress
 
 class RoleManagement(commands.Cog):
+    # Members per checkpoint, and seconds between progress message edits
+    MASSROLE_CHUNK = 50
+    PROGRESS_INTERVAL = 5.0
+    
     def __init__(self, bot):
         self.bot = bot
+        # job_id -> (job dict, worker task) for mass role jobs running in this process
+        self.massrole_jobs = {}
+        self.resume_task = None
+    
+    async def cog_load(self):
+        self.resume_task = asyncio.create_task(self.resume_massroles())
+    
+    async def cog_unload(self):
+        if self.resume_task:
+            self.resume_task.cancel()
+        # Jobs stay 'running' in the database and resume on the next load
+        for _, task in self.massrole_jobs.values():
+            task.cancel()
+    
+    async def resume_massroles(self):
+        """Restart mass role jobs that were interrupted by a restart."""
+        await self.bot.wait_until_ready()
+        
+        for job in await self.bot.db.get_mod_jobs('massrole'):
+            print(f"🔁 Toplu rol işlemi #{job['id']} devam ediyor ({job['position']}/{len(job['targets'])})")
+            self.start_massrole(job)
+    
+    def start_massrole(self, job):
+        task = asyncio.create_task(self.run_massrole(job))
+        self.massrole_jobs[job['id']] = (job, task)
+        task.add_done_callback(lambda _: self.massrole_jobs.pop(job['id'], None))
     
     @commands.command()
     @commands.has_permissions(manage_roles=True)
@@ -211,7 +242,7 @@ class RoleManagement(commands.Cog):
     @commands.command()
     @commands.has_permissions(manage_roles=True)
     @commands.bot_has_permissions(manage_roles=True)
-    async def massrole(self, ctx, action, role, *, target="all"):
+    async def massrole(self, ctx, action, role: discord.Role, *, target="all"):
         """Mass add/remove roles from users."""
         if role >= ctx.guild.me.top_role:
             embed = create_embed(
@@ -229,7 +260,8 @@ class RoleManagement(commands.Cog):
             )
             return await ctx.send(embed=embed)
         
-        # Determine target members
+        # Determine target members; skip those the action would not change
+        adding = action.lower() in ['add', 'ekle']
         if target.lower() in ['all', 'hepsi', 'tümü']:
             members = ctx.guild.members
         elif target.lower() in ['bots', 'botlar']:
@@ -244,6 +276,8 @@ class RoleManagement(commands.Cog):
             )
             return await ctx.send(embed=embed)
         
+        members = [m for m in members if (role in m.roles) != adding]
+        
         # Confirm action
         member_count = len(members)
         embed = create_embed(
@@ -279,43 +313,162 @@ class RoleManagement(commands.Cog):
             await confirm_msg.edit(embed=embed)
             return
         
-        # Perform mass role operation
-        success_count = 0
-        failed_count = 0
+        # Run as a persisted background job so a restart resumes instead of starting over
+        job = {
+            'guild_id': ctx.guild.id,
+            'channel_id': ctx.channel.id,
+            'message_id': confirm_msg.id,
+            'moderator_id': ctx.author.id,
+            'targets': [m.id for m in members],
+            'options': {
+                'action': 'add' if adding else 'remove',
+                'role_id': role.id,
+                'reason': f"Mass role {'add' if adding else 'remove'} by {ctx.author}"
+            },
+            'position': 0,
+            'succeeded': 0,
+            'failed': 0
+        }
+        job['id'] = await self.bot.db.create_mod_job(
+            'massrole', ctx.guild.id, ctx.channel.id, ctx.author.id, job['targets'], job['options']
+        )
+        await self.bot.db.set_mod_job_message(job['id'], confirm_msg.id)
+        
+        self.start_massrole(job)
+    
+    async def run_massrole(self, job):
+        """Work through a mass role job, checkpointing after every chunk of members."""
+        guild = self.bot.get_guild(job['guild_id'])
+        if not guild:
+            # Stays 'running' and is retried on the next start
+            return
+        
+        role = guild.get_role(job['options']['role_id'])
+        channel = guild.get_channel(job['channel_id'])
+        progress = ThrottledProgress(
+            channel.get_partial_message(job['message_id']) if channel and job['message_id'] else None,
+            self.PROGRESS_INTERVAL
+        )
+        targets = job['targets']
         
         embed = create_embed(
             title="⏳ Toplu rol işlemi başlatıldı...",
-            description=f"İşlem devam ediyor... 0/{member_count}",
+            description=self._massrole_progress(job),
             color=discord.Color.blue()
         )
-        await confirm_msg.edit(embed=embed)
+        embed.set_footer(text=f"İş #{job['id']} • !massrolestatus {job['id']} • !massrolecancel {job['id']}")
+        await progress.update(embed, force=True)
         
-        for i, member in enumerate(members):
-            try:
-                if action.lower() in ['add', 'ekle']:
-                    if role not in member.roles:
-                        await member.add_roles(role, reason=f"Mass role add by {ctx.author}")
-                        success_count += 1
-                else:  # remove
-                    if role in member.roles:
-                        await member.remove_roles(role, reason=f"Mass role remove by {ctx.author}")
-                        success_count += 1
-                
-                # Update progress every 10 members
-                if (i + 1) % 10 == 0:
-                    embed.description = f"İşlem devam ediyor... {i + 1}/{member_count}"
-                    await confirm_msg.edit(embed=embed)
-                    
-            except:
-                failed_count += 1
+        if role is None:
+            job['failed'] += len(targets) - job['position']
+            job['position'] = len(targets)
+        
+        limiter = AdaptiveConcurrency(minimum=1, maximum=10)
+        while job['position'] < len(targets):
+            chunk = targets[job['position']:job['position'] + self.MASSROLE_CHUNK]
+            results = await asyncio.gather(*(
+                self._apply_massrole(guild, role, user_id, job['options'], limiter) for user_id in chunk
+            ))
+            
+            job['position'] += len(chunk)
+            job['succeeded'] += sum(results)
+            job['failed'] += len(results) - sum(results)
+            await self.bot.db.checkpoint_mod_job(job['id'], job['position'], job['succeeded'], job['failed'])
+            
+            embed.description = self._massrole_progress(job)
+            await progress.update(embed)
+        
+        await self.bot.db.checkpoint_mod_job(
+            job['id'], job['position'], job['succeeded'], job['failed'], status='done'
+        )
         
         # Final result
         embed = create_embed(
             title="✅ Toplu rol işlemi tamamlandı!",
-            description=f"**Başarılı:** {success_count}\n**Başarısız:** {failed_count}\n**Toplam:** {success_count + failed_count}",
+            description=f"**Başarılı:** {job['succeeded']}\n**Başarısız:** {job['failed']}\n**Toplam:** {len(targets)}",
             color=discord.Color.green()
         )
-        await confirm_msg.edit(embed=embed)
+        await progress.update(embed, force=True)
+    
+    async def _apply_massrole(self, guild, role, user_id, options, limiter):
+        """Add or remove the role for one member; True if they end up as intended."""
+        member = guild.get_member(user_id)
+        if member is None:
+            return False
+        
+        adding = options['action'] == 'add'
+        if (role in member.roles) == adding:
+            # Changed by someone else since the job was queued
+            return True
+        
+        async with limiter.slot():
+            try:
+                if adding:
+                    await member.add_roles(role, reason=options['reason'])
+                else:
+                    await member.remove_roles(role, reason=options['reason'])
+            except discord.HTTPException:
+                return False
+        return True
+    
+    def _massrole_progress(self, job):
+        return f"İşlem devam ediyor... {job['position']}/{len(job['targets'])} (✅ {job['succeeded']} • ❌ {job['failed']})"
+    
+    @commands.command()
+    @commands.has_permissions(manage_roles=True)
+    async def massrolestatus(self, ctx, job_id: int = None):
+        """Show running mass role jobs, or one job by ID."""
+        if job_id is None:
+            jobs = [job for job, _ in self.massrole_jobs.values() if job['guild_id'] == ctx.guild.id]
+        else:
+            running = self.massrole_jobs.get(job_id)
+            job = running[0] if running else await self.bot.db.get_mod_job(job_id)
+            jobs = [job] if job and job['guild_id'] == ctx.guild.id else []
+        
+        embed = create_embed(
+            title="📋 Toplu Rol İşleri",
+            color=discord.Color.blue()
+        )
+        
+        if not jobs:
+            embed.description = "Çalışan toplu rol işi yok." if job_id is None else f"`#{job_id}` bulunamadı."
+            return await ctx.send(embed=embed)
+        
+        for job in jobs:
+            role = ctx.guild.get_role(job['options']['role_id'])
+            status = 'running' if job['id'] in self.massrole_jobs else job.get('status', 'running')
+            embed.add_field(
+                name=f"#{job['id']} • {job['options']['action']} {role.name if role else 'silinmiş rol'} • {status}",
+                value=self._massrole_progress(job),
+                inline=False
+            )
+        await ctx.send(embed=embed)
+    
+    @commands.command()
+    @commands.has_permissions(manage_roles=True)
+    async def massrolecancel(self, ctx, job_id: int):
+        """Cancel a running mass role job."""
+        running = self.massrole_jobs.get(job_id)
+        if not running or running[0]['guild_id'] != ctx.guild.id:
+            embed = create_embed(
+                title="❌ İş bulunamadı!",
+                description=f"`#{job_id}` numaralı çalışan bir toplu rol işi yok.",
+                color=discord.Color.red()
+            )
+            return await ctx.send(embed=embed)
+        
+        job, task = running
+        task.cancel()
+        await self.bot.db.checkpoint_mod_job(
+            job_id, job['position'], job['succeeded'], job['failed'], status='cancelled'
+        )
+        
+        embed = create_embed(
+            title="🛑 Toplu rol işlemi iptal edildi!",
+            description=self._massrole_progress(job),
+            color=discord.Color.orange()
+        )
+        await ctx.send(embed=embed)
 
 async def setup(bot):
     await bot.add_cog(RoleManagement(bot))
\ No newline at end of file
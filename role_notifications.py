@@ -0,0 +1,154 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class RoleNotificationQueue:
+    """Coalescing, rate-limited queue of "your roles changed" DMs.
+
+    Changes are keyed by ``(guild_id, member_id)``. A member's changes are
+    held for ``delay`` seconds after the last one, so add/remove toggles
+    collapse into one message and a role toggled back to where it started
+    is dropped entirely. Notifications older than ``max_age`` are discarded
+    instead of sent. ``send(member, guild, added, removed)`` is awaited for
+    at most ``rate`` DMs per second, and not while a role edit holds the
+    queue, so DMs only use rate limit headroom the edits don't need. A
+    queue that has been held for ``max_hold`` seconds sends one DM anyway,
+    so a steady stream of edits slows DMs down instead of starving them.
+    """
+
+    def __init__(self, send, rate=1.0, delay=5.0, max_age=300.0, max_hold=10.0, metrics=None):
+        self.send = send
+        self.rate = rate
+        self.delay = delay
+        self.max_age = max_age
+        self.max_hold = max_hold
+        self.metrics = metrics
+
+        # key -> {'member', 'guild', 'roles': {role_id: [role, had_role, has_role]}, 'first', 'last'}
+        self._pending = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._holds = 0
+        self._released = asyncio.Event()
+        self._released.set()
+
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _record(self, result=None, amount=1):
+        if self.metrics:
+            if result is not None:
+                self.metrics.inc('ironward_dm_notifications_total', amount, result=result)
+            self.metrics.set('ironward_dm_queue_depth', len(self._pending))
+
+    def push(self, member, role, added):
+        """Queue a role change for ``member``; ``added`` is False for a removal."""
+        key = (member.guild.id, member.id)
+        now = time.monotonic()
+
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = {
+                'member': member, 'guild': member.guild, 'roles': {}, 'first': now, 'last': now
+            }
+        else:
+            self.coalesced += 1
+            self._record('coalesced')
+            entry['member'] = member
+            entry['last'] = now
+            # Oldest change first, so the head is always the next one due
+            self._pending.move_to_end(key)
+
+        change = entry['roles'].get(role.id)
+        if change is None:
+            entry['roles'][role.id] = [role, not added, added]
+        elif change[1] == added:
+            # Back where it started; nothing to tell the member
+            del entry['roles'][role.id]
+        else:
+            change[2] = added
+
+        if not entry['roles']:
+            del self._pending[key]
+
+        self._record()
+        self._wakeup.set()
+
+    @contextmanager
+    def hold(self):
+        """Pause sending for the duration of the ``with`` block."""
+        self._holds += 1
+        self._released.clear()
+        try:
+            yield
+        finally:
+            self._holds -= 1
+            if not self._holds:
+                self._released.set()
+
+    async def run(self):
+        """Send notifications forever; run this as a background task."""
+        held_since = None
+        while True:
+            self._wakeup.clear()
+            if not self._pending:
+                await self._wakeup.wait()
+                continue
+
+            key, entry = next(iter(self._pending.items()))
+            wait = entry['last'] + self.delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            if not self._released.is_set():
+                now = time.monotonic()
+                if held_since is None:
+                    held_since = now
+                if now - held_since < self.max_hold:
+                    try:
+                        await asyncio.wait_for(self._released.wait(), held_since + self.max_hold - now)
+                    except asyncio.TimeoutError:
+                        pass
+                    # Changes may have arrived meanwhile; look at the head again
+                    continue
+            held_since = None
+
+            del self._pending[key]
+            # Counted when it leaves the queue, so toggles that cancel out are not
+            self._record('queued')
+
+            if time.monotonic() - entry['first'] > self.max_age:
+                self.dropped += 1
+                self._record('dropped')
+                continue
+
+            added = [role for role, _, has_role in entry['roles'].values() if has_role]
+            removed = [role for role, _, has_role in entry['roles'].values() if not has_role]
+            try:
+                await self.send(entry['member'], entry['guild'], added, removed)
+            except Exception as e:
+                self.failed += 1
+                self._record('failed')
+                print(f"❌ Rol bildirimi gönderilemedi: {e}")
+            else:
+                self.sent += 1
+                self._record('sent')
+
+            await asyncio.sleep(1 / self.rate)
+
+    def stats(self):
+        return {
+            'depth': len(self._pending),
+            'held': self._holds > 0,
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'failed': self.failed
+        }
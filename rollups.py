@@ -0,0 +1,166 @@
+"""
+Daily and lifetime moderation counters, maintained by SQLite triggers.
+
+Shared by the bot's migrations and the dashboard's demo database, so both
+schemas (``muted_users`` in the bot, ``mutes`` in the demo) are handled.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+# (table, metric, time column or None, keep a live total that follows deletes)
+SOURCES = (
+    ('warnings', 'warnings', 'timestamp', True),
+    ('temp_bans', 'bans', 'banned_at', False),
+    ('muted_users', 'mutes', None, False),
+    ('mutes', 'mutes', 'muted_at', False),
+    ('mod_logs', 'mod_logs', 'timestamp', False),
+)
+
+
+def _columns(cursor, table):
+    return {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+
+
+def install_rollups(cursor):
+    """Create the rollup tables and triggers and backfill existing rows.
+
+    Safe to call on a database that already has them. Per-action mod log
+    counters are stored under ``action:<ACTION>``; rows without a guild are
+    counted under guild 0 rather than failing the insert.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            day TEXT NOT NULL,
+            guild_id INTEGER NOT NULL,
+            metric TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, guild_id, metric)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_stats_guild ON daily_stats (guild_id, day)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stat_totals (
+            guild_id INTEGER NOT NULL,
+            metric TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, metric)
+        ) WITHOUT ROWID
+    """)
+
+    for table, metric, time_column, follows_deletes in SOURCES:
+        columns = _columns(cursor, table)
+        if not columns:
+            continue
+
+        trigger = f"rollup_{table}_insert"
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (trigger,)
+        ).fetchone()
+        if exists:
+            continue
+
+        if time_column not in columns:
+            time_column = None
+        day = f"DATE(COALESCE(NEW.{time_column}, 'now'))" if time_column else "DATE('now')"
+
+        bumps = [(f"'{metric}'", day)]
+        if table == 'mod_logs':
+            bumps.append(("'action:' || COALESCE(UPPER(NEW.action), '')", day))
+
+        body = []
+        for metric_sql, day_sql in bumps:
+            body.append(f"""
+                INSERT INTO daily_stats (day, guild_id, metric, count)
+                VALUES ({day_sql}, COALESCE(NEW.guild_id, 0), {metric_sql}, 1)
+                ON CONFLICT (day, guild_id, metric) DO UPDATE SET count = count + 1;""")
+        body.append(f"""
+                INSERT INTO stat_totals (guild_id, metric, count)
+                VALUES (COALESCE(NEW.guild_id, 0), '{metric}', 1)
+                ON CONFLICT (guild_id, metric) DO UPDATE SET count = count + 1;""")
+
+        cursor.execute(f"CREATE TRIGGER {trigger} AFTER INSERT ON {table} BEGIN {''.join(body)} END")
+
+        if follows_deletes:
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS rollup_{table}_delete AFTER DELETE ON {table} BEGIN
+                    UPDATE stat_totals SET count = count - 1
+                    WHERE guild_id = COALESCE(OLD.guild_id, 0) AND metric = '{metric}';
+                END
+            """)
+
+        _backfill(cursor, table, metric, time_column)
+
+
+def _backfill(cursor, table, metric, time_column):
+    """Fold rows written before the triggers existed into the counters."""
+    day = f"DATE(COALESCE({time_column}, 'now'))" if time_column else "DATE('now')"
+
+    cursor.execute(f"""
+        INSERT INTO daily_stats (day, guild_id, metric, count)
+        SELECT {day}, COALESCE(guild_id, 0), '{metric}', COUNT(*) FROM {table} GROUP BY 1, 2
+        ON CONFLICT (day, guild_id, metric) DO UPDATE SET count = count + excluded.count
+    """)
+    if table == 'mod_logs':
+        cursor.execute(f"""
+            INSERT INTO daily_stats (day, guild_id, metric, count)
+            SELECT {day}, COALESCE(guild_id, 0), 'action:' || COALESCE(UPPER(action), ''), COUNT(*) FROM {table} GROUP BY 1, 2, 3
+            ON CONFLICT (day, guild_id, metric) DO UPDATE SET count = count + excluded.count
+        """)
+    cursor.execute(f"""
+        INSERT INTO stat_totals (guild_id, metric, count)
+        SELECT COALESCE(guild_id, 0), '{metric}', COUNT(*) FROM {table} GROUP BY 1
+        ON CONFLICT (guild_id, metric) DO UPDATE SET count = count + excluded.count
+    """)
+
+
+def daily_counts(conn, days=30, metrics=('warnings', 'bans', 'mutes'), guild_id=None):
+    """Return one dict per day, newest first, with a count for each metric."""
+    # The triggers bucket with SQLite's date('now'), which is UTC
+    today = datetime.now(timezone.utc)
+    start = (today - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+
+    query = "SELECT day, metric, SUM(count) FROM daily_stats WHERE day >= ?"
+    params = [start]
+    if guild_id is not None:
+        query += " AND guild_id = ?"
+        params.append(guild_id)
+    query += f" AND metric IN ({', '.join('?' * len(metrics))}) GROUP BY day, metric"
+    params.extend(metrics)
+
+    counts = {}
+    for day, metric, count in conn.execute(query, params):
+        counts.setdefault(day, {})[metric] = count
+
+    result = []
+    for offset in range(days):
+        date = today - timedelta(days=offset)
+        date_str = date.strftime('%Y-%m-%d')
+        row = {'date': date, 'date_str': date_str}
+        for metric in metrics:
+            row[metric] = counts.get(date_str, {}).get(metric, 0)
+        result.append(row)
+    return result
+
+
+def totals(conn, guild_id=None):
+    """Return lifetime counters, for one guild or summed over all guilds."""
+    if guild_id is None:
+        rows = conn.execute("SELECT metric, SUM(count) FROM stat_totals GROUP BY metric")
+    else:
+        rows = conn.execute("SELECT metric, count FROM stat_totals WHERE guild_id = ?", (guild_id,))
+    return {metric: count for metric, count in rows}
+
+
+def top_guilds(conn, limit=10):
+    """Guilds with the most warnings, with their ban and mute counters."""
+    return conn.execute("""
+        SELECT guild_id,
+               SUM(CASE WHEN metric = 'warnings' THEN count ELSE 0 END) AS warnings,
+               SUM(CASE WHEN metric = 'bans' THEN count ELSE 0 END) AS bans,
+               SUM(CASE WHEN metric = 'mutes' THEN count ELSE 0 END) AS mutes
+        FROM stat_totals
+        WHERE metric IN ('warnings', 'bans', 'mutes')
+        GROUP BY guild_id
+        ORDER BY warnings DESC
+        LIMIT ?
+    """, (limit,)).fetchall()
@@ -3,16 +3,81 @@ import discord
 from discord.ext import commands
 import asyncio
 import re
-from datetime import datetime, timedelta
 from utils.embeds import create_embed
 from utils.permissions import hierarchy_check
 from utils.helpers import get_text, parse_time
+from utils.bulk_jobs import AdaptiveConcurrency
+from utils.raid_detector import RaidDetector
 
 class SecurityModeration(commands.Cog):
+    # Discord's bulk ban endpoint takes at most 200 users per request
+    BULK_BAN_CHUNK = 200
+    # Without it, bans are checkpointed every this many
+    SINGLE_BAN_CHUNK = 20
+    # Seconds a raid's queued actions accumulate before being applied as one batch
+    RAID_BATCH_INTERVAL = 2.0
+    # !antiraidset name -> (raid_settings column, minimum value)
+    RAID_SETTINGS = {
+        'joins': ('join_threshold', 2),
+        'window': ('join_window', 1),
+        'cluster': ('cluster_size', 2),
+        'age': ('min_account_age', 0)
+    }
+    
     def __init__(self, bot):
         self.bot = bot
-        self.raid_protection = {}
+        # guild_id -> anti-raid settings, loaded from the database in cog_load
+        self.raid_settings = {}
+        self.raid_detectors = {}
+        # guild_id -> state of a raid being handled in batch mode
+        self.raids = {}
         self.lockdown_channels = {}
+        self.resume_task = None
+        self.load_task = None
+    
+    async def cog_load(self):
+        self.resume_task = asyncio.create_task(self.resume_massbans())
+        self.load_task = asyncio.create_task(self.load_raid_settings())
+    
+    async def cog_unload(self):
+        if self.resume_task:
+            self.resume_task.cancel()
+        if self.load_task:
+            self.load_task.cancel()
+        for raid in self.raids.values():
+            raid['task'].cancel()
+    
+    async def load_raid_settings(self):
+        """Load anti-raid settings once; commands keep them in sync afterwards."""
+        await self.bot.wait_until_ready()
+        
+        self.raid_settings = await self.bot.db.get_raid_settings()
+        for guild_id, settings in self.raid_settings.items():
+            self._apply_raid_settings(guild_id, settings)
+        print(f"✅ Anti-raid ayarları yüklendi ({sum(1 for s in self.raid_settings.values() if s['enabled'])} sunucuda açık)")
+    
+    def _apply_raid_settings(self, guild_id, settings):
+        detector = self.raid_detectors.get(guild_id)
+        limits = (settings['join_window'], settings['join_threshold'], settings['cluster_size'], settings['min_account_age'])
+        if detector is None:
+            self.raid_detectors[guild_id] = RaidDetector(*limits)
+        else:
+            # Keep the join window so a raid in progress is still tracked
+            detector.configure(*limits)
+    
+    async def _update_raid_setting(self, guild_id, setting, value):
+        await self.bot.db.update_raid_setting(guild_id, setting, value)
+        settings = self.raid_settings.setdefault(guild_id, dict(self.bot.db.RAID_SETTING_DEFAULTS))
+        settings[setting] = value
+        self._apply_raid_settings(guild_id, settings)
+    
+    async def resume_massbans(self):
+        """Finish mass bans that were interrupted by a restart."""
+        await self.bot.wait_until_ready()
+        
+        for job in await self.bot.db.get_mod_jobs('massban'):
+            print(f"🔁 Toplu yasaklama #{job['id']} devam ediyor ({job['position']}/{len(job['targets'])})")
+            await self.run_massban(job)
     
     @commands.command()
     @commands.has_permissions(administrator=True)
@@ -177,46 +242,107 @@ class SecurityModeration(commands.Cog):
             await confirm_msg.edit(embed=embed)
             return
         
-        # Toplu yasaklama işlemi
-        banned_count = 0
-        failed_count = 0
+        # Toplu yasaklama işlemi; ilerleme kaydedilir, yeniden başlatmada devam eder
+        user_id_list = list(dict.fromkeys(user_id_list))
+        job = {
+            'kind': 'massban',
+            'guild_id': ctx.guild.id,
+            'channel_id': ctx.channel.id,
+            'message_id': confirm_msg.id,
+            'moderator_id': ctx.author.id,
+            'targets': user_id_list,
+            'options': {'reason': f"Mass ban by {ctx.author}"},
+            'position': 0,
+            'succeeded': 0,
+            'failed': 0
+        }
+        job['id'] = await self.bot.db.create_mod_job(
+            'massban', ctx.guild.id, ctx.channel.id, ctx.author.id, user_id_list, job['options']
+        )
+        await self.bot.db.set_mod_job_message(job['id'], confirm_msg.id)
+        
+        await self.run_massban(job)
+    
+    async def run_massban(self, job):
+        """Ban a job's remaining targets, checkpointing progress and logs after every chunk.
+        
+        Targets are banned as discord.Object, so no user lookups are needed.
+        The bulk ban endpoint is used when the library and permissions allow
+        it; single bans are paced by the library from the rate limit headers.
+        """
+        guild = self.bot.get_guild(job['guild_id'])
+        if not guild:
+            # Stays 'running' and is retried on the next start
+            return
+        
+        channel = guild.get_channel(job['channel_id'])
+        progress_message = channel.get_partial_message(job['message_id']) if channel and job['message_id'] else None
+        
+        targets = job['targets']
+        position, succeeded, failed = job['position'], job['succeeded'], job['failed']
+        reason = job['options'].get('reason', "Mass ban")
+        use_bulk = hasattr(guild, 'bulk_ban')
         
         embed = create_embed(
             title="⏳ Toplu yasaklama başlatıldı...",
-            description=f"İşlem devam ediyor... 0/{len(user_id_list)}",
+            description=f"İşlem devam ediyor... {position}/{len(targets)}",
             color=discord.Color.blue()
         )
-        await confirm_msg.edit(embed=embed)
+        await self._edit_progress(progress_message, embed)
         
-        for i, user_id in enumerate(user_id_list):
-            try:
-                user = await self.bot.fetch_user(user_id)
-                await ctx.guild.ban(user, reason=f"Mass ban by {ctx.author}")
-                banned_count += 1
-                
-                # Log each ban
-                await self.bot.db.add_mod_log(
-                    ctx.guild.id, ctx.author.id, user_id, "MASSBAN", f"Mass ban operation"
-                )
-                
-                # Update progress every 5 bans
-                if (i + 1) % 5 == 0:
-                    embed.description = f"İşlem devam ediyor... {i + 1}/{len(user_id_list)}"
-                    await confirm_msg.edit(embed=embed)
-                
-                # Rate limit protection
-                await asyncio.sleep(1)
-                
-            except Exception:
-                failed_count += 1
+        while position < len(targets):
+            chunk = targets[position:position + (self.BULK_BAN_CHUNK if use_bulk else self.SINGLE_BAN_CHUNK)]
+            banned = None
+            
+            if use_bulk:
+                try:
+                    result = await guild.bulk_ban([discord.Object(id=user_id) for user_id in chunk], reason=reason)
+                    banned = [user.id for user in result.banned]
+                except discord.Forbidden:
+                    # Bulk bans also need Manage Server
+                    use_bulk = False
+                    continue
+                except discord.HTTPException:
+                    # e.g. none of the chunk could be banned; retry one by one
+                    pass
+            
+            if banned is None:
+                banned = []
+                for user_id in chunk:
+                    try:
+                        await guild.ban(discord.Object(id=user_id), reason=reason)
+                        banned.append(user_id)
+                    except discord.HTTPException:
+                        pass
+            
+            position += len(chunk)
+            succeeded += len(banned)
+            failed += len(chunk) - len(banned)
+            await self.bot.db.checkpoint_mod_job(
+                job['id'], position, succeeded, failed,
+                logs=[(guild.id, job['moderator_id'], user_id, "MASSBAN", "Mass ban operation") for user_id in banned]
+            )
+            
+            embed.description = f"İşlem devam ediyor... {position}/{len(targets)}"
+            await self._edit_progress(progress_message, embed)
+        
+        await self.bot.db.checkpoint_mod_job(job['id'], position, succeeded, failed, status='done')
         
         # Final result
         embed = create_embed(
             title="✅ Toplu yasaklama tamamlandı!",
-            description=f"**Başarılı:** {banned_count}\n**Başarısız:** {failed_count}\n**Toplam:** {len(user_id_list)}",
+            description=f"**Başarılı:** {succeeded}\n**Başarısız:** {failed}\n**Toplam:** {len(targets)}",
             color=discord.Color.green()
         )
-        await confirm_msg.edit(embed=embed)
+        await self._edit_progress(progress_message, embed)
+    
+    async def _edit_progress(self, message, embed):
+        if message is None:
+            return
+        try:
+            await message.edit(embed=embed)
+        except discord.HTTPException:
+            pass
     
     @commands.command()
     @commands.has_permissions(manage_messages=True)
@@ -384,23 +510,30 @@ class SecurityModeration(commands.Cog):
         """Anti-raid korumasını aç/kapat."""
         if toggle is None:
             # Mevcut durumu göster
-            status = self.raid_protection.get(ctx.guild.id, False)
+            settings = self.raid_settings.get(ctx.guild.id, self.bot.db.RAID_SETTING_DEFAULTS)
+            status = bool(settings['enabled'])
             embed = create_embed(
                 title="🛡️ Anti-Raid Durumu",
-                description=f"Anti-raid koruması: {'🟢 Açık' if status else '🔴 Kapalı'}",
+                description=f"Anti-raid koruması: {'🟢 Açık' if status else '🔴 Kapalı'}"
+                            + ("\n⚠️ **Şu anda baskın modunda!**" if ctx.guild.id in self.raids else ""),
                 color=discord.Color.green() if status else discord.Color.red()
             )
+            embed.add_field(name="Eylem", value=settings['action'], inline=True)
+            embed.add_field(name="Baskın eşiği", value=f"{settings['join_threshold']} katılım / {settings['join_window']} sn", inline=True)
+            embed.add_field(name="Küme boyutu", value=str(settings['cluster_size']), inline=True)
+            embed.add_field(name="Minimum hesap yaşı", value=f"{settings['min_account_age']} gün", inline=True)
+            embed.set_footer(text="Ayarlar: !antiraidset <action|joins|window|cluster|age> <değer>")
             return await ctx.send(embed=embed)
         
         if toggle.lower() in ['aç', 'on', 'enable', 'açık']:
-            self.raid_protection[ctx.guild.id] = True
+            await self._update_raid_setting(ctx.guild.id, 'enabled', 1)
             embed = create_embed(
                 title="🛡️ Anti-raid açıldı!",
                 description="Şüpheli aktiviteler izlenecek.",
                 color=discord.Color.green()
             )
         elif toggle.lower() in ['kapat', 'off', 'disable', 'kapalı']:
-            self.raid_protection[ctx.guild.id] = False
+            await self._update_raid_setting(ctx.guild.id, 'enabled', 0)
             embed = create_embed(
                 title="🛡️ Anti-raid kapatıldı!",
                 color=discord.Color.red()
@@ -415,42 +548,198 @@ class SecurityModeration(commands.Cog):
         
         await ctx.send(embed=embed)
     
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def antiraidset(self, ctx, setting: str, value: str):
+        """Anti-raid ayarlarını değiştir."""
+        setting = setting.lower()
+        if setting == 'action':
+            column, value = 'action', value.lower()
+            if value not in ['kick', 'ban']:
+                embed = create_embed(
+                    title="❌ Geçersiz eylem!",
+                    description="Geçerli eylemler: `kick`, `ban`",
+                    color=discord.Color.red()
+                )
+                return await ctx.send(embed=embed)
+        elif setting in self.RAID_SETTINGS:
+            column, minimum = self.RAID_SETTINGS[setting]
+            if not value.isdigit() or int(value) < minimum:
+                embed = create_embed(
+                    title="❌ Geçersiz değer!",
+                    description=f"`{setting}` en az {minimum} olan bir sayı olmalı.",
+                    color=discord.Color.red()
+                )
+                return await ctx.send(embed=embed)
+            value = int(value)
+        else:
+            embed = create_embed(
+                title="❌ Geçersiz ayar!",
+                description="Geçerli ayarlar: `action`, `joins`, `window`, `cluster`, `age`",
+                color=discord.Color.red()
+            )
+            return await ctx.send(embed=embed)
+        
+        await self._update_raid_setting(ctx.guild.id, column, value)
+        embed = create_embed(
+            title="✅ Anti-raid ayarı güncellendi!",
+            description=f"**{setting}:** {value}",
+            color=discord.Color.green()
+        )
+        await ctx.send(embed=embed)
+    
     @commands.Cog.listener()
     async def on_member_join(self, member):
-        """Anti-raid koruması - yeni üye kontrolü."""
+        """Anti-raid koruması - katılım hızı ve küme kontrolü."""
         guild = member.guild
+        settings = self.raid_settings.get(guild.id)
         
-        if guild.id not in self.raid_protection or not self.raid_protection[guild.id]:
+        if not settings or not settings['enabled']:
             return
         
-        # Hesap yaşı kontrolü (7 günden eski mi?)
-        account_age = (datetime.now() - member.created_at).days
+        detector = self.raid_detectors[guild.id]
+        started, targets = detector.observe(member)
+        
+        if started:
+            raid = self.raids[guild.id] = {
+                'started': discord.utils.utcnow(),
+                # Joins in the window that tripped the threshold count too
+                'joins': len(detector) - 1,
+                'queue': [],
+                'actioned': 0,
+                'failed': 0
+            }
+            raid['task'] = asyncio.create_task(self.run_raid(guild, detector, raid))
+            print(f"🚨 Baskın algılandı: {guild.name} ({len(detector)} katılım / {detector.window} sn)")
+        
+        raid = self.raids.get(guild.id)
+        if raid:
+            # Batch mode: queue and let run_raid apply and log them together
+            raid['joins'] += 1
+            raid['queue'].extend(targets)
+            return
         
-        if account_age < 7:
-            try:
-                # Şüpheli hesap - kick
-                await member.kick(reason="Anti-raid: Account too new")
-                
-                # Log the action
-                await self.bot.db.add_mod_log(
-                    guild.id, self.bot.user.id, member.id, "ANTIRAID_KICK", 
-                    f"Account age: {account_age} days"
+        for target, reason in targets:
+            await self.raid_single_action(guild, target, reason, settings['action'])
+    
+    async def raid_single_action(self, guild, member, reason, action):
+        """Kick or ban one suspicious member outside a raid and log it."""
+        try:
+            if action == 'ban':
+                await member.ban(reason=f"Anti-raid: {reason}", delete_message_seconds=0)
+            else:
+                await member.kick(reason=f"Anti-raid: {reason}")
+        except discord.HTTPException:
+            return
+        
+        await self.bot.db.add_mod_log(
+            guild.id, self.bot.user.id, member.id, f"ANTIRAID_{action.upper()}", reason
+        )
+        
+        # Admin bilgilendir
+        settings = await self.bot.db.get_guild_settings(guild.id)
+        if settings and settings['log_channel']:
+            log_channel = guild.get_channel(settings['log_channel'])
+            if log_channel:
+                embed = create_embed(
+                    title="🛡️ Anti-Raid Aktivitesi",
+                    description=f"**{member}** {'yasaklandı' if action == 'ban' else 'atıldı'}\n**Sebep:** {reason}",
+                    color=discord.Color.orange()
                 )
-                
-                # Admin bilgilendir
-                settings = await self.bot.db.get_guild_settings(guild.id)
-                if settings and settings['log_channel']:
-                    log_channel = guild.get_channel(settings['log_channel'])
-                    if log_channel:
-                        embed = create_embed(
-                            title="🛡️ Anti-Raid Aktivitesi",
-                            description=f"**{member}** atıldı\n**Sebep:** Hesap çok yeni ({account_age} gün)",
-                            color=discord.Color.orange()
-                        )
-                        await log_channel.send(embed=embed)
-                        
-            except discord.Forbidden:
+                await log_channel.send(embed=embed)
+    
+    async def run_raid(self, guild, detector, raid):
+        """Apply queued raid actions in batches until the raid dies down, then log one summary."""
+        limiter = AdaptiveConcurrency(minimum=1, maximum=10)
+        try:
+            while True:
+                await asyncio.sleep(self.RAID_BATCH_INTERVAL)
+                batch, raid['queue'] = raid['queue'], []
+                if batch:
+                    action = self.raid_settings[guild.id]['action']
+                    if action == 'ban':
+                        await self._raid_ban_batch(guild, batch, raid)
+                    else:
+                        await self._raid_kick_batch(guild, batch, raid, limiter)
+                elif not detector.in_raid():
+                    break
+        finally:
+            self.raids.pop(guild.id, None)
+        
+        await self._raid_summary(guild, raid)
+    
+    async def _raid_ban_batch(self, guild, batch, raid):
+        reasons = {member.id: reason for member, reason in batch}
+        user_ids = list(reasons)
+        banned = []
+        attempted = 0
+        
+        if hasattr(guild, 'bulk_ban'):
+            while attempted < len(user_ids):
+                chunk = user_ids[attempted:attempted + self.BULK_BAN_CHUNK]
+                try:
+                    result = await guild.bulk_ban(
+                        [discord.Object(id=user_id) for user_id in chunk],
+                        reason="Anti-raid", delete_message_seconds=0
+                    )
+                except discord.HTTPException:
+                    # No bulk ban permission, or nothing in the chunk could be banned
+                    break
+                banned.extend(user.id for user in result.banned)
+                attempted += len(chunk)
+        
+        for user_id in user_ids[attempted:]:
+            try:
+                await guild.ban(discord.Object(id=user_id), reason="Anti-raid", delete_message_seconds=0)
+                banned.append(user_id)
+            except discord.HTTPException:
                 pass
+        
+        await self._raid_record(guild, raid, 'ANTIRAID_BAN', banned, reasons)
+    
+    async def _raid_kick_batch(self, guild, batch, raid, limiter):
+        async def kick(member, reason):
+            async with limiter.slot():
+                try:
+                    await member.kick(reason=f"Anti-raid: {reason}")
+                except discord.HTTPException:
+                    return False
+            return True
+        
+        results = await asyncio.gather(*(kick(member, reason) for member, reason in batch))
+        kicked = [member.id for (member, _), ok in zip(batch, results) if ok]
+        await self._raid_record(guild, raid, 'ANTIRAID_KICK', kicked, {member.id: reason for member, reason in batch})
+    
+    async def _raid_record(self, guild, raid, action, user_ids, reasons):
+        raid['actioned'] += len(user_ids)
+        raid['failed'] += len(reasons) - len(user_ids)
+        for user_id in user_ids:
+            await self.bot.db.add_mod_log(guild.id, self.bot.user.id, user_id, action, reasons[user_id])
+    
+    async def _raid_summary(self, guild, raid):
+        action = self.raid_settings.get(guild.id, {}).get('action', 'kick')
+        duration = int((discord.utils.utcnow() - raid['started']).total_seconds())
+        print(f"🛡️ Baskın sona erdi: {guild.name} ({raid['joins']} katılım, {raid['actioned']} işlem)")
+        
+        settings = await self.bot.db.get_guild_settings(guild.id)
+        if not settings or not settings['log_channel']:
+            return
+        log_channel = guild.get_channel(settings['log_channel'])
+        if not log_channel:
+            return
+        
+        embed = create_embed(
+            title="🚨 Baskın Özeti",
+            description=f"Baskın modu sona erdi ({duration} sn sürdü).",
+            color=discord.Color.orange()
+        )
+        embed.add_field(name="Katılım", value=str(raid['joins']), inline=True)
+        embed.add_field(name="Yasaklanan" if action == 'ban' else "Atılan", value=str(raid['actioned']), inline=True)
+        embed.add_field(name="Başarısız", value=str(raid['failed']), inline=True)
+        try:
+            await log_channel.send(embed=embed)
+        except discord.HTTPException:
+            pass
 
 async def setup(bot):
     await bot.add_cog(SecurityModeration(bot))
@@ -0,0 +1,132 @@
+import sys
+import time
+from array import array
+from collections import OrderedDict
+
+
+class MessageWindow:
+    """Fixed-size ring buffer of one member's recent message hashes and times."""
+
+    __slots__ = ('hashes', 'times', 'head', 'size')
+
+    def __init__(self, capacity):
+        self.hashes = array('q', bytes(8 * capacity))
+        self.times = array('d', bytes(8 * capacity))
+        self.head = 0
+        self.size = 0
+
+    def push(self, content_hash, timestamp):
+        capacity = len(self.times)
+        self.hashes[self.head] = content_hash
+        self.times[self.head] = timestamp
+        self.head = (self.head + 1) % capacity
+        if self.size < capacity:
+            self.size += 1
+
+    def newest(self, count):
+        """Yield up to ``count`` (hash, time) pairs, newest first."""
+        capacity = len(self.times)
+        index = self.head
+        for _ in range(min(count, self.size)):
+            index = (index - 1) % capacity
+            yield self.hashes[index], self.times[index]
+
+    @property
+    def last_seen(self):
+        return self.times[(self.head - 1) % len(self.times)]
+
+
+class SpamTracker:
+    """Sliding-window message history keyed by (guild_id, user_id).
+
+    Every member gets a ring buffer of ``capacity`` entries, so memory per
+    member is constant. Members idle for ``idle_after`` seconds are dropped
+    by ``sweep()``, and at most ``max_members`` windows are kept, evicting
+    the least recently active first.
+    """
+
+    def __init__(self, capacity=11, idle_after=60, max_members=50000):
+        self.capacity = capacity
+        self.idle_after = idle_after
+        self.max_members = max_members
+        self._windows = OrderedDict()
+
+    def __len__(self):
+        return len(self._windows)
+
+    def record(self, guild_id, user_id, content, now=None):
+        """Record one message; call once per message."""
+        now = time.monotonic() if now is None else now
+        key = (guild_id, user_id)
+
+        window = self._windows.get(key)
+        if window is None:
+            window = MessageWindow(self.capacity)
+            self._windows[key] = window
+            if len(self._windows) > self.max_members:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(key)
+
+        window.push(hash(content.lower()), now)
+        return window
+
+    def is_repeating(self, guild_id, user_id, count=5, within=30, max_distinct=2, now=None):
+        """True if the last ``count`` messages, all within ``within`` seconds, are near-duplicates."""
+        window = self._windows.get((guild_id, user_id))
+        if window is None or window.size < count:
+            return False
+
+        cutoff = (time.monotonic() if now is None else now) - within
+        hashes = set()
+        for content_hash, timestamp in window.newest(count):
+            if timestamp <= cutoff:
+                return False
+            hashes.add(content_hash)
+
+        return len(hashes) <= max_distinct
+
+    def count_within(self, guild_id, user_id, within, now=None):
+        """Number of recorded messages in the last ``within`` seconds (up to capacity)."""
+        window = self._windows.get((guild_id, user_id))
+        if window is None:
+            return 0
+
+        cutoff = (time.monotonic() if now is None else now) - within
+        recent = 0
+        for _, timestamp in window.newest(window.size):
+            if timestamp <= cutoff:
+                break
+            recent += 1
+        return recent
+
+    def sweep(self, now=None):
+        """Drop members idle for longer than ``idle_after``; returns how many."""
+        cutoff = (time.monotonic() if now is None else now) - self.idle_after
+        removed = 0
+
+        # Windows are ordered by last activity, so stop at the first active one
+        while self._windows:
+            key, window = next(iter(self._windows.items()))
+            if window.last_seen > cutoff:
+                break
+            del self._windows[key]
+            removed += 1
+
+        return removed
+
+    def memory_usage(self):
+        """Approximate bytes held by the tracker."""
+        if not self._windows:
+            return sys.getsizeof(self._windows)
+
+        window = next(iter(self._windows.values()))
+        key = next(iter(self._windows))
+        per_member = (
+            sys.getsizeof(window)
+            + sys.getsizeof(window.hashes)
+            + sys.getsizeof(window.times)
+            + sys.getsizeof(key)
+            + sum(sys.getsizeof(part) for part in key)
+        )
+        return sys.getsizeof(self._windows) + per_member * len(self._windows)
@@ -1,13 +1,112 @@
 import discord
 from discord.ext import commands
 import asyncio
+import os
+from datetime import datetime, timezone
 from utils.embeds import create_embed
 from utils.helpers import get_text
+from utils.transcripts import write_transcript
+
+
+def parse_created_at(value):
+    """Turn a stored ticket creation time into an aware datetime."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
 
 class TicketSystem(commands.Cog):
+    # 'html' or 'jsonl'; transcripts are archived under transcripts/<guild_id>/
+    TRANSCRIPT_FORMAT = 'html'
+    
     def __init__(self, bot):
         self.bot = bot
+        # Ticket channel ID -> {'guild_id', 'user_id', 'created_at', 'type'}
         self.active_tickets = {}
+        # (guild_id, user_id) -> ticket channel ID; mirrored in open_tickets
+        self.tickets_by_owner = {}
+        # Panel message IDs; reactions anywhere else return without a query
+        self.panel_messages = set()
+        # Members whose ticket channel is being created right now
+        self.opening = set()
+        self.load_task = None
+    
+    async def cog_load(self):
+        self.load_task = asyncio.create_task(self.load_tickets())
+    
+    async def cog_unload(self):
+        if self.load_task:
+            self.load_task.cancel()
+    
+    async def load_tickets(self):
+        """Load panel messages and open tickets once; they are kept current afterwards."""
+        await self.bot.wait_until_ready()
+        
+        try:
+            panels = await self.bot.db.get_ticket_panels()
+            tickets = await self.bot.db.get_open_tickets()
+        except Exception as e:
+            print(f"❌ Ticketlar yüklenirken hata: {e}")
+            return
+        
+        self.panel_messages.update(message_id for _, message_id, _ in panels)
+        for guild_id, user_id, channel_id, ticket_type, created_at in tickets:
+            self._track(guild_id, user_id, channel_id, ticket_type, parse_created_at(created_at))
+        
+        try:
+            adopted = await self.adopt_untracked_tickets()
+        except Exception as e:
+            print(f"❌ Kayıtsız ticketlar eklenirken hata: {e}")
+            adopted = 0
+        
+        print(f"✅ {len(panels)} ticket paneli ve {len(tickets) + adopted} açık ticket yüklendi!")
+    
+    async def adopt_untracked_tickets(self):
+        """Track ticket channels opened before open_tickets existed.
+        
+        Their owner is the member the channel was shared with; without
+        this they are unknown to the 🔒 handler and can never be closed.
+        """
+        adopted = 0
+        for guild in self.bot.guilds:
+            for channel in guild.text_channels:
+                if channel.id in self.active_tickets or not channel.name.startswith("ticket-"):
+                    continue
+                
+                owner = next(
+                    (target for target, overwrite in channel.overwrites.items()
+                     if not isinstance(target, discord.Role) and target.id != guild.me.id
+                     and not getattr(target, 'bot', False) and overwrite.read_messages),
+                    None
+                )
+                if owner is None:
+                    # The ticket-oluştur panel channel, or not one of ours
+                    continue
+                
+                self._track(guild.id, owner.id, channel.id, "genel", channel.created_at)
+                await self.bot.db.add_open_ticket(guild.id, owner.id, channel.id, "genel", channel.created_at)
+                adopted += 1
+        return adopted
+    
+    def _track(self, guild_id, user_id, channel_id, ticket_type, created_at):
+        self.active_tickets[channel_id] = {
+            'guild_id': guild_id,
+            'user_id': user_id,
+            'created_at': created_at,
+            'type': ticket_type
+        }
+        self.tickets_by_owner[(guild_id, user_id)] = channel_id
+    
+    async def _untrack(self, channel_id):
+        ticket_info = self.active_tickets.pop(channel_id, None)
+        if ticket_info is None:
+            return
+        key = (ticket_info['guild_id'], ticket_info['user_id'])
+        if self.tickets_by_owner.get(key) == channel_id:
+            del self.tickets_by_owner[key]
+        await self.bot.db.remove_open_ticket(channel_id)
     
     @commands.command()
     @commands.has_permissions(administrator=True)
@@ -64,10 +163,8 @@ Size özel bir destek kanalı oluşturulacak.
             await message.add_reaction(reaction)
         
         # Save message ID for reaction handling
-        await self.bot.db.execute_query(
-            "INSERT OR REPLACE INTO ticket_messages VALUES (?, ?, ?)",
-            (ctx.guild.id, message.id, ticket_channel.id)
-        )
+        await self.bot.db.add_ticket_panel(ctx.guild.id, message.id, ticket_channel.id)
+        self.panel_messages.add(message.id)
         
         success_embed = create_embed(
             title="✅ Ticket sistemi kuruldu!",
@@ -78,19 +175,29 @@ Size özel bir destek kanalı oluşturulacak.
     
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
+        """Route reactions on ticket panels and inside ticket channels."""
+        if payload.message_id in self.panel_messages:
+            if payload.user_id != self.bot.user.id:
+                await self.open_ticket(payload)
+        elif payload.channel_id in self.active_tickets and str(payload.emoji) == "🔒":
+            if payload.user_id != self.bot.user.id:
+                await self.confirm_close(payload)
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        """Forget ticket channels deleted by hand."""
+        if channel.id in self.active_tickets:
+            await self._untrack(channel.id)
+    
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        """Forget deleted ticket panels."""
+        if payload.message_id in self.panel_messages:
+            self.panel_messages.discard(payload.message_id)
+            await self.bot.db.remove_ticket_panel(payload.message_id)
+    
+    async def open_ticket(self, payload):
         """Handle ticket creation reactions."""
-        if payload.user_id == self.bot.user.id:
-            return
-        
-        # Check if this is a ticket message
-        result = await self.bot.db.execute_query(
-            "SELECT * FROM ticket_messages WHERE message_id = ?",
-            (payload.message_id,), fetch=True
-        )
-        
-        if not result:
-            return
-        
         guild = self.bot.get_guild(payload.guild_id)
         if not guild:
             return
@@ -99,16 +206,21 @@ Size özel bir destek kanalı oluşturulacak.
         if not user:
             return
         
-        # Remove user's reaction
+        # Remove user's reaction without fetching the panel message
         channel = guild.get_channel(payload.channel_id)
-        message = await channel.fetch_message(payload.message_id)
-        await message.remove_reaction(payload.emoji, user)
+        if channel:
+            try:
+                await channel.get_partial_message(payload.message_id).remove_reaction(payload.emoji, user)
+            except discord.HTTPException:
+                pass
         
         # Check if user already has an open ticket
-        existing_ticket = discord.utils.find(
-            lambda c: c.name == f"ticket-{user.name.lower()}" and isinstance(c, discord.TextChannel),
-            guild.channels
-        )
+        key = (guild.id, user.id)
+        if key in self.opening:
+            return
+        
+        existing_id = self.tickets_by_owner.get(key)
+        existing_ticket = guild.get_channel(existing_id) if existing_id else None
         
         if existing_ticket:
             try:
@@ -117,6 +229,18 @@ Size özel bir destek kanalı oluşturulacak.
                 pass
             return
         
+        if existing_id:
+            # Channel was deleted while the bot was offline
+            await self._untrack(existing_id)
+        
+        self.opening.add(key)
+        try:
+            await self.create_ticket_channel(guild, user, payload)
+        finally:
+            self.opening.discard(key)
+    
+    async def create_ticket_channel(self, guild, user, payload):
+        """Create the ticket channel for a panel reaction."""
         # Get ticket category
         settings = await self.bot.db.get_guild_settings(guild.id)
         if not settings or not settings['ticket_category']:
@@ -180,11 +304,9 @@ Size özel bir destek kanalı oluşturulacak.
         await ticket_msg.add_reaction("🔒")
         
         # Store ticket info
-        self.active_tickets[ticket_channel.id] = {
-            'user_id': user.id,
-            'created_at': discord.utils.utcnow(),
-            'type': ticket_type
-        }
+        created_at = discord.utils.utcnow()
+        self._track(guild.id, user.id, ticket_channel.id, ticket_type, created_at)
+        await self.bot.db.add_open_ticket(guild.id, user.id, ticket_channel.id, ticket_type, created_at)
         
         # Send confirmation DM
         try:
@@ -197,18 +319,14 @@ Size özel bir destek kanalı oluşturulacak.
         except:
             pass
     
-    @commands.Cog.listener()
-    async def on_raw_reaction_add(self, payload):
+    async def confirm_close(self, payload):
         """Handle ticket close reactions."""
-        if payload.user_id == self.bot.user.id:
-            return
-        
         guild = self.bot.get_guild(payload.guild_id)
         if not guild:
             return
         
         channel = guild.get_channel(payload.channel_id)
-        if not channel or not channel.name.startswith("ticket-"):
+        if not channel:
             return
         
         if str(payload.emoji) == "🔒":
@@ -257,13 +375,22 @@ Size özel bir destek kanalı oluşturulacak.
     
     async def close_ticket(self, channel, closer, ticket_info):
         """Close a ticket channel."""
-        # Create transcript
-        messages = []
-        async for message in channel.history(limit=None, oldest_first=True):
-            if not message.author.bot or message.embeds:
-                messages.append(f"[{message.created_at.strftime('%d/%m/%Y %H:%M')}] {message.author}: {message.content}")
-        
-        transcript = "\n".join(messages)
+        # Stream the transcript into the archive, page by page
+        fmt = self.TRANSCRIPT_FORMAT
+        transcript = None
+        try:
+            transcript = await write_transcript(
+                channel, fmt, include=lambda message: not message.author.bot or message.embeds
+            )
+        except (discord.HTTPException, OSError) as e:
+            print(f"❌ Transkript oluşturulamadı ({channel.id}): {e}")
+        
+        if transcript:
+            path, message_count, size = transcript
+            await self.bot.db.add_ticket_transcript(
+                channel.guild.id, channel.id, ticket_info['user_id'], closer.id,
+                fmt, path, message_count, size
+            )
         
         # Send transcript to user
         ticket_owner = channel.guild.get_member(ticket_info['user_id'])
@@ -275,13 +402,15 @@ Size özel bir destek kanalı oluşturulacak.
                     color=discord.Color.red()
                 )
                 
-                # Create transcript file
-                transcript_file = discord.File(
-                    fp=transcript.encode('utf-8'),
-                    filename=f"ticket-{ticket_owner.name}-{channel.created_at.strftime('%Y%m%d')}.txt"
-                )
-                
-                await ticket_owner.send(embed=transcript_embed, file=transcript_file)
+                # Attach the archived file when it fits the upload limit
+                if transcript and transcript[2] <= channel.guild.filesize_limit:
+                    transcript_file = discord.File(
+                        transcript[0],
+                        filename=f"ticket-{ticket_owner.name}-{channel.created_at.strftime('%Y%m%d')}.{fmt}"
+                    )
+                    await ticket_owner.send(embed=transcript_embed, file=transcript_file)
+                else:
+                    await ticket_owner.send(embed=transcript_embed)
             except:
                 pass
         
@@ -297,27 +426,84 @@ Size özel bir destek kanalı oluşturulacak.
 **Sahip:** {ticket_owner.mention if ticket_owner else "Bilinmiyor"}
 **Kapatan:** {closer.mention}
 **Süre:** {discord.utils.format_dt(ticket_info['created_at'], 'R')}
+**Transkript:** {f"{transcript[1]} mesaj (`!tickettranscript {channel.id}`)" if transcript else "Oluşturulamadı"}
                     """.strip(),
                     color=discord.Color.red()
                 )
                 await log_channel.send(embed=log_embed)
         
         # Remove from active tickets
-        if channel.id in self.active_tickets:
-            del self.active_tickets[channel.id]
+        await self._untrack(channel.id)
         
         # Delete channel after 5 seconds
         await channel.send("🎫 Ticket 5 saniye içinde kapatılacak...")
         await asyncio.sleep(5)
         await channel.delete(reason=f"Ticket closed by {closer}")
     
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def tickettranscript(self, ctx, ticket_id: int):
+        """Send the archived transcript of a closed ticket."""
+        transcript = await self.bot.db.get_ticket_transcript(ctx.guild.id, ticket_id)
+        
+        if not transcript or not os.path.exists(transcript[1]):
+            embed = create_embed(
+                title="❌ Transkript bulunamadı!",
+                description=f"`{ticket_id}` ID'li ticket için arşivlenmiş transkript yok.",
+                color=discord.Color.red()
+            )
+            return await ctx.send(embed=embed)
+        
+        fmt, path, message_count, size = transcript
+        embed = create_embed(
+            title="🎫 Ticket Transkripti",
+            description=f"**Ticket ID:** {ticket_id}\n**Mesaj:** {message_count}\n**Boyut:** {size / 1024:.1f} KB",
+            color=discord.Color.blue()
+        )
+        
+        if size > ctx.guild.filesize_limit:
+            embed.add_field(name="⚠️ Dosya çok büyük", value=f"Sunucuda `{path}` konumunda saklanıyor.", inline=False)
+            return await ctx.send(embed=embed)
+        
+        await ctx.send(embed=embed, file=discord.File(path, filename=f"ticket-{ticket_id}.{fmt}"))
+    
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def tickettranscripts(self, ctx, member: discord.Member = None):
+        """List recently archived ticket transcripts."""
+        result = await self.bot.db.get_ticket_transcripts(ctx.guild.id, member.id if member else None)
+        
+        embed = create_embed(
+            title="📋 Ticket Transkriptleri",
+            color=discord.Color.blue()
+        )
+        
+        if not result:
+            embed.description = "Arşivlenmiş transkript yok."
+            return await ctx.send(embed=embed)
+        
+        lines = []
+        for channel_id, user_id, closed_by, fmt, path, message_count, size, closed_at in result:
+            lines.append(f"• `{channel_id}` — <@{user_id}> • {message_count} mesaj • {fmt.upper()} • {closed_at}")
+        embed.description = "\n".join(lines)
+        await ctx.send(embed=embed)
+    
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def ticketstats(self, ctx):
         """Show ticket system statistics."""
-        # Get ticket channels
-        ticket_channels = [c for c in ctx.guild.channels 
-                          if isinstance(c, discord.TextChannel) and c.name.startswith("ticket-")]
+        # Get ticket channels from the open ticket index
+        ticket_channels = []
+        opened_today = 0
+        today = discord.utils.utcnow().date()
+        for channel_id, ticket_info in self.active_tickets.items():
+            if ticket_info['guild_id'] != ctx.guild.id:
+                continue
+            channel = ctx.guild.get_channel(channel_id)
+            if channel:
+                ticket_channels.append(channel)
+            if ticket_info['created_at'].date() == today:
+                opened_today += 1
         
         embed = create_embed(
             title="🎫 Ticket İstatistikleri",
@@ -326,7 +512,7 @@ Size özel bir destek kanalı oluşturulacak.
         
         embed.add_field(name="📊 Genel", value=f"""
 **Aktif Ticket:** {len(ticket_channels)}
-**Bugün Açılan:** {len(self.active_tickets)}
+**Bugün Açılan:** {opened_today}
 **Toplam Kanal:** {len([c for c in ctx.guild.channels if c.name.startswith("ticket")])}
         """.strip(), inline=False)
         
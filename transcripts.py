@@ -0,0 +1,139 @@
+"""
+Streaming ticket transcripts.
+
+Channel history is paged oldest first and each message is written straight
+to a temporary file next to its archive location, so memory stays flat no
+matter how long the ticket ran. The finished file is renamed into place,
+so a crash mid-close never leaves a truncated transcript in the archive.
+File work runs on the default executor, one history page per write, so a
+slow disk never stalls the event loop.
+"""
+
+import asyncio
+import html
+import json
+import os
+import tempfile
+
+TRANSCRIPT_DIR = 'transcripts'
+TRANSCRIPT_FORMATS = ('html', 'jsonl')
+# Messages rendered per file write; matches one page of channel history
+WRITE_BATCH = 100
+
+HTML_STYLE = """
+body { font-family: sans-serif; background: #36393f; color: #dcddde; margin: 2em; }
+.message { margin: 0.6em 0; }
+.author { font-weight: bold; color: #fff; }
+.time { color: #72767d; font-size: 0.8em; margin-left: 0.5em; }
+.content { white-space: pre-wrap; }
+.embed { border-left: 4px solid #4f545c; padding-left: 0.5em; color: #b9bbbe; }
+a { color: #00aff4; }
+""".strip()
+
+
+def transcript_path(guild_id, channel_id, fmt, root=TRANSCRIPT_DIR):
+    return os.path.join(root, str(guild_id), f"{channel_id}.{fmt}")
+
+
+def _attachments(message):
+    return [{'filename': a.filename, 'url': a.url, 'size': a.size} for a in message.attachments]
+
+
+def _embeds(message):
+    return [{'title': e.title, 'description': e.description} for e in message.embeds]
+
+
+def _jsonl_line(message):
+    return json.dumps({
+        'id': message.id,
+        'author_id': message.author.id,
+        'author': str(message.author),
+        'bot': message.author.bot,
+        'created_at': message.created_at.isoformat(),
+        'content': message.content,
+        'attachments': _attachments(message),
+        'embeds': _embeds(message)
+    }, ensure_ascii=False) + '\n'
+
+
+def _html_block(message):
+    parts = [
+        '<div class="message">',
+        f'<span class="author">{html.escape(str(message.author))}</span>'
+        f'<span class="time">{message.created_at.strftime("%d/%m/%Y %H:%M")}</span>'
+    ]
+    if message.content:
+        parts.append(f'<div class="content">{html.escape(message.content)}</div>')
+    for attachment in _attachments(message):
+        parts.append(
+            f'<div class="attachment">📎 <a href="{html.escape(attachment["url"])}">'
+            f'{html.escape(attachment["filename"])}</a></div>'
+        )
+    for embed in _embeds(message):
+        text = ' — '.join(html.escape(value) for value in (embed['title'], embed['description']) if value)
+        if text:
+            parts.append(f'<div class="embed">{text}</div>')
+    parts.append('</div>\n')
+    return '\n'.join(parts)
+
+
+def _open_temp(directory):
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    return os.fdopen(fd, 'w', encoding='utf-8'), temp_path
+
+
+def _finish(f, temp_path, path):
+    f.close()
+    os.replace(temp_path, path)
+    return os.path.getsize(path)
+
+
+async def _blocking(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+async def write_transcript(channel, fmt='html', include=None, root=TRANSCRIPT_DIR):
+    """Write ``channel``'s history to the transcript archive.
+
+    ``include(message)`` may filter messages out. Returns
+    ``(path, message_count, size_in_bytes)``.
+    """
+    if fmt not in TRANSCRIPT_FORMATS:
+        raise ValueError(f"unknown transcript format: {fmt}")
+
+    path = transcript_path(channel.guild.id, channel.id, fmt, root)
+    f, temp_path = await _blocking(_open_temp, os.path.dirname(path))
+    count = 0
+    try:
+        batch = []
+        if fmt == 'html':
+            title = html.escape(f"#{channel.name}")
+            batch.append(
+                f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{title}</title>\n'
+                f'<style>\n{HTML_STYLE}\n</style></head><body>\n<h1>{title}</h1>\n'
+            )
+
+        async for message in channel.history(limit=None, oldest_first=True):
+            if include is not None and not include(message):
+                continue
+            batch.append(_html_block(message) if fmt == 'html' else _jsonl_line(message))
+            count += 1
+            if len(batch) >= WRITE_BATCH:
+                await _blocking(f.write, ''.join(batch))
+                batch.clear()
+
+        if fmt == 'html':
+            batch.append('</body></html>\n')
+        await _blocking(f.write, ''.join(batch))
+
+        size = await _blocking(_finish, f, temp_path, path)
+    except BaseException:
+        f.close()
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    return path, count, size
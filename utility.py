@@ -114,7 +114,28 @@ class Utility(commands.Cog):
             color=discord.Color.green()
         )
         await ctx.send(embed=embed)
-    
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def dbplan(self, ctx):
+        """Show the query plan of every hot database query."""
+        plans = await self.bot.db.explain_hot_queries()
+
+        embed = create_embed(
+            title="🗄️ Sorgu Planları",
+            color=discord.Color.blue()
+        )
+
+        for name, plan in plans.items():
+            embed.add_field(
+                name=name,
+                value="```\n" + "\n".join(plan)[:1000] + "\n```",
+                inline=False
+            )
+
+        embed.set_footer(text=f"Şema sürümü: v{self.bot.db.schema_version}")
+        await ctx.send(embed=embed)
+
     @commands.command()
     async def help(self, ctx, category=None):
         """Show help menu."""
@@ -0,0 +1,112 @@
+import unicodedata
+from collections import deque
+
+# Common character substitutions used to dodge word filters.
+LEET_MAP = str.maketrans({
+    '0': 'o',
+    '1': 'i',
+    '3': 'e',
+    '4': 'a',
+    '5': 's',
+    '7': 't',
+    '8': 'b',
+    '@': 'a',
+    '$': 's',
+    '!': 'i',
+    '|': 'l',
+    # Turkish dotless i folds onto the plain letter
+    'ı': 'i'
+})
+
+
+def normalize_text(text):
+    """Lowercase, undo leetspeak and strip diacritics (ş→s, İ→i, é→e)."""
+    text = text.lower().translate(LEET_MAP)
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class BlacklistMatcher:
+    """Aho-Corasick automaton that finds any blacklisted term in one pass.
+
+    Matching is substring based like the old per-word ``in`` checks, but
+    costs O(len(text)) no matter how many terms the guild has.
+    """
+
+    def __init__(self, words, normalize=False):
+        self.normalize = normalize
+        self.words = sorted(set(word.lower() for word in words if word))
+
+        # Node 0 is the root; each node keeps its transitions, failure link
+        # and every term that ends there, directly or as a suffix.
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for word in self.words:
+            self._add(self._prepare(word), word)
+        self._build_links()
+
+    def __len__(self):
+        return len(self.words)
+
+    def _prepare(self, text):
+        return normalize_text(text) if self.normalize else text.lower()
+
+    def _add(self, key, word):
+        if not key:
+            return
+
+        node = 0
+        for char in key:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[node][char] = next_node
+            node = next_node
+
+        if word not in self._output[node]:
+            self._output[node] += (word,)
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+
+                self._output[child] += self._output[self._fail[child]]
+
+    def _scan(self, text):
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for char in self._prepare(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            yield from output[node]
+
+    def find(self, text):
+        """Return the first blacklisted term found in ``text``, or None."""
+        if not self.words:
+            return None
+        return next(self._scan(text), None)
+
+    def find_all(self, text):
+        """Return every distinct blacklisted term found in ``text``."""
+        if not self.words:
+            return []
+
+        found = []
+        for word in self._scan(text):
+            if word not in found:
+                found.append(word)
+        return found
@@ -0,0 +1,141 @@
+import asyncio
+
+
+class WriteBehindBuffer:
+    """Batch INSERT statements into group-committed transactions.
+
+    Rows are queued in memory and written with one ``executemany`` per
+    statement every ``flush_interval`` seconds or as soon as ``max_batch``
+    rows are waiting, whichever comes first. The queue is bounded, so
+    producers wait once ``max_pending`` rows are outstanding.
+    """
+
+    def __init__(self, db, flush_interval=0.25, max_batch=200, max_pending=5000):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+
+        self._queue = None
+        self._full = None
+        self._task = None
+        self._closed = False
+        # Producers inside submit(), including ones waiting on a full queue
+        self._submitting = 0
+
+    def start(self):
+        """Start the background flush task on the running loop."""
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._full = asyncio.Event()
+            self._task = asyncio.create_task(self._worker())
+
+    @property
+    def pending(self):
+        """Number of rows waiting to be committed."""
+        return self._queue.qsize() if self._queue else 0
+
+    async def submit(self, query, params, wait=False):
+        """Queue a row for insertion.
+
+        With ``wait=True`` this returns only after the row's batch has been
+        committed, and re-raises the error if it could not be written.
+        Raises ``RuntimeError`` once the buffer has been closed.
+        """
+        if self._closed:
+            raise RuntimeError("write buffer is closed; the database has been shut down")
+
+        self.start()
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._submitting += 1
+        try:
+            await self._queue.put((query, params, future))
+        finally:
+            self._submitting -= 1
+
+        if self._queue.qsize() >= self.max_batch:
+            self._full.set()
+
+        if future is not None:
+            return await future
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+
+            if batch[0] is not None and self._queue.qsize() < self.max_batch:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            stop = None in batch
+            rows = [item for item in batch if item is not None]
+            if rows:
+                await self._commit(rows)
+
+            if stop:
+                await self._drain()
+                return
+
+    async def _drain(self):
+        """Commit rows queued behind the close sentinel.
+
+        Producers that were blocked on a full queue when ``close()`` ran
+        enqueue after the sentinel; keep going until all of them are in.
+        """
+        while self._submitting or not self._queue.empty():
+            if self._queue.empty():
+                # A woken producer still has to run its put()
+                await asyncio.sleep(0)
+                continue
+
+            rows = []
+            while len(rows) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not None:
+                    rows.append(item)
+            if rows:
+                await self._commit(rows)
+
+    async def _commit(self, rows):
+        """Write a batch in one transaction, falling back to per-row writes."""
+        statements = {}
+        for query, params, _ in rows:
+            statements.setdefault(query, []).append(params)
+
+        try:
+            await self.db.execute_many(list(statements.items()))
+        except Exception as e:
+            print(f"❌ Toplu yazma başarısız, satırlar tek tek yazılıyor: {e}")
+            for query, params, future in rows:
+                try:
+                    await self.db.execute_query(query, params)
+                except Exception as row_error:
+                    if future is not None and not future.done():
+                        future.set_exception(row_error)
+                    else:
+                        print(f"❌ Satır yazılamadı: {row_error}")
+                    continue
+
+                if future is not None and not future.done():
+                    future.set_result(1)
+            return
+
+        for _, _, future in rows:
+            if future is not None and not future.done():
+                future.set_result(1)
+
+    async def close(self):
+        """Commit everything still queued; later submits are rejected."""
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task